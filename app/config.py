@@ -9,3 +9,6 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour
 
+# JWT verification: "jose" (python-jose) or "pyjwt" (faster, same lib used for encoding)
+JWT_DECODER = os.getenv("JWT_DECODER", "jose")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
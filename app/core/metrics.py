@@ -0,0 +1,284 @@
+# app/core/metrics.py
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this are sampled into the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# --------------------------------------------------
+# HISTOGRAM / COUNTER
+# --------------------------------------------------
+
+class Histogram:
+    """
+    Minimal Prometheus-style histogram keyed by a tuple of label values.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+
+        for label_values, series in sorted(snapshot.items()):
+            base = _labels(self.labels, label_values)
+
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+
+        with self._lock:
+            snapshot = dict(self._values)
+
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+
+        return lines
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+# --------------------------------------------------
+# APP METRICS
+# --------------------------------------------------
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+
+db_query_seconds = Histogram(
+    "supabase_query_duration_seconds",
+    "PostgREST call latency (until response headers)",
+    ("table", "operation", "status"),
+)
+
+db_rows_total = Counter(
+    "supabase_rows_total",
+    "Rows returned or affected, from Content-Range",
+    ("table", "operation"),
+)
+
+parallel_fetch_seconds = Histogram(
+    "parallel_fetch_duration_seconds",
+    "Latency of each query run by fetch_parallel, by call site",
+    ("fetch", "query", "status"),
+)
+
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    http_request_seconds.observe((method, route, str(status)), seconds)
+
+
+# --------------------------------------------------
+# SUPABASE (HTTPX) INSTRUMENTATION
+# --------------------------------------------------
+
+_REST_PATH = re.compile(r"/rest/v1/(rpc/)?([^/?]+)")
+
+_OPERATIONS = {
+    "GET": "select",
+    "HEAD": "count",
+    "POST": "insert",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+
+def _operation(request: httpx.Request, is_rpc: bool) -> str:
+    if is_rpc:
+        return "rpc"
+
+    op = _OPERATIONS.get(request.method, request.method.lower())
+
+    if op == "insert" and "resolution=" in request.headers.get("prefer", ""):
+        return "upsert"
+
+    return op
+
+
+# PostgREST query parameters that aren't column filters
+_NON_FILTER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _filter_columns(request: httpx.Request) -> List[str]:
+    """
+    Names of the columns a request filters on, never their values.
+    `or` / `and` groups are reported by name only.
+    """
+    params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+    return sorted({key for key, _ in params if key not in _NON_FILTER_PARAMS})
+
+
+def _row_count(response: httpx.Response) -> Optional[int]:
+    # "0-24/*", "0-24/3573", "*/0"
+    content_range = response.headers.get("content-range")
+
+    if not content_range:
+        return None
+
+    span = content_range.split("/")[0]
+
+    if span == "*":
+        # No row span (empty result, HEAD / count-only): unknown, not 0
+        return None
+
+    try:
+        first, last = span.split("-")
+        return int(last) - int(first) + 1
+    except ValueError:
+        return None
+
+
+def _record(response: httpx.Response) -> None:
+    request = response.request
+    started = request.extensions.get("metrics_started")
+
+    if started is None:
+        return
+
+    match = _REST_PATH.search(request.url.path)
+
+    if match is None:
+        # auth / storage / realtime calls
+        return
+
+    seconds = time.perf_counter() - started
+    table = match.group(2)
+    operation = _operation(request, bool(match.group(1)))
+    rows = _row_count(response)
+
+    db_query_seconds.observe((table, operation, str(response.status_code)), seconds)
+
+    if rows:
+        db_rows_total.inc((table, operation), rows)
+
+    if seconds * 1000 >= SLOW_QUERY_MS and random.random() < SLOW_QUERY_SAMPLE_RATE:
+        entry = {
+            "at": time.time(),
+            "table": table,
+            "operation": operation,
+            "method": request.method,
+            "filters": _filter_columns(request),
+            "status": response.status_code,
+            "rows": rows,
+            "duration_ms": round(seconds * 1000, 2),
+        }
+        slow_queries.append(entry)
+        logger.warning(
+            "slow query %s %s %sms rows=%s filters=%s",
+            operation, table, entry["duration_ms"], rows, ",".join(entry["filters"]),
+        )
+
+
+def _start(request: httpx.Request) -> None:
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+async def _start_async(request: httpx.Request) -> None:
+    _start(request)
+
+
+async def _record_async(response: httpx.Response) -> None:
+    _record(response)
+
+
+SYNC_EVENT_HOOKS = {"request": [_start], "response": [_record]}
+ASYNC_EVENT_HOOKS = {"request": [_start_async], "response": [_record_async]}
+
+
+# --------------------------------------------------
+# EXPOSITION
+# --------------------------------------------------
+
+def render_prometheus(gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """
+    Text exposition of every metric above, plus numeric `gauges`
+    given as {prefix: stats dict} (cache / queue stats).
+    """
+    lines: List[str] = []
+
+    for metric in (http_request_seconds, db_query_seconds, db_rows_total, parallel_fetch_seconds):
+        lines.extend(metric.render())
+
+    for prefix, stats in (gauges or {}).items():
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,163 @@
+# app/core/reference_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Seconds a cached reference list is served before it is reloaded
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+
+
+class CachedList:
+    """
+    One cached response: the serialized body plus its validators.
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, last_modified: float, expires_at: float):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+
+class ReferenceCache:
+    """
+    In-process read-through cache for slow-changing reference data
+    (factories, QR codes, scan points).
+
+    Keys are tuples whose first item is the namespace (usually the table
+    name); `invalidate(namespace)` drops every key in it. Entries also
+    expire after `ttl` seconds so writes from other processes are
+    picked up eventually.
+
+    `invalidate` also bumps the namespace's generation. A load that was
+    already running when it happened may have read the old rows, so its
+    result is returned to that caller but not cached.
+    """
+
+    def __init__(self, ttl: float = REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[Hashable, ...], CachedList] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key) -> Optional[CachedList]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.expires_at > time.time():
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            return None
+
+    def _generation(self, key) -> int:
+        with self._lock:
+            return self._generations.get(key[0], 0)
+
+    def _store(self, key, data: Any, generation: int) -> CachedList:
+        body = json.dumps(data, default=str, separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        now = time.time()
+
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                # Invalidated while loading: don't cache what may be stale
+                return CachedList(body, etag, now, now)
+
+            previous = self._entries.get(key)
+
+            # A TTL reload with identical content keeps its Last-Modified
+            if previous is not None and previous.etag == etag:
+                last_modified = previous.last_modified
+            else:
+                last_modified = now
+
+            entry = CachedList(body, etag, last_modified, now + self.ttl)
+            self._entries[key] = entry
+
+        return entry
+
+    def get_or_load(self, key, loader: Callable[[], Any]) -> CachedList:
+        entry = self._fresh(key)
+
+        if entry is None:
+            generation = self._generation(key)
+            entry = self._store(key, loader(), generation)
+
+        return entry
+
+    async def get_or_load_async(self, key, loader: Callable[[], Awaitable[Any]]) -> CachedList:
+        entry = self._fresh(key)
+
+        if entry is None:
+            generation = self._generation(key)
+            entry = self._store(key, await loader(), generation)
+
+        return entry
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+reference_cache = ReferenceCache()
+
+
+def _not_modified(request: Request, entry: CachedList) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == entry.etag for t in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(entry.last_modified) <= since
+
+    return False
+
+
+def cached_json_response(request: Request, entry: CachedList) -> Response:
+    """
+    Serve a cached list with ETag / Last-Modified, or 304 if the client's
+    copy is still current.
+    """
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
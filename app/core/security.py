@@ -3,7 +3,8 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import jwt
-from app.config import SECRET_KEY, ALGORITHM
+from jose import jwt as jose_jwt, JWTError
+from app.config import SECRET_KEY, ALGORITHM, JWT_DECODER
 
 def create_access_token(
     data: Dict[str, Any],
@@ -27,3 +28,21 @@ def create_access_token(
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a JWT and return its claims.
+
+    Uses python-jose by default, or PyJWT when JWT_DECODER=pyjwt.
+
+    Raises:
+        ValueError: if the token is invalid or expired.
+    """
+    try:
+        if JWT_DECODER == "pyjwt":
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+        return jose_jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    except (jwt.PyJWTError, JWTError) as e:
+        raise ValueError("Invalid token") from e
@@ -1,9 +1,17 @@
 import os
-from typing import Dict, Any, List, Optional
-from supabase import create_client, Client
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from supabase import create_client, Client, acreate_client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions, SyncClientOptions
 from dotenv import load_dotenv
 import os
 
+from app.core.metrics import SYNC_EVENT_HOOKS, ASYNC_EVENT_HOOKS
+
 load_dotenv()
 
 
@@ -21,20 +29,110 @@ if not SUPABASE_URL:
 if not SUPABASE_KEY:
     raise RuntimeError("SUPABASE_KEY missing")
 
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
+
 # --------------------------------------------------
 # SUPABASE CLIENT
 # --------------------------------------------------
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Both clients run on httpx clients with metrics event hooks, so every
+# PostgREST call (helpers or direct .table(...).execute()) is timed.
+_sync_http = httpx.Client(
+    timeout=SUPABASE_HTTP_TIMEOUT,
+    event_hooks=SYNC_EVENT_HOOKS,
+)
+
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=SyncClientOptions(httpx_client=_sync_http),
+)
 
 def get_db() -> Client:
     return supabase
 
+# --------------------------------------------------
+# ASYNC SUPABASE CLIENT
+# --------------------------------------------------
+# One pooled HTTP/2 connection shared by every async query.
+# Created lazily on first use (needs a running event loop).
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+ASYNC_HTTP_TIMEOUT = SUPABASE_HTTP_TIMEOUT
+
+_async_http: Optional[httpx.AsyncClient] = None
+_async_supabase: Optional[AsyncClient] = None
+_async_lock = asyncio.Lock()
+
+async def get_async_db() -> AsyncClient:
+    """
+    Return the shared async Supabase client (FastAPI dependency).
+    """
+    global _async_http, _async_supabase
+
+    if _async_supabase is not None:
+        return _async_supabase
+
+    async with _async_lock:
+        if _async_supabase is None:
+            _async_http = httpx.AsyncClient(
+                http2=True,
+                timeout=ASYNC_HTTP_TIMEOUT,
+                event_hooks=ASYNC_EVENT_HOOKS,
+                limits=httpx.Limits(
+                    max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=ASYNC_HTTP_MAX_KEEPALIVE,
+                ),
+            )
+            _async_supabase = await acreate_client(
+                SUPABASE_URL,
+                SUPABASE_KEY,
+                options=AsyncClientOptions(httpx_client=_async_http),
+            )
+
+    return _async_supabase
+
+async def close_async_db() -> None:
+    """
+    Close the shared HTTP/2 pool (call on app shutdown).
+    """
+    global _async_http, _async_supabase
+
+    if _async_http is not None:
+        await _async_http.aclose()
+
+    _async_http = None
+    _async_supabase = None
+
 # --------------------------------------------------
 # TABLE NAMES
 # --------------------------------------------------
 SCANNING_TABLE = "scan_logs"
 QR_TABLE = "qr"
 
+# Scans as the report paths read them (with round_slot / employee
+# columns); report caching keys on this table, not on SCANNING_TABLE
+REPORT_SCANS_TABLE = "scanning_details"
+
+# --------------------------------------------------
+# ERRORS
+# --------------------------------------------------
+# SQLSTATE classes that mean "try again later", not "bad row":
+# connection, transaction rollback, resources, operator intervention
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True when a write failed for reasons unrelated to the rows
+    themselves (network, timeouts, DB unavailable).
+    """
+    if not isinstance(error, APIError):
+        return True
+
+    code = str(error.code or "")
+
+    # PGRST000-PGRST003: PostgREST could not reach / pool the DB
+    return code.startswith("PGRST00") or code[:2] in TRANSIENT_SQLSTATE_CLASSES
+
 # --------------------------------------------------
 # GENERIC HELPERS
 # --------------------------------------------------
@@ -108,6 +206,276 @@ def delete_row(
 
     return bool(res.data)
 
+# --------------------------------------------------
+# ASYNC GENERIC HELPERS
+# --------------------------------------------------
+async def insert_row_async(table: str, data: Dict[str, Any]) -> Dict:
+    """
+    Insert one row (async)
+    """
+    db = await get_async_db()
+    res = await db.table(table).insert(data).execute()
+
+    if not res.data:
+        raise RuntimeError(f"Insert failed: {res}")
+
+    return res.data[0]
+
+async def select_rows_async(
+    table: str,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict]:
+    """
+    Select rows with optional filters (async)
+    """
+    db = await get_async_db()
+    query = db.table(table).select("*")
+
+    if filters:
+        for key, val in filters.items():
+            query = query.eq(key, val)
+
+    res = await query.execute()
+
+    if not res.data:
+        return []
+
+    return res.data
+
+async def update_row_async(
+    table: str,
+    filters: Dict[str, Any],
+    data: Dict[str, Any]
+) -> Dict:
+    """
+    Update rows using filters (async). Returns the first updated row.
+    """
+    if not data:
+        raise ValueError("No data provided for update")
+
+    db = await get_async_db()
+    query = db.table(table).update(data)
+
+    for key, val in filters.items():
+        query = query.eq(key, val)
+
+    res = await query.execute()
+
+    if not res.data:
+        raise RuntimeError(f"Update failed: {res}")
+
+    return res.data[0]
+
+async def delete_row_async(
+    table: str,
+    filters: Dict[str, Any]
+) -> bool:
+    """
+    Delete rows using filters (async)
+    """
+    db = await get_async_db()
+    query = db.table(table).delete()
+
+    for key, val in filters.items():
+        query = query.eq(key, val)
+
+    res = await query.execute()
+
+    return bool(res.data)
+
+async def insert_rows_async(table: str, rows: List[Dict[str, Any]]) -> List[Dict]:
+    """
+    Insert many rows with a single multi-row insert (async).
+    Returns the inserted rows in input order.
+    """
+    if not rows:
+        return []
+
+    db = await get_async_db()
+    res = await db.table(table).insert(rows).execute()
+
+    if not res.data:
+        raise RuntimeError(f"Insert failed: {res}")
+
+    return res.data
+
+async def insert_new_rows_async(table: str, rows: List[Dict[str, Any]], on_conflict: str) -> List[Dict]:
+    """
+    Multi-row INSERT ... ON CONFLICT (`on_conflict`) DO NOTHING (async).
+    Returns only the rows actually inserted; conflicting rows are
+    skipped by the DB, so concurrent writers can't fail each other.
+    """
+    if not rows:
+        return []
+
+    db = await get_async_db()
+    res = await (
+        db.table(table)
+        .upsert(rows, on_conflict=on_conflict, ignore_duplicates=True)
+        .execute()
+    )
+
+    return res.data or []
+
+async def select_rows_in_async(
+    table: str,
+    column: str,
+    values: List[Any],
+    columns: str = "*"
+) -> List[Dict]:
+    """
+    Select rows whose `column` is one of `values` (async)
+    """
+    if not values:
+        return []
+
+    db = await get_async_db()
+    res = await db.table(table).select(columns).in_(column, values).execute()
+
+    return res.data or []
+
+async def select_page_async(
+    table: str,
+    filters: Optional[Dict[str, Any]] = None,
+    after_id: Optional[int] = None,
+    limit: int = 500,
+    columns: str = "*",
+    id_column: str = "id",
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None
+) -> List[Dict]:
+    """
+    Select one keyset page (async): rows with `id_column` > `after_id`,
+    ordered by `id_column`, at most `limit` rows.
+
+    `filters` values that are lists match any of their items (in_).
+    `ranges` maps a column to an inclusive (low, high) bound; either
+    side may be None.
+    """
+    db = await get_async_db()
+    query = db.table(table).select(columns)
+
+    if filters:
+        for key, val in filters.items():
+            if isinstance(val, (list, tuple)):
+                query = query.in_(key, list(val))
+            else:
+                query = query.eq(key, val)
+
+    if ranges:
+        for key, (low, high) in ranges.items():
+            if low is not None:
+                query = query.gte(key, low)
+            if high is not None:
+                query = query.lte(key, high)
+
+    if after_id is not None:
+        query = query.gt(id_column, after_id)
+
+    res = await query.order(id_column).limit(limit).execute()
+
+    return res.data or []
+
+async def iter_pages_async(
+    table: str,
+    filters: Optional[Dict[str, Any]] = None,
+    after_id: Optional[int] = None,
+    page_size: int = 500,
+    columns: str = "*",
+    id_column: str = "id",
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None
+):
+    """
+    Yield keyset pages until the table is exhausted. Only one page is
+    held in memory at a time.
+    """
+    while True:
+        rows = await select_page_async(
+            table, filters, after_id, page_size, columns, id_column, ranges
+        )
+
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+
+        after_id = rows[-1][id_column]
+
+# --------------------------------------------------
+# CONDITIONAL MUTATIONS
+# --------------------------------------------------
+# One UPDATE / DELETE that returns the affected rows, instead of a
+# select-then-mutate pair. No matching row -> 404 with `not_found`.
+
+def _match(query, filters: Dict[str, Any]):
+    for key, val in filters.items():
+        query = query.eq(key, val)
+    return query
+
+def update_one(
+    table: str,
+    filters: Dict[str, Any],
+    data: Dict[str, Any],
+    not_found: str = "Not found"
+) -> Dict:
+    if not data:
+        raise ValueError("No data provided for update")
+
+    query = supabase.table(table).update(data, returning=ReturnMethod.representation)
+    res = _match(query, filters).execute()
+
+    if not res.data:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return res.data[0]
+
+def delete_one(
+    table: str,
+    filters: Dict[str, Any],
+    not_found: str = "Not found"
+) -> Dict:
+    query = supabase.table(table).delete(returning=ReturnMethod.representation)
+    res = _match(query, filters).execute()
+
+    if not res.data:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return res.data[0]
+
+async def update_one_async(
+    table: str,
+    filters: Dict[str, Any],
+    data: Dict[str, Any],
+    not_found: str = "Not found"
+) -> Dict:
+    if not data:
+        raise ValueError("No data provided for update")
+
+    db = await get_async_db()
+    query = db.table(table).update(data, returning=ReturnMethod.representation)
+    res = await _match(query, filters).execute()
+
+    if not res.data:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return res.data[0]
+
+async def delete_one_async(
+    table: str,
+    filters: Dict[str, Any],
+    not_found: str = "Not found"
+) -> Dict:
+    db = await get_async_db()
+    query = db.table(table).delete(returning=ReturnMethod.representation)
+    res = await _match(query, filters).execute()
+
+    if not res.data:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return res.data[0]
+
 # --------------------------------------------------
 # SCAN LOG HELPERS
 # --------------------------------------------------
@@ -135,18 +503,68 @@ def delete_scan_log(scan_id: int) -> bool:
         {"id": scan_id}
     )
 
+async def create_scan_log_async(data: Dict[str, Any]) -> Dict:
+    return await insert_row_async(SCANNING_TABLE, data)
+
+async def get_scan_logs_page_async(
+    filters: Optional[Dict[str, Any]] = None,
+    after_id: Optional[int] = None,
+    limit: int = 500
+) -> List[Dict]:
+    return await select_page_async(SCANNING_TABLE, filters, after_id, limit)
+
+def iter_scan_log_pages_async(
+    filters: Optional[Dict[str, Any]] = None,
+    after_id: Optional[int] = None,
+    page_size: int = 500
+):
+    return iter_pages_async(SCANNING_TABLE, filters, after_id, page_size)
+
+async def get_all_scan_logs_async() -> List[Dict]:
+    return await select_rows_async(SCANNING_TABLE)
+
+async def get_scan_logs_by_factory_async(factory_code: str) -> List[Dict]:
+    return await select_rows_async(
+        SCANNING_TABLE,
+        {"factory_code": factory_code}
+    )
+
+async def get_scan_logs_by_guard_async(guard_name: str) -> List[Dict]:
+    return await select_rows_async(
+        SCANNING_TABLE,
+        {"guard_name": guard_name}
+    )
+
+async def delete_scan_log_async(scan_id: int) -> Dict:
+    return await delete_one_async(
+        SCANNING_TABLE,
+        {"id": scan_id},
+        "Scan not found"
+    )
+
 # --------------------------------------------------
 # QR HELPERS
 # --------------------------------------------------
-def create_qr(data: Dict[str, Any]) -> Dict:
-    """
-    Create a QR. Ensures waiting_time has a value.
-    """
+def _qr_create_defaults(data: Dict[str, Any]) -> Dict[str, Any]:
     # If key is missing OR explicitly null (from empty frontend input), default to 15
     if "waiting_time" not in data or data["waiting_time"] is None:
         data["waiting_time"] = 15
 
-    return insert_row(QR_TABLE, data)
+    return data
+
+def _qr_update_defaults(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Only modify if 'waiting_time' is part of the update payload
+    if "waiting_time" in data:
+        if data["waiting_time"] is None:
+            data["waiting_time"] = 15
+
+    return data
+
+def create_qr(data: Dict[str, Any]) -> Dict:
+    """
+    Create a QR. Ensures waiting_time has a value.
+    """
+    return insert_row(QR_TABLE, _qr_create_defaults(data))
 
 def get_qrs(filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
     return select_rows(QR_TABLE, filters)
@@ -165,19 +583,38 @@ def update_qr(qr_id: int, data: Dict[str, Any]) -> Dict:
     If the key is missing (e.g. user is only updating 'name'), we do NOT overwrite
     the existing waiting_time in the database.
     """
-    # Only modify if 'waiting_time' is part of the update payload
-    if "waiting_time" in data:
-        if data["waiting_time"] is None:
-            data["waiting_time"] = 15
-
     return update_row(
         QR_TABLE,
         {"qr_id": qr_id},
-        data
+        _qr_update_defaults(data)
     )
 
 def delete_qr(qr_id: int) -> bool:
     return delete_row(
         QR_TABLE,
         {"qr_id": qr_id}
-    )
\ No newline at end of file
+    )
+
+async def create_qr_async(data: Dict[str, Any]) -> Dict:
+    """
+    Create a QR (async). Ensures waiting_time has a value.
+    """
+    return await insert_row_async(QR_TABLE, _qr_create_defaults(data))
+
+async def update_qr_async(qr_id: int, data: Dict[str, Any]) -> Dict:
+    """
+    Update a QR (async). Same waiting_time rules as `update_qr`.
+    """
+    return await update_one_async(
+        QR_TABLE,
+        {"qr_id": qr_id},
+        _qr_update_defaults(data),
+        "QR not found"
+    )
+
+async def delete_qr_async(qr_id: int) -> Dict:
+    return await delete_one_async(
+        QR_TABLE,
+        {"qr_id": qr_id},
+        "QR not found"
+    )
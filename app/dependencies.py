@@ -1,23 +1,32 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import TOKEN_CACHE_SIZE
+from app.core.security import decode_access_token
+from app.core.token_cache import TokenCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Verified tokens (expire at the token's `exp`)
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE)
+
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        role = payload.get("role")
-        if user_id is None or role is None:
+    payload = token_cache.get(token)
+
+    if payload is None:
+        try:
+            payload = decode_access_token(token)
+        except ValueError:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return {"user_id": user_id, "role": role}
-    except JWTError:
+
+        token_cache.put(token, payload)
+
+    user_id = payload.get("user_id")
+    role = payload.get("role")
+    if user_id is None or role is None:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return {"user_id": user_id, "role": role}
 
 def admin_only(user: dict = Depends(get_current_user)):
     if user["role"] != "ADMIN":
         raise HTTPException(status_code=403, detail="Only admin allowed")
     return user
-
@@ -1,7 +1,13 @@
 # app/main.py
 
-from fastapi import FastAPI, Depends
+import os
+import time
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # -----------------------------
 # Import routers
@@ -18,7 +24,47 @@ from app.routes import (
 )
 
 # Dependency for JWT authentication
-from app.dependencies import get_current_user
+from app.dependencies import admin_only, get_current_user
+
+from app.database import get_async_db, close_async_db
+from app.services.scan_ingest import scan_queue
+from app.services.report_audit_service import audit_queue
+from app.core.conditional_get import conditional_get_middleware
+from app.core.metrics import observe_request, render_prometheus, slow_queries
+from app.core.reference_cache import reference_cache
+from app.dependencies import token_cache
+from app.services.report_cache import report_cache
+
+
+# Worker threads for the remaining sync (def) handlers; Starlette's default is 40
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+# -----------------------------
+# Startup / Shutdown
+# -----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+    # Open the shared async Supabase connection pool
+    await get_async_db()
+
+    # Write-behind scan ingestion (replays anything left in the spool)
+    if scan_queue is not None:
+        await scan_queue.start()
+
+    # Batched report audit writes
+    await audit_queue.start()
+
+    yield
+
+    await audit_queue.stop()
+
+    if scan_queue is not None:
+        await scan_queue.stop()
+
+    await close_async_db()
 
 
 # -----------------------------
@@ -27,10 +73,40 @@ from app.dependencies import get_current_user
 app = FastAPI(
     title="Security Verifier API",
     version="1.0.0",
-    description="Backend API for Security Verifier system"
+    description="Backend API for Security Verifier system",
+    lifespan=lifespan
 )
 
 
+# -----------------------------
+# Conditional GET (ETag / 304) for polled lists
+# -----------------------------
+app.middleware("http")(conditional_get_middleware)
+
+
+# -----------------------------
+# Request latency (outermost, so it includes every middleware below)
+# -----------------------------
+async def request_latency_middleware(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+
+    finally:
+        # Route template, not the raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        observe_request(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            status,
+            time.perf_counter() - started,
+        )
+
+
 # -----------------------------
 # CORS (FIXED - DEV MODE)
 # -----------------------------
@@ -40,8 +116,11 @@ app.add_middleware(
     allow_credentials=False,   # Must be False when using "*"
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+app.middleware("http")(request_latency_middleware)
+
 
 # -----------------------------
 # Include routers
@@ -83,3 +162,29 @@ def root():
     return {
         "message": "Security Verifier API is running ✅"
     }
+
+
+# -----------------------------
+# Metrics (Prometheus text format, admin token required)
+# -----------------------------
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(admin_only)])
+def metrics():
+    gauges = {
+        "token_cache": token_cache.stats(),
+        "report_cache": report_cache.stats(),
+        "reference_cache": reference_cache.stats(),
+        "report_audit": audit_queue.metrics(),
+    }
+
+    if scan_queue is not None:
+        gauges["scan_ingest"] = scan_queue.metrics()
+
+    return PlainTextResponse(
+        render_prometheus(gauges),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/metrics/slow-queries", include_in_schema=False, dependencies=[Depends(admin_only)])
+def metrics_slow_queries():
+    return list(slow_queries)
@@ -1,5 +1,9 @@
 from datetime import datetime, time, timedelta, timezone
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+from app.utils.round_calendar import CALENDAR_CACHE_SIZE
+from app.utils.round_matching import classify_scan_times, to_local_naive
 
 # Define Shift Times
 DAY_START = time(6, 0)   # 06:00 AM
@@ -8,12 +12,15 @@ NIGHT_END = time(5, 30)    # 05:30 AM (Next day)
 
 GRACE_MINUTES = 10
 
-def get_expected_scan_rounds(current_date: datetime.date) -> List[Dict]:
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def get_expected_scan_rounds(current_date: datetime.date) -> Tuple[datetime, ...]:
     """
     Generates the list of times a guard IS SUPPOSED to scan
     based on the rules:
     - 6AM to 9PM: Every 1 Hour
     - 9PM to 5:30AM: Every 30 Mins
+
+    Memoized per date; returns a sorted tuple so the cached value can't be mutated.
     """
     expected_times = []
 
@@ -36,7 +43,7 @@ def get_expected_scan_rounds(current_date: datetime.date) -> List[Dict]:
         expected_times.append(dt_start)
         t += 1 # Increment by 1 hour
 
-    return sorted(expected_times)
+    return tuple(sorted(expected_times))
 
 def is_scan_on_time(scan_time: datetime, expected_time: datetime) -> bool:
     """
@@ -49,22 +56,22 @@ def is_scan_on_time(scan_time: datetime, expected_time: datetime) -> bool:
     
     return window_start <= scan_time <= window_end
 
-def analyze_guard_compliance(guard_name: str, scans: List[Dict], date_filter: datetime.date) -> Dict:
+def classify_scans(scans: List[Dict], date_filter: datetime.date) -> List[Optional[str]]:
     """
-    Analyzes a specific guard for a specific date.
-    Returns total, missed, on-time, and efficiency %.
+    Labels a whole day of scans in one pass: 'SUCCESS' when the closest
+    expected round is within the grace period, 'LATE' otherwise
+    (None for scans without a scan_time). Same order as `scans`.
     """
-    # 1. Get all expected times for this date
     expected_rounds = get_expected_scan_rounds(date_filter)
-    
-    # 2. Filter scans for this guard and date
-    guard_scans = [
-        s for s in scans 
-        if s.get('guard_name') == guard_name 
-        and s.get('scan_time').date() == date_filter
-    ]
-
-    # 3. Match expected rounds to actual scans
+    scan_times = [to_local_naive(s.get('scan_time')) for s in scans]
+
+    return classify_scan_times(scan_times, expected_rounds, GRACE_MINUTES * 60)
+
+def _compliance_stats(guard_name: str, expected_rounds: Tuple[datetime, ...], scan_times: List[datetime]) -> Dict:
+    """
+    Sweeps sorted expected rounds against one guard's sorted scan times.
+    Both lists only move forward, so this is O(rounds + scans).
+    """
     stats = {
         "guard_name": guard_name,
         "total_expected": len(expected_rounds),
@@ -74,15 +81,15 @@ def analyze_guard_compliance(guard_name: str, scans: List[Dict], date_filter: da
         "missed_details": []
     }
 
+    grace = timedelta(minutes=GRACE_MINUTES)
+    j = 0
+
     for exp_time in expected_rounds:
-        # Find if there is a scan within the window
-        found_scan = False
-        for scan in guard_scans:
-            if is_scan_on_time(scan['scan_time'], exp_time):
-                found_scan = True
-                break # Marked this round as done
-        
-        if found_scan:
+        # Skip scans that are too early for this (and every later) round
+        while j < len(scan_times) and scan_times[j] < exp_time - grace:
+            j += 1
+
+        if j < len(scan_times) and is_scan_on_time(scan_times[j], exp_time):
             stats["on_time_count"] += 1
         else:
             stats["missed_count"] += 1
@@ -91,8 +98,49 @@ def analyze_guard_compliance(guard_name: str, scans: List[Dict], date_filter: da
                 "status": "MISSED"
             })
 
-    # 4. Calculate Efficiency
+    # Calculate Efficiency
     if stats["total_expected"] > 0:
         stats["efficiency"] = round((stats["on_time_count"] / stats["total_expected"]) * 100, 2)
 
-    return stats
\ No newline at end of file
+    return stats
+
+def analyze_guards_compliance(
+    scans: List[Dict],
+    date_filter: datetime.date,
+    guard_names: Optional[List[str]] = None
+) -> Dict[str, Dict]:
+    """
+    Analyzes every guard for a specific date in one pass over `scans`.
+    Returns {guard_name: stats} with the same stats as
+    `analyze_guard_compliance`. Pass `guard_names` to also include
+    guards without any scans (they are reported as fully missed).
+    """
+    # 1. Get all expected times for this date
+    expected_rounds = get_expected_scan_rounds(date_filter)
+
+    # 2. Group scans by guard (single pass), keeping this date only
+    by_guard: Dict[str, List[datetime]] = {name: [] for name in guard_names or []}
+
+    for s in scans:
+        scan_dt = to_local_naive(s.get('scan_time'))
+        if scan_dt is None or scan_dt.date() != date_filter:
+            continue
+
+        name = s.get('guard_name')
+        if guard_names is not None and name not in by_guard:
+            continue
+
+        by_guard.setdefault(name, []).append(scan_dt)
+
+    # 3. Sort each guard's scans and sweep them against the rounds
+    return {
+        name: _compliance_stats(name, expected_rounds, sorted(times))
+        for name, times in by_guard.items()
+    }
+
+def analyze_guard_compliance(guard_name: str, scans: List[Dict], date_filter: datetime.date) -> Dict:
+    """
+    Analyzes a specific guard for a specific date.
+    Returns total, missed, on-time, and efficiency %.
+    """
+    return analyze_guards_compliance(scans, date_filter, [guard_name])[guard_name]
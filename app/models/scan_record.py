@@ -0,0 +1,59 @@
+# app/models/scan_record.py
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.report_join import parse_round_slot
+
+# The only scanning_details columns the report paths read
+SCAN_RECORD_COLUMNS = "id, qr_id, factory_code, guard_name, scan_time, lat, log, status, round_slot"
+
+
+@dataclass(frozen=True)
+class ScanRecord:
+    """
+    Compact, read-only scan row for report pipelines.
+
+    `round_start` is the parsed (IST) `round_slot`, computed once when
+    the row is loaded; `scan_time` is kept as returned for output.
+    """
+
+    # Written out rather than dataclass(slots=True), which needs 3.10+
+    __slots__ = (
+        "id", "qr_id", "factory_code", "guard_name", "scan_time",
+        "lat", "log", "status", "round_start",
+    )
+
+    id: Optional[int]
+    qr_id: Optional[str]
+    factory_code: Optional[str]
+    guard_name: Optional[str]
+    scan_time: Optional[str]
+    lat: Any
+    log: Any
+    status: Optional[str]
+    round_start: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "ScanRecord":
+        qr_id = row.get("qr_id")
+
+        return cls(
+            row.get("id"),
+            None if qr_id is None else str(qr_id),
+            row.get("factory_code"),
+            row.get("guard_name"),
+            row.get("scan_time"),
+            row.get("lat"),
+            row.get("log"),
+            row.get("status"),
+            parse_round_slot(row.get("round_slot")),
+        )
+
+
+def load_scans(rows: Optional[Iterable[Dict[str, Any]]]) -> List[ScanRecord]:
+    """
+    PostgREST rows -> ScanRecords (the dicts can be dropped right after).
+    """
+    return [ScanRecord.from_row(row) for row in rows or []]
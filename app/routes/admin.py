@@ -1,38 +1,35 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.dependencies import admin_only
-from datetime import datetime
+from datetime import date
+
+from app.services.dashboard_aggregates import dashboard_aggregates
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-# Dummy/mock data generator for dashboard
-def generate_dashboard_data():
-    return {
-        "totalGuards": 25,
-        "roundsToday": {"completed": 18, "scheduled": 20},
-        "missedRounds": 2,
-        "activeAlerts": 3,
-        "roundStatusData": [
-            {"site": "Site A", "completed": 5, "missed": 1},
-            {"site": "Site B", "completed": 7, "missed": 0},
-        ],
-        "averageRoundTime": 42,
-        "targetRoundTime": 45,
-        "attendanceData": [
-            {"date": "2026-01-16", "present": 20, "absent": 5},
-            {"date": "2026-01-17", "present": 22, "absent": 3},
-        ],
-        "completionData": [
-            {"date": "2026-01-16", "completedRounds": 18, "scheduledRounds": 20},
-            {"date": "2026-01-17", "completedRounds": 19, "scheduledRounds": 20},
-        ],
-    }
+# Dashboard numbers come from the counters the database maintains
+async def generate_dashboard_data():
+    return await dashboard_aggregates.dashboard()
 
 @router.get("/dashboard")
-def get_dashboard(current_user: dict = Depends(admin_only)):
+async def get_dashboard(current_user: dict = Depends(admin_only)):
     """
     Admin dashboard data endpoint.
     Only accessible by admins.
     """
-    data = generate_dashboard_data()
+    data = await generate_dashboard_data()
     return data
 
+@router.post("/dashboard/rebuild")
+async def rebuild_dashboard(
+    from_date: date = Query(...),
+    to_date: date = Query(...),
+    current_user: dict = Depends(admin_only)
+):
+    """
+    Recompute dashboard counters for a date range from scanning data
+    (first install / backfills / after deleting scans).
+    """
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must be on or before to_date")
+
+    return await dashboard_aggregates.rebuild(from_date, to_date)
@@ -1,13 +1,13 @@
 # app/routes/auth.py
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from datetime import timedelta
 
 from app.core.security import create_access_token
-from app.database import get_db
+from app.services.login_service import authenticate, LoginRateLimited
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -25,39 +25,23 @@ class LoginRequest(BaseModel):
 # Login Route (DB BASED)
 # ----------------------
 @router.post("/login")
-async def login(
-    payload: LoginRequest,
-    db=Depends(get_db)
-):
+async def login(payload: LoginRequest):
 
     try:
 
         # ==============================
-        # 1. Fetch user from DB
+        # 1-2. Fetch user (cached) + verify PIN (bcrypt off the event loop)
         # ==============================
-        res = (
-            db.table("login_info")   # 👈 CHANGE if your table name is different
-            .select("user_id, user_pin, name, role")
-            .eq("user_id", payload.user_id)
-            .limit(1)
-            .execute()
-        )
-
-        users = res.data or []
-
-        if not users:
+        try:
+            user = await authenticate(payload.user_id, payload.user_pin)
+        except LoginRateLimited as e:
             raise HTTPException(
-                status_code=401,
-                detail="Invalid User ID or Password"
+                status_code=429,
+                detail="Too many login attempts. Try again later.",
+                headers={"Retry-After": str(e.retry_after)}
             )
 
-        user = users[0]
-
-
-        # ==============================
-        # 2. Verify PIN
-        # ==============================
-        if user["user_pin"] != payload.user_pin:
+        if user is None:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid User ID or Password"
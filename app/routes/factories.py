@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, status
-from app.database import supabase
+from fastapi import APIRouter, HTTPException, Request, status
+from app.database import supabase, update_one, delete_one
+from app.core.reference_cache import reference_cache, cached_json_response
 from app.schemas.factory import FactoryCreate, FactoryResponse
+from app.services.report_cache import report_cache
 
 
 router = APIRouter(
@@ -33,14 +35,15 @@ def create_factory(payload: FactoryCreate):
     if not result.data:
         raise HTTPException(500, "Failed to create factory")
 
+    reference_cache.invalidate("factories")
+
     return result.data[0]
 
 
 # ---------------------------
 # GET ALL Factories
 # ---------------------------
-@router.get("", response_model=list[FactoryResponse])
-def get_factories():
+def _load_factories():
 
     result = (
         supabase
@@ -49,14 +52,24 @@ def get_factories():
         .execute()
     )
 
-    return result.data or []
+    return [
+        FactoryResponse.model_validate(row).model_dump()
+        for row in result.data or []
+    ]
+
+
+@router.get("", response_model=list[FactoryResponse])
+def get_factories(request: Request):
+
+    entry = reference_cache.get_or_load(("factories", "all"), _load_factories)
+
+    return cached_json_response(request, entry)
 
 
 # ---------------------------
 # GET Minimal (Dropdown)
 # ---------------------------
-@router.get("/minimal")
-def get_factories_minimal():
+def _load_factories_minimal():
 
     result = (
         supabase
@@ -68,6 +81,14 @@ def get_factories_minimal():
     return result.data or []
 
 
+@router.get("/minimal")
+def get_factories_minimal(request: Request):
+
+    entry = reference_cache.get_or_load(("factories", "minimal"), _load_factories_minimal)
+
+    return cached_json_response(request, entry)
+
+
 # ---------------------------
 # GET Single Factory
 # ---------------------------
@@ -94,15 +115,7 @@ def get_factory(factory_code: str):
 @router.put("/{factory_code}", response_model=FactoryResponse)
 def update_factory(factory_code: str, payload: FactoryCreate):
 
-    existing = supabase.table("factories") \
-        .select("*") \
-        .eq("factory_code", factory_code) \
-        .execute()
-
-    if not existing.data:
-        raise HTTPException(404, "Factory not found")
-
-    result = supabase.table("factories").update({
+    updated = update_one("factories", {"factory_code": factory_code}, {
 
         "factory_name": payload.factory_name,
 
@@ -112,12 +125,14 @@ def update_factory(factory_code: str, payload: FactoryCreate):
         # ✅ UPDATE REAL ADDRESS
         "factory_address": payload.factory_address,
 
-    }).eq("factory_code", factory_code).execute()
+    }, "Factory not found")
 
-    if not result.data:
-        raise HTTPException(500, "Failed to update factory")
+    reference_cache.invalidate("factories")
 
-    return result.data[0]
+    # Name / address are in every report header
+    report_cache.invalidate(factory_code)
+
+    return updated
 
 
 # ---------------------------
@@ -126,17 +141,9 @@ def update_factory(factory_code: str, payload: FactoryCreate):
 @router.delete("/{factory_code}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_factory(factory_code: str):
 
-    existing = supabase.table("factories") \
-        .select("*") \
-        .eq("factory_code", factory_code) \
-        .execute()
-
-    if not existing.data:
-        raise HTTPException(404, "Factory not found")
+    delete_one("factories", {"factory_code": factory_code}, "Factory not found")
 
-    supabase.table("factories") \
-        .delete() \
-        .eq("factory_code", factory_code) \
-        .execute()
+    reference_cache.invalidate("factories")
+    report_cache.invalidate(factory_code)
 
     return {"message": "Factory deleted successfully"}
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, status
-from app.database import insert_row, select_rows, create_qr, update_qr, delete_row
+from fastapi import APIRouter, HTTPException, Request, status
+from app.database import select_rows_async, create_qr_async, update_qr_async, delete_qr_async
+from app.core.reference_cache import reference_cache, cached_json_response
+from app.services.report_cache import report_cache
 
 router = APIRouter(
     prefix="/qr",
@@ -9,11 +11,23 @@ router = APIRouter(
 TABLE = "qr"
 
 
+def _invalidate_reports(row, data: dict | None = None):
+    """
+    Reports list every QR of the factory, so a QR write drops that
+    factory's cached reports. Moving a QR to another factory drops them
+    all (the old factory_code isn't known here).
+    """
+    if data and "factory_code" in data:
+        report_cache.invalidate_all()
+    elif isinstance(row, dict) and row.get("factory_code"):
+        report_cache.invalidate(row["factory_code"])
+
+
 # ---------------------------
 # CREATE QR
 # ---------------------------
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def create_qr_endpoint(data: dict):
+async def create_qr_endpoint(data: dict):
     """
     Create a new QR code.
     """
@@ -35,7 +49,10 @@ def create_qr_endpoint(data: dict):
         )
 
     # Create QR using helper
-    result = create_qr(data)
+    result = await create_qr_async(data)
+
+    reference_cache.invalidate(TABLE)
+    _invalidate_reports(result)
 
     return result
 
@@ -44,17 +61,20 @@ def create_qr_endpoint(data: dict):
 # GET QR BY FACTORY
 # ---------------------------
 @router.get("/factory/{factory_code}")
-def get_qr_by_factory(factory_code: str):
-    results = select_rows(TABLE, {"factory_code": factory_code})
-    return results or []
+async def get_qr_by_factory(factory_code: str, request: Request):
+    async def load():
+        return await select_rows_async(TABLE, {"factory_code": factory_code}) or []
+
+    entry = await reference_cache.get_or_load_async((TABLE, factory_code), load)
+    return cached_json_response(request, entry)
 
 
 # ---------------------------
 # GET QR BY ID
 # ---------------------------
 @router.get("/{qr_id}")
-def get_qr_by_id(qr_id: int):
-    rows = select_rows(TABLE, {"qr_id": qr_id})
+async def get_qr_by_id(qr_id: int):
+    rows = await select_rows_async(TABLE, {"qr_id": qr_id})
     if not rows:
         raise HTTPException(status_code=404, detail="QR not found")
     return rows[0]
@@ -64,7 +84,7 @@ def get_qr_by_id(qr_id: int):
 # UPDATE QR
 # ---------------------------
 @router.put("/{qr_id}")
-def update_qr_endpoint(qr_id: int, data: dict):
+async def update_qr_endpoint(qr_id: int, data: dict):
     """
     Update a QR code
     """
@@ -79,10 +99,13 @@ def update_qr_endpoint(qr_id: int, data: dict):
                 detail="waiting_time must be a non-negative integer"
             )
 
-    try:
-        updated = update_qr(qr_id, data)
-    except RuntimeError:
-        raise HTTPException(status_code=404, detail="QR not found or update failed")
+    if not data:
+        raise HTTPException(status_code=400, detail="No fields provided for update")
+
+    updated = await update_qr_async(qr_id, data)
+
+    reference_cache.invalidate(TABLE)
+    _invalidate_reports(updated, data)
 
     if isinstance(updated, dict):
         return [updated]
@@ -94,9 +117,10 @@ def update_qr_endpoint(qr_id: int, data: dict):
 # DELETE QR
 # ---------------------------
 @router.delete("/{qr_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_qr_endpoint(qr_id: int):
-    success = delete_row(TABLE, {"qr_id": qr_id})
-    if not success:
-        raise HTTPException(status_code=404, detail="QR not found")
+async def delete_qr_endpoint(qr_id: int):
+    deleted = await delete_qr_async(qr_id)
+
+    reference_cache.invalidate(TABLE)
+    _invalidate_reports(deleted)
 
     return {"message": "Deleted successfully"}
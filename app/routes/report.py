@@ -1,17 +1,28 @@
 # app/routes/report.py
 
-from fastapi import APIRouter, Depends, Query
-from datetime import datetime
-import pytz
-
-from app.database import get_db
+from datetime import date, timedelta
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import REPORT_SCANS_TABLE, get_db
+from app.models.scan_record import SCAN_RECORD_COLUMNS, load_scans
+from app.dependencies import get_current_user
+from app.schemas.report_download import ReportDownloadRequest
+from app.services.security_analytics_service import stream_report_download
+from app.services.range_report_service import (
+    MAX_RANGE_DAYS,
+    build_download_row,
+    stream_range_report,
+)
 from app.utils.round_slots import generate_round_slots
+from app.utils.report_join import join_report
+from app.utils.parallel_fetch import fetch_parallel
 
 
 router = APIRouter(prefix="/report", tags=["Report"])
 
-IST = pytz.timezone("Asia/Kolkata")
-
 
 @router.get("/download")
 def download_report(
@@ -29,115 +40,120 @@ def download_report(
 
 
         # ==============================
-        # 2. Fetch QR codes
+        # 2. Fetch QR codes + scan logs (concurrently)
         # ==============================
-        qr_codes = (
-            db.table("qr")
-            .select("qr_id, qr_name")
-            .eq("factory_code", factory_code)
-            .execute()
-            .data or []
+        results = fetch_parallel(
+            {
+                "qr": lambda: (
+                    db.table("qr")
+                    .select("qr_id, qr_name")
+                    .eq("factory_code", factory_code)
+                    .execute()
+                    .data or []
+                ),
+                "scans": lambda: load_scans(
+                    db.table(REPORT_SCANS_TABLE)
+                    .select(SCAN_RECORD_COLUMNS)
+                    .eq("factory_code", factory_code)
+                    .gte("scan_time", f"{report_date}T00:00:00+05:30")
+                    .lte("scan_time", f"{report_date}T23:59:59+05:30")
+                    .execute()
+                    .data
+                ),
+            },
+            fetch="report_download",
         )
 
-
-        # ==============================
-        # 3. Fetch scan logs
-        # ==============================
-        scans = (
-            db.table("scanning_details")
-            .select("id, qr_id, guard_name, scan_time, lat, log, status, round_slot")
-            .eq("factory_code", factory_code)
-            .gte("scan_time", f"{report_date}T00:00:00+05:30")
-            .lte("scan_time", f"{report_date}T23:59:59+05:30")
-            .execute()
-            .data or []
-        )
-
-
-        # ==============================
-        # 4. Parse round_slot
-        # ==============================
-        for s in scans:
-
-            rs = s.get("round_slot")
-
-            if not rs:
-                s["round_dt"] = None
-                continue
-
-            dt = datetime.fromisoformat(rs.replace("Z", "+00:00"))
-
-            if dt.tzinfo is None:
-                dt = IST.localize(dt)
-            else:
-                dt = dt.astimezone(IST)
-
-            s["round_dt"] = dt
+        qr_codes = results["qr"]
+        scans = results["scans"]
 
 
         # ==============================
-        # 5. Build report
+        # 3. Join QR x rounds against indexed scans
         # ==============================
-        report = []
-
-
-        for qr in qr_codes:
-
-            qr_id = str(qr["qr_id"])   # normalize
-
-
-            for round_no, start_dt, end_dt in round_slots:
-
-                scan = next(
-                    (
-                        s for s in scans
-                        if str(s.get("qr_id")) == qr_id
-                        and s.get("round_dt") == start_dt
-                    ),
-                    None
-                )
-
+        report = join_report(qr_codes, round_slots, scans, build_download_row)
 
-                # Normalize status
-                if scan:
 
-                    raw = (scan.get("status") or "").lower()
-
-                    if raw in ["success", "completed", "done"]:
-                        status = "SUCCESS"
-                    else:
-                        status = "MISSED"
+        return report
 
-                else:
-                    status = "MISSED"
 
+    except Exception as e:
 
-                report.append({
+        print("❌ REPORT ERROR:", e)
 
-                    "qr_name": qr["qr_name"],
+        return {
+            "success": False,
+            "message": str(e)
+        }
 
-                    "round": round_no,
 
-                    "scan_time": scan.get("scan_time") if scan else None,
+@router.get("/download/pdf")
+def download_report_pdf(
+    factory_code: str = Query(...),
+    report_date: str = Query(...),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Patrol report as a PDF, streamed from a per-request temp file.
+    """
 
-                    "lat": scan.get("lat") if scan else None,
+    payload = ReportDownloadRequest(
+        factory_code=factory_code,
+        report_date=report_date,
+        downloaded_by=current_user["user_id"],
+    )
 
-                    "lon": scan.get("log") if scan else None,
+    try:
+        chunks, file_name = stream_report_download(payload)
 
-                    "guard_name": scan.get("guard_name") if scan else None,
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-                    "status": status,
-                })
+    except Exception as e:
+        print("❌ REPORT PDF ERROR:", e)
+        raise HTTPException(status_code=500, detail="Failed to generate report")
 
+    return StreamingResponse(
+        chunks,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
 
-        return report
 
+RANGE_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
 
-    except Exception as e:
 
-        print("❌ REPORT ERROR:", e)
+@router.get("/range")
+async def download_range_report(
+    from_date: date = Query(...),
+    to_date: date = Query(...),
+    factory_codes: List[str] = Query(...),
+    format: str = Query("json", pattern="^(csv|ndjson|json)$"),
+):
+    """
+    /report/download rows for several factories over a date range,
+    streamed as csv, ndjson or a json array. A fetch that fails
+    mid-stream ends the body with an {"error", "next_cursor"} record.
+    """
+
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must be on or before to_date")
+
+    if to_date - from_date >= timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+    headers = {}
+    if format == "csv":
+        headers["Content-Disposition"] = (
+            f'attachment; filename="patrol_report_{from_date}_{to_date}.csv"'
+        )
 
-        return {
-            "success": False,
-            "message": str(e)
-        }
+    return StreamingResponse(
+        stream_range_report(factory_codes, from_date, to_date, format),
+        media_type=RANGE_MEDIA_TYPES[format],
+        headers=headers,
+    )
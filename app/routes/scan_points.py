@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from app.database import supabase
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from app.database import supabase, update_one, delete_one
+from app.core.reference_cache import reference_cache, cached_json_response
 from app.schemas.scan_point import ScanPointCreate, ScanPointUpdate, ScanPointResponse
 
 router = APIRouter(
@@ -38,18 +39,23 @@ def create_scan_point(payload: ScanPointCreate):
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create scan point")
 
+    reference_cache.invalidate("scan_points")
     return result.data[0]
 
 # ---------------------------
 # GET all scan points (optionally filter by factory)
 # ---------------------------
 @router.get("", response_model=list[ScanPointResponse])
-def get_scan_points(factory_id: str = Query(None, description="Filter by Factory ID")):
-    query = supabase.table("scan_points").select("*")
-    if factory_id:
-        query = query.eq("factory_id", factory_id)
-    result = query.execute()
-    return result.data or []
+def get_scan_points(request: Request, factory_id: str = Query(None, description="Filter by Factory ID")):
+    def load():
+        query = supabase.table("scan_points").select("*")
+        if factory_id:
+            query = query.eq("factory_id", factory_id)
+        result = query.execute()
+        return [ScanPointResponse.model_validate(row).model_dump() for row in result.data or []]
+
+    entry = reference_cache.get_or_load(("scan_points", factory_id or ""), load)
+    return cached_json_response(request, entry)
 
 # ---------------------------
 # GET scan point by ID
@@ -66,29 +72,20 @@ def get_scan_point(scan_point_id: str):
 # ---------------------------
 @router.put("/{scan_point_id}", response_model=ScanPointResponse)
 def update_scan_point(scan_point_id: str, payload: ScanPointUpdate):
-    existing = supabase.table("scan_points").select("*").eq("id", scan_point_id).execute()
-    if not existing.data:
-        raise HTTPException(status_code=404, detail="Scan Point not found")
-
     update_data = payload.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields provided for update")
 
-    # ✅ Fixed: use returning='representation'
-    result = supabase.table("scan_points").update(update_data, returning="representation").eq("id", scan_point_id).execute()
-    if not result.data:
-        raise HTTPException(status_code=500, detail="Failed to update scan point")
+    updated = update_one("scan_points", {"id": scan_point_id}, update_data, "Scan Point not found")
 
-    return result.data[0]
+    reference_cache.invalidate("scan_points")
+    return updated
 
 # ---------------------------
 # DELETE scan point
 # ---------------------------
 @router.delete("/{scan_point_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_scan_point(scan_point_id: str):
-    existing = supabase.table("scan_points").select("*").eq("id", scan_point_id).execute()
-    if not existing.data:
-        raise HTTPException(status_code=404, detail="Scan Point not found")
-
-    supabase.table("scan_points").delete().eq("id", scan_point_id).execute()
+    delete_one("scan_points", {"id": scan_point_id}, "Scan Point not found")
+    reference_cache.invalidate("scan_points")
     return None
@@ -1,18 +1,30 @@
 # app/routes/scanning_details.py
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-from datetime import datetime
+import json
 
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, List, Optional
+from datetime import date
+from pydantic import ValidationError
+
+from app.core.conditional_get import bump_write_version
 from app.database import (
-    create_scan_log,
-    get_all_scan_logs,
-    get_scan_logs_by_factory,
-    get_scan_logs_by_guard,
-    delete_scan_log,
+    SCANNING_TABLE,
+    create_scan_log_async,
+    get_scan_logs_page_async,
+    iter_scan_log_pages_async,
+    delete_scan_log_async,
 )
 
-from app.schemas.scanning_details import ScanCreate, ScanResponse
+from app.schemas.scanning_details import (
+    ScanCreate,
+    ScanResponse,
+    ScanBatchItem,
+    ScanBatchResponse,
+)
+from app.services import scan_export, scan_ingest
+from app.services.scan_ingest import ingest_scans, after_scans_stored
 
 
 router = APIRouter(
@@ -20,6 +32,19 @@ router = APIRouter(
     tags=["Scanning Details"]
 )
 
+# Rows per page for GET /scans (and per fetch when streaming)
+SCAN_PAGE_SIZE = 500
+MAX_SCAN_PAGE_SIZE = 1000
+
+# Max scans accepted by POST /scans/batch
+MAX_SCAN_BATCH = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 
 # --------------------------------------------------
 # HELPER
@@ -29,23 +54,37 @@ def to_scan_response(data: dict) -> ScanResponse:
     return ScanResponse(**data)
 
 
+def to_scan_row(scan: ScanCreate) -> dict:
+    scan_data = scan.model_dump(mode="json")
+
+    # No client time -> leave scan_time to the DB default (insert time)
+    if scan_data.get("scan_time") is None:
+        scan_data.pop("scan_time", None)
+
+    return scan_data
+
+
 # --------------------------------------------------
 # CREATE SCAN
 # --------------------------------------------------
 
 @router.post("/", response_model=ScanResponse, status_code=201)
-def create_scan(scan: ScanCreate):
+async def create_scan(scan: ScanCreate):
 
     try:
-        scan_data = scan.dict()
+        scan_data = to_scan_row(scan)
+
+        # Write-behind mode: acknowledge once the scan is spooled locally
+        if scan_ingest.scan_queue is not None:
+            queued = await scan_ingest.scan_queue.enqueue(scan_data)
+            return JSONResponse(
+                status_code=202,
+                content={"queued": True, **queued}
+            )
 
-        # Add timestamp if DB doesn't auto-generate
-        scan_data.setdefault(
-            "created_at",
-            datetime.utcnow().isoformat()
-        )
+        result = await create_scan_log_async(scan_data)
 
-        result = create_scan_log(scan_data)
+        after_scans_stored([result])
 
         return to_scan_response(result)
 
@@ -54,26 +93,126 @@ def create_scan(scan: ScanCreate):
         raise HTTPException(status_code=500, detail="Failed to create scan")
 
 
+# --------------------------------------------------
+# CREATE SCANS (BATCH / OFFLINE SYNC)
+# --------------------------------------------------
+
+@router.post("/batch", response_model=ScanBatchResponse)
+async def create_scans_batch(items: List[Dict[str, Any]]):
+    """
+    Store queued scans from a phone in one request.
+
+    Every item is validated on its own; invalid items are reported and
+    the rest are still stored. Items carrying an `idempotency_key` that
+    was already stored come back as "duplicate" instead of being
+    inserted again, so a retried batch is cheap.
+
+    Items should carry the `scan_time` recorded on the phone (with its
+    UTC offset) so replayed scans land in the round they were made in.
+    """
+
+    if len(items) > MAX_SCAN_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_SCAN_BATCH} scans per batch"
+        )
+
+    results: List[Optional[dict]] = [None] * len(items)
+    rows = []
+    row_index = []
+
+    # 1. Validate (single pass)
+    for i, item in enumerate(items):
+        try:
+            scan = ScanBatchItem.model_validate(item)
+        except ValidationError as e:
+            results[i] = {
+                "status": "invalid",
+                "idempotency_key": item.get("idempotency_key") if isinstance(item, dict) else None,
+                "detail": str(e.errors()[0].get("msg")) if e.errors() else "Invalid scan",
+            }
+            continue
+
+        rows.append(to_scan_row(scan))
+        row_index.append(i)
+
+    # 2. Deduplicate + multi-row insert
+    try:
+        stored = await ingest_scans(rows)
+    except Exception as e:
+        print("Batch scan error:", e)
+        raise HTTPException(status_code=500, detail="Failed to store scans")
+
+    for i, result in zip(row_index, stored):
+        results[i] = result
+
+    for i, result in enumerate(results):
+        result["index"] = i
+
+    return {
+        "created": sum(r["status"] == "created" for r in results),
+        "duplicates": sum(r["status"] == "duplicate" for r in results),
+        "failed": sum(r["status"] in ("failed", "invalid") for r in results),
+        "results": results,
+    }
+
+
+# --------------------------------------------------
+# INGESTION QUEUE METRICS
+# --------------------------------------------------
+
+@router.get("/ingest/metrics")
+def scan_ingest_metrics():
+    if scan_ingest.scan_queue is None:
+        return {"mode": scan_ingest.SCAN_INGEST_MODE}
+
+    return scan_ingest.scan_queue.metrics()
+
+
 # --------------------------------------------------
 # READ SCANS
 # --------------------------------------------------
 
 @router.get("/", response_model=List[ScanResponse])
-def read_scans(
+async def read_scans(
+    response: Response,
     factory_code: Optional[str] = None,
-    guard_name: Optional[str] = None
+    guard_name: Optional[str] = None,
+    cursor: Optional[int] = Query(
+        None,
+        description="Return scans with id greater than this (X-Next-Cursor of the previous page)"
+    ),
+    limit: int = Query(SCAN_PAGE_SIZE, ge=1, le=MAX_SCAN_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
 ):
+    """
+    Keyset-paginated scan list ordered by id.
 
-    try:
+    - json: one page of `limit` scans; `X-Next-Cursor` is set when more remain
+    - ndjson: streams every scan after `cursor`, one JSON object per line,
+      fetching `limit` rows per page
+    """
+
+    filters = {}
+
+    if factory_code:
+        filters["factory_code"] = factory_code
+
+    if guard_name:
+        filters["guard_name"] = guard_name
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_scans(filters, cursor, limit),
+            media_type="application/x-ndjson"
+        )
 
-        if factory_code:
-            data = get_scan_logs_by_factory(factory_code)
+    try:
 
-        elif guard_name:
-            data = get_scan_logs_by_guard(guard_name)
+        data = await get_scan_logs_page_async(filters, cursor, limit)
 
-        else:
-            data = get_all_scan_logs()
+        if len(data) == limit:
+            response.headers["X-Next-Cursor"] = str(data[-1]["id"])
 
         return [to_scan_response(item) for item in data]
 
@@ -82,25 +221,119 @@ def read_scans(
         raise HTTPException(status_code=500, detail="Failed to fetch scans")
 
 
+async def _stream_scans(filters: dict, cursor: Optional[int], page_size: int):
+    """
+    NDJSON body for GET /scans?format=ndjson.
+
+    The 200 is already on the wire when a page fetch fails, so the
+    failure is reported in-band: the last line is
+    {"error": ..., "next_cursor": <last id sent>} and clients resume
+    from that cursor. A stream without it ended normally.
+    """
+
+    last_id = cursor
+
+    try:
+
+        async for page in iter_scan_log_pages_async(filters, cursor, page_size):
+            yield "".join(
+                to_scan_response(item).model_dump_json() + "\n"
+                for item in page
+            )
+
+            if page:
+                last_id = page[-1]["id"]
+
+    except Exception as e:
+        print("Stream scans error:", e)
+        yield json.dumps({
+            "error": "Failed to fetch scans",
+            "next_cursor": last_id,
+        }) + "\n"
+
+
+# --------------------------------------------------
+# EXPORT SCANS
+# --------------------------------------------------
+
+@router.get("/export")
+async def export_scans(
+    factory_code: Optional[str] = None,
+    guard_name: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    format: str = Query("csv", pattern="^(csv|arrow|parquet)$"),
+    page_size: int = Query(scan_export.EXPORT_PAGE_SIZE, ge=1, le=MAX_SCAN_PAGE_SIZE),
+):
+    """
+    Stream scans as CSV, Arrow IPC stream or Parquet.
+
+    Rows are fetched `page_size` at a time and encoded page by page
+    (one Arrow record batch / Parquet row group per page).
+    Dates are IST calendar days, both inclusive.
+    """
+
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must be on or before to_date")
+
+    if format != "csv":
+        try:
+            scan_export.require_pyarrow()
+        except ImportError:
+            raise HTTPException(
+                status_code=501,
+                detail=f"{format} export requires pyarrow on the server"
+            )
+
+    pages = scan_export.iter_export_pages(
+        factory_code, guard_name, from_date, to_date, page_size
+    )
+
+    if format == "csv":
+        body = scan_export.iter_csv(pages)
+    else:
+        body = scan_export.iter_columnar(pages, format)
+
+    filename = f"scans_{factory_code or 'all'}_{from_date or 'start'}_{to_date or 'end'}.{format}"
+
+    return StreamingResponse(
+        _stream_export(body),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+async def _stream_export(body):
+
+    try:
+
+        async for chunk in body:
+            if chunk:
+                yield chunk
+
+    except Exception as e:
+        # Headers are already sent; end the stream early
+        print("Export scans error:", e)
+
+
 # --------------------------------------------------
 # DELETE SCAN
 # --------------------------------------------------
 
 @router.delete("/{scan_id}", status_code=204)
-def delete_scan(scan_id: int):
+async def delete_scan(scan_id: int):
 
     try:
 
-        success = delete_scan_log(scan_id)
+        await delete_scan_log_async(scan_id)
 
-        if not success:
-            raise HTTPException(
-                status_code=404,
-                detail="Scan not found"
-            )
+        bump_write_version(SCANNING_TABLE)
 
         return None
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         print("Delete scan error:", e)
         raise HTTPException(status_code=500, detail="Failed to delete scan")
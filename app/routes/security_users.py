@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from app.database import supabase  # Supabase client
+from app.database import supabase, update_one, delete_one  # Supabase client
+from app.core.conditional_get import bump_write_version
+from app.services.login_service import invalidate_login_user
 
 
 # -----------------------------
@@ -102,6 +104,8 @@ def create_security_user(payload: SecurityUserCreate):
         .insert(data) \
         .execute()
 
+    bump_write_version("security_users")
+
     return result.data[0]
 
 
@@ -112,26 +116,26 @@ def create_security_user(payload: SecurityUserCreate):
 @router.put("/{security_id}", response_model=SecurityUserResponse)
 def update_security_user(security_id: str, payload: SecurityUserUpdate):
 
-    # Check exists
-    existing = supabase.table("security_users") \
-        .select("*") \
-        .eq("security_id", security_id) \
-        .execute()
-
-    if not existing.data:
-        raise HTTPException(404, "Security user not found")
-
     update_data = payload.dict(
         exclude_unset=True,
         exclude_none=True
     )
 
-    result = supabase.table("security_users") \
-        .update(update_data) \
-        .eq("security_id", security_id) \
-        .execute()
+    if not update_data:
+        raise HTTPException(400, "No fields provided for update")
 
-    return result.data[0]
+    updated = update_one(
+        "security_users",
+        {"security_id": security_id},
+        update_data,
+        "Security user not found"
+    )
+
+    bump_write_version("security_users")
+    # The login cache is keyed by login_info.user_id, not security_id
+    invalidate_login_user()
+
+    return updated
 
 
 # -----------------------------
@@ -141,17 +145,14 @@ def update_security_user(security_id: str, payload: SecurityUserUpdate):
 @router.delete("/{security_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_security_user(security_id: str):
 
-    existing = supabase.table("security_users") \
-        .select("*") \
-        .eq("security_id", security_id) \
-        .execute()
-
-    if not existing.data:
-        raise HTTPException(404, "Security user not found")
+    delete_one(
+        "security_users",
+        {"security_id": security_id},
+        "Security user not found"
+    )
 
-    supabase.table("security_users") \
-        .delete() \
-        .eq("security_id", security_id) \
-        .execute()
+    bump_write_version("security_users")
+    # The login cache is keyed by login_info.user_id, not security_id
+    invalidate_login_user()
 
     return
@@ -1,9 +1,28 @@
-from datetime import datetime
-import pytz
-
+from app.database import REPORT_SCANS_TABLE
+from app.models.scan_record import SCAN_RECORD_COLUMNS, ScanRecord, load_scans
 from app.utils.round_slots import generate_round_slots
+from app.utils.report_join import join_report
+from app.utils.parallel_fetch import fetch_parallel
+
+
+def _build_row(qr: dict, round_no: int, scan: ScanRecord | None) -> dict:
+
+    return {
+
+        "qr_name": qr.get("qr_name"),
+
+        "round": round_no,
 
-IST = pytz.timezone("Asia/Kolkata")
+        "scan_time": scan.scan_time if scan else None,
+
+        "lat": scan.lat if scan else None,
+
+        "log": scan.log if scan else None,
+
+        "guard_name": scan.guard_name if scan else None,
+
+        "status": "SUCCESS" if scan else "FAILED",
+    }
 
 
 # -----------------------------
@@ -16,17 +35,42 @@ def generate_report(db, factory_code: str, report_date: str):
 
 
     # ==============================
-    # 1️⃣ Fetch factory details
+    # 1️⃣ Fetch factory, QR codes and scans (concurrently)
     # ==============================
-    factory = (
-        db.table("factories")
-        .select("factory_name, factory_address")
-        .eq("factory_code", factory_code)
-        .single()
-        .execute()
-        .data
+    results = fetch_parallel(
+        {
+            "factory": lambda: (
+                db.table("factories")
+                .select("factory_name, factory_address")
+                .eq("factory_code", factory_code)
+                .single()
+                .execute()
+                .data
+            ),
+            "qr": lambda: (
+                db.table("qr")
+                .select("qr_id, qr_name")
+                .eq("factory_code", factory_code)
+                .execute()
+                .data or []
+            ),
+            "scans": lambda: load_scans(
+                db.table(REPORT_SCANS_TABLE)
+                .select(SCAN_RECORD_COLUMNS)
+                .eq("factory_code", factory_code)
+                .gte("scan_time", f"{report_date}T00:00:00+05:30")
+                .lte("scan_time", f"{report_date}T23:59:59+05:30")
+                .execute()
+                .data
+            ),
+        },
+        fetch="report_schema",
     )
 
+    factory = results["factory"]
+    qr_codes = results["qr"]
+    scans = results["scans"]
+
     if not factory:
         raise ValueError("Factory not found")
 
@@ -38,102 +82,13 @@ def generate_report(db, factory_code: str, report_date: str):
 
 
     # ==============================
-    # 3️⃣ Fetch QR codes
+    # 3️⃣ Join QR x rounds on the scan index (KEY STEP 🚀)
     # ==============================
-    qr_codes = (
-        db.table("qr")
-        .select("qr_id, qr_name")
-        .eq("factory_code", factory_code)
-        .execute()
-        .data or []
-    )
-
-
-    # ==============================
-    # 4️⃣ Fetch scans
-    # ==============================
-    scans = (
-        db.table("scanning_details")
-        .select("*")
-        .eq("factory_code", factory_code)
-        .gte("scan_time", f"{report_date}T00:00:00+05:30")
-        .lte("scan_time", f"{report_date}T23:59:59+05:30")
-        .execute()
-        .data or []
-    )
-
-
-    # ==============================
-    # 5️⃣ Index scans (KEY STEP 🚀)
-    # ==============================
-    scan_map = {}
-
-    for s in scans:
-
-        rs = s.get("round_slot")
-
-        if not rs:
-            continue
-
-        # Normalize datetime
-        dt = datetime.fromisoformat(rs.replace("Z", "+00:00"))
-
-        if dt.tzinfo is None:
-            dt = IST.localize(dt)
-        else:
-            dt = dt.astimezone(IST)
-
-        key = (str(s.get("qr_id")), dt)
-
-        scan_map[key] = s
-
-
-    # ==============================
-    # 6️⃣ Build report (FAST)
-    # ==============================
-    report = []
-
-
-    for qr in qr_codes:
-
-        qr_id = str(qr.get("qr_id"))
-
-        for round_no, start_dt, end_dt in round_slots:
-
-            key = (qr_id, start_dt)
-
-            scan = scan_map.get(key)
-
-
-            # --------------------------
-            # Status
-            # --------------------------
-            if scan:
-                status = "SUCCESS"
-            else:
-                status = "FAILED"
-
-
-            report.append({
-
-                "qr_name": qr.get("qr_name"),
-
-                "round": round_no,
-
-                "scan_time": scan.get("scan_time") if scan else None,
-
-                "lat": scan.get("lat") if scan else None,
-
-                "log": scan.get("log") if scan else None,
-
-                "guard_name": scan.get("guard_name") if scan else None,
-
-                "status": status,
-            })
+    report = join_report(qr_codes, round_slots, scans, _build_row)
 
 
     # ==============================
-    # 7️⃣ Final response
+    # 4️⃣ Final response
     # ==============================
     return {
 
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
 from datetime import datetime
 
+from app.utils.round_matching import IST
+
 class ScanCreate(BaseModel):
     guard_name: Optional[str]
     qr_id: Optional[str]
@@ -10,10 +12,38 @@ class ScanCreate(BaseModel):
     log: Optional[float]
     status: Optional[str]
     factory_code: Optional[str]
+    # When the guard scanned (phone clock). Omitted -> the DB stamps the
+    # insert time. Offline replays must send it.
+    scan_time: Optional[datetime] = None
+
+    @field_validator("scan_time")
+    @classmethod
+    def _naive_scan_time_is_ist(cls, value):
+        # Older clients send IST wall-clock time without an offset
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=IST)
+        return value
 
 class ScanResponse(ScanCreate):
     id: int
     scan_time: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ScanBatchItem(ScanCreate):
+    # Client-generated key; replays with the same key are not inserted twice
+    idempotency_key: Optional[str] = None
+
+class ScanBatchResult(BaseModel):
+    index: int
+    status: str  # created | duplicate | invalid | failed
+    id: Optional[int] = None
+    idempotency_key: Optional[str] = None
+    detail: Optional[str] = None
+
+class ScanBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[ScanBatchResult]
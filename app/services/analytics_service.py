@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+import time as time_module
 from app.database import supabase 
+from app.utils.round_calendar import CALENDAR_CACHE_SIZE
+from app.utils.round_matching import classify_scan_times, to_local_naive
 
 # Define Shift Times (These define Day vs Night windows)
 DAY_START = time(6, 0)
@@ -9,12 +13,18 @@ NIGHT_END = time(5, 30) # 05:30 AM
 
 GRACE_SECONDS = 600  # 10 mins (Default) -> Default Grace Period
 
+# Max ids per bulk status update (keeps the PostgREST URL a sane length)
+STATUS_BATCH_SIZE = 500
+
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
 def get_expected_scan_rounds(target_date: date):
     """
     Generates a list of times a guard IS SUPPOSED to scan
     based on rules:
     - Night Shift (Previous Day 21:00 -> Today 05:30): Every 30 Mins
     - Day Shift (Today 06:00 -> Today 21:00): Every 1 Hour
+
+    Memoized per date; returns a tuple so the cached value can't be mutated.
     """
     expected_times = []
     
@@ -38,17 +48,39 @@ def get_expected_scan_rounds(target_date: date):
         expected_times.append(current_dt)
         current_dt += timedelta(hours=1) # Day scans every 1 hour
 
-    return expected_times
+    return tuple(expected_times)
+
+def classify_scans(scans, target_date: date, expected_times=None):
+    """
+    Labels every scan of a day as 'SUCCESS', 'LATE' or 'MISSED'
+    against its closest expected round (None for scans without a
+    usable scan_time). Returns labels in the same order as `scans`.
+    """
+    if expected_times is None:
+        expected_times = get_expected_scan_rounds(target_date)
+
+    scan_times = [to_local_naive(s.get('scan_time')) for s in scans]
+
+    return classify_scan_times(scan_times, expected_times, GRACE_SECONDS)
 
 # -------------------------------------------------------
 # 2️⃣ MASTER UPDATE LOGIC (PROCESSED)
 # -------------------------------------------------------
-def update_all_scan_statuses(target_date: date):
+def update_all_scan_statuses(
+    target_date: date,
+    batched: bool = True,
+    batch_size: int = STATUS_BATCH_SIZE
+):
     """
     Runs the master update logic:
     - Calculates expected rounds.
     - Compares against `scanning_details`.
     - Updates status to 'SUCCESS', 'LATE', or 'MISSED'.
+
+    With `batched=True` (default) scans are grouped by their computed
+    status and written with one `in_('id', ...)` update per chunk of
+    `batch_size` ids. Per-batch timings are returned under "batches".
+    `batched=False` keeps the old one-update-per-scan behaviour.
     """
     
     # 1. Fetch Scans
@@ -81,60 +113,70 @@ def update_all_scan_statuses(target_date: date):
         }
     
     updated_count = 0
+    status_groups = {'SUCCESS': [], 'LATE': [], 'MISSED': []}
 
-    # 3. Compare and Update
-    # We need to match scans to the closest expected time.
-    for item in data:
-        scan_time_raw = item.get('scan_time')
-        
-        # Handle missing or invalid scan times
-        if not scan_time_raw:
+    # 3. Compare and Classify
+    # Every scan is matched to its closest expected round in one
+    # bisect-based pass.
+    labels = classify_scans(data, target_date, expected_times)
+
+    for item, new_status in zip(data, labels):
+
+        # Skip missing or invalid scan times
+        if new_status is None:
+            if item.get('scan_time'):
+                print(f"❌ Invalid date format for ID {item['id']}")
             continue
-        
-        # Convert string to datetime if necessary
-        if isinstance(scan_time_raw, str):
+
+        if not batched:
+            # Update Database (one round trip per scan)
             try:
-                # Remove 'Z' for UTC handling or handle timezone offset
-                scan_dt = datetime.fromisoformat(scan_time_raw.replace('Z', '+00:00'))
-            except ValueError:
-                print(f"❌ Invalid date format for ID {item['id']}")
-                continue
-        else:
-            scan_dt = scan_time_raw
+                supabase.table('scanning_details') \
+                    .update({'status': new_status}) \
+                    .eq('id', item['id']) \
+                    .execute()
+                updated_count += 1
+            except Exception as e:
+                print(f"⛔️ ERROR: Failed to update ID: {item['id']} - {e}")
+            continue
 
-        # Find the closest expected round
-        best_match = None
-        min_diff = float('inf')
-        
-        for exp_time in expected_times:
-            diff = abs((scan_dt - exp_time).total_seconds())
-            if diff < min_diff:
-                min_diff = diff
-                best_match = exp_time
-
-        # Determine Status
-        new_status = 'MISSED' # Default if logic fails
-        
-        if best_match:
-            if min_diff <= GRACE_SECONDS:
-                new_status = 'SUCCESS'
-            else:
-                # If the scan exists but is outside the grace period, it's LATE
-                new_status = 'LATE'
-        
-        # Update Database
-        try:
-            supabase.table('scanning_details') \
-                .update({'status': new_status}) \
-                .eq('id', item['id']) \
-                .execute()
-            updated_count += 1
-        except Exception as e:
-            print(f"⛔️ ERROR: Failed to update ID: {item['id']} - {e}")
-            
-    return {
+        status_groups[new_status].append(item['id'])
+
+    # 4. Bulk Update (one round trip per status per chunk)
+    batches = []
+
+    if batched:
+        for new_status, ids in status_groups.items():
+            for i in range(0, len(ids), batch_size):
+                chunk = ids[i:i + batch_size]
+                started = time_module.perf_counter()
+
+                try:
+                    supabase.table('scanning_details') \
+                        .update({'status': new_status}) \
+                        .in_('id', chunk) \
+                        .execute()
+                    updated_count += len(chunk)
+                    ok = True
+                except Exception as e:
+                    print(f"⛔️ ERROR: Failed to update {len(chunk)} scans to {new_status} - {e}")
+                    ok = False
+
+                batches.append({
+                    "status": new_status,
+                    "size": len(chunk),
+                    "ok": ok,
+                    "elapsed_ms": round((time_module.perf_counter() - started) * 1000, 2)
+                })
+
+    result = {
         "total_expected_rounds": len(expected_times),
         "total_scans_processed": len(data),
         "updated_count": updated_count,
         "status": "completed"
-    }
\ No newline at end of file
+    }
+
+    if batched:
+        result["batches"] = batches
+
+    return result
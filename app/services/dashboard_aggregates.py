@@ -0,0 +1,294 @@
+# app/services/dashboard_aggregates.py
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.database import get_async_db, iter_pages_async
+from app.utils.round_calendar import IST, ROUND_START_MINUTES, slot_for
+from app.utils.round_matching import to_local_naive
+
+# Counters are kept by the database: a trigger on scan_logs updates
+# these tables in the same transaction as every scan insert, so they
+# are right for any number of workers / replicas and for scans written
+# straight to the DB. Schema, trigger and rebuild function:
+# sql/dashboard_aggregates.sql
+SCAN_BUCKETS_TABLE = "dashboard_scan_buckets"
+GUARD_DAYS_TABLE = "dashboard_guard_days"
+REBUILD_RPC = "rebuild_dashboard_aggregates"
+
+# Buckets are half hours of the IST day; rounds start on half hours, so
+# a bucket never straddles two rounds
+BUCKET_MINUTES = 30
+
+if any(minute % BUCKET_MINUTES for minute in ROUND_START_MINUTES):
+    raise RuntimeError("Round start times must fall on half hours to match dashboard buckets")
+
+# Days shown in the attendance / completion charts
+CHART_DAYS = 7
+
+TARGET_ROUND_MINUTES = 45
+
+ROUNDS_PER_DAY = len(ROUND_START_MINUTES)
+
+
+class FactoryDay:
+    """
+    Counters for one factory on one (IST) day, folded from its buckets.
+    """
+
+    __slots__ = ("guards", "scans", "slot_first", "slot_last")
+
+    def __init__(self):
+        self.guards: Set[str] = set()
+        self.scans = 0
+        # round_no -> first / last scan time seen in that round
+        self.slot_first: Dict[int, datetime] = {}
+        self.slot_last: Dict[int, datetime] = {}
+
+    def add_bucket(self, scans: int, first: datetime, last: datetime) -> None:
+        self.scans += scans
+        round_no = slot_for(first)
+
+        known = self.slot_first.get(round_no)
+        if known is None or first < known:
+            self.slot_first[round_no] = first
+
+        known = self.slot_last.get(round_no)
+        if known is None or last > known:
+            self.slot_last[round_no] = last
+
+    @property
+    def completed_rounds(self) -> int:
+        return len(self.slot_first)
+
+
+def scan_local_time(row: Dict[str, Any]) -> Optional[datetime]:
+    """
+    Naive IST time of a scan row: `scan_time`, else `created_at`.
+    `created_at` is written in UTC, so a naive value is read as UTC.
+    """
+    scan_dt = to_local_naive(row.get("scan_time"))
+
+    if scan_dt is not None:
+        return scan_dt
+
+    created = row.get("created_at")
+
+    if isinstance(created, str):
+        try:
+            created = datetime.fromisoformat(created.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+    if isinstance(created, datetime) and created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+
+    return to_local_naive(created)
+
+
+def scheduled_rounds(day: date, now: datetime) -> int:
+    """
+    Rounds that should have happened on `day` as of `now` (naive IST).
+    """
+    if day < now.date():
+        return ROUNDS_PER_DAY
+
+    if day > now.date():
+        return 0
+
+    return slot_for(now) or 0
+
+
+def elapsed_rounds(day: date, now: datetime) -> int:
+    """
+    Rounds of `day` that are over as of `now`; the open round is not
+    counted, so it can't show up as missed while it's still running.
+    """
+    if day == now.date():
+        return max(scheduled_rounds(day, now) - 1, 0)
+
+    return scheduled_rounds(day, now)
+
+
+def _naive(value: Any) -> Optional[datetime]:
+    # PostgREST returns `timestamp` columns as ISO strings
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class DashboardAggregates:
+    """
+    Reads the database-maintained per-factory, per-day counters, so
+    /admin/dashboard never has to read scanning tables.
+    """
+
+    async def load(
+        self,
+        from_date: date,
+        to_date: date
+    ) -> Tuple[Dict[Tuple[str, date], FactoryDay], Dict[str, str], int]:
+        """
+        ({(factory_code, day): FactoryDay}, factory names, roster size)
+        for [from_date, to_date].
+        """
+        db = await get_async_db()
+        days: Dict[Tuple[str, date], FactoryDay] = {}
+        ranges = {"day": (from_date.isoformat(), to_date.isoformat())}
+
+        def day_for(row) -> FactoryDay:
+            key = (row["factory_code"], date.fromisoformat(str(row["day"])[:10]))
+            if key not in days:
+                days[key] = FactoryDay()
+            return days[key]
+
+        async def buckets():
+            async for page in iter_pages_async(
+                SCAN_BUCKETS_TABLE,
+                columns="id, factory_code, day, scans, first_scan, last_scan",
+                ranges=ranges,
+            ):
+                for row in page:
+                    day_for(row).add_bucket(row["scans"], _naive(row["first_scan"]), _naive(row["last_scan"]))
+
+        async def guards():
+            async for page in iter_pages_async(
+                GUARD_DAYS_TABLE,
+                columns="id, factory_code, day, guard_name",
+                ranges=ranges,
+            ):
+                for row in page:
+                    day_for(row).guards.add(row["guard_name"])
+
+        factories, roster, _, _ = await asyncio.gather(
+            db.table("factories").select("factory_code, factory_name").execute(),
+            db.table("security_users").select("security_id", count="exact").limit(1).execute(),
+            buckets(),
+            guards(),
+        )
+
+        names = {
+            f["factory_code"]: f.get("factory_name") or f["factory_code"]
+            for f in factories.data or []
+        }
+
+        return days, names, roster.count or 0
+
+    async def rebuild(self, from_date: date, to_date: date) -> Dict[str, Any]:
+        """
+        Recompute the counters for [from_date, to_date] from scan_logs,
+        in the database (first install, backfills, deleted scans).
+        """
+        db = await get_async_db()
+
+        res = await db.rpc(
+            REBUILD_RPC,
+            {"p_from": from_date.isoformat(), "p_to": to_date.isoformat()}
+        ).execute()
+
+        return {
+            "from_date": from_date.isoformat(),
+            "to_date": to_date.isoformat(),
+            **(res.data or {}),
+        }
+
+    # ---------------- DASHBOARD ---------------- #
+
+    async def dashboard(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Build the admin dashboard payload from the counters.
+        Cost depends on factories x CHART_DAYS, not on scan volume.
+        """
+        now = now or datetime.now(IST).replace(tzinfo=None)
+        today = now.date()
+        chart_days = [today - timedelta(days=i) for i in range(CHART_DAYS - 1, -1, -1)]
+
+        days, names, roster = await self.load(chart_days[0], today)
+
+        factories = set(names) | {code for code, _ in days}
+        today_counts = {code: days.get((code, today)) for code in factories}
+        day_counts = {
+            d: [days.get((code, d)) for code in factories]
+            for d in chart_days
+        }
+
+        scheduled_today = scheduled_rounds(today, now)
+        elapsed_today = elapsed_rounds(today, now)
+        last_round = elapsed_today or None
+
+        guards_today: Set[str] = set()
+        completed_total = 0
+        missed_total = 0
+        active_alerts = 0
+        round_minutes = []
+        round_status = []
+
+        for code in sorted(factories):
+            fd = today_counts[code]
+            completed = fd.completed_rounds if fd else 0
+
+            if fd:
+                guards_today |= fd.guards
+                round_minutes.extend(
+                    (fd.slot_last[r] - fd.slot_first[r]).total_seconds() / 60
+                    for r in fd.slot_first
+                )
+
+            # Last fully elapsed round had no scan
+            if last_round and (not fd or last_round not in fd.slot_first):
+                active_alerts += 1
+
+            # Over and never scanned; the open round doesn't count yet
+            missed = sum(
+                1 for r in range(1, elapsed_today + 1)
+                if not fd or r not in fd.slot_first
+            )
+
+            completed_total += completed
+            missed_total += missed
+            round_status.append({
+                "site": names.get(code, code),
+                "completed": completed,
+                "missed": missed,
+            })
+
+        scheduled_total = scheduled_today * len(factories)
+
+        attendance = []
+        completion = []
+
+        for d in chart_days:
+            present = set()
+            completed = 0
+
+            for fd in day_counts[d]:
+                if fd:
+                    present |= fd.guards
+                    completed += fd.completed_rounds
+
+            attendance.append({
+                "date": d.isoformat(),
+                "present": len(present),
+                "absent": max(roster - len(present), 0),
+            })
+            completion.append({
+                "date": d.isoformat(),
+                "completedRounds": completed,
+                "scheduledRounds": scheduled_rounds(d, now) * len(factories),
+            })
+
+        return {
+            "totalGuards": len(guards_today),
+            "roundsToday": {"completed": completed_total, "scheduled": scheduled_total},
+            "missedRounds": missed_total,
+            "activeAlerts": active_alerts,
+            "roundStatusData": round_status,
+            "averageRoundTime": round(sum(round_minutes) / len(round_minutes)) if round_minutes else 0,
+            "targetRoundTime": TARGET_ROUND_MINUTES,
+            "attendanceData": attendance,
+            "completionData": completion,
+        }
+
+
+dashboard_aggregates = DashboardAggregates()
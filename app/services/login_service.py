@@ -0,0 +1,287 @@
+# app/services/login_service.py
+
+import asyncio
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import bcrypt
+
+from app.database import get_async_db
+
+LOGIN_TABLE = "login_info"
+
+# Seconds a login_info record stays cached
+LOGIN_CACHE_TTL = float(os.getenv("LOGIN_CACHE_TTL", "60"))
+
+# Threads for bcrypt; bounds how much CPU a login burst can take
+LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", "4"))
+PIN_HASH_ROUNDS = int(os.getenv("PIN_HASH_ROUNDS", "10"))
+
+# Failed attempts allowed per user_id within the window
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+
+# Server-side compare-and-swap for legacy PIN upgrades. PINs travel in
+# the RPC body, never in a URL filter (where request logs keep them):
+#
+#   create or replace function upgrade_login_pin(
+#       p_user_id text, p_old_pin text, p_new_pin text
+#   ) returns boolean language sql security definer as $$
+#       update login_info set user_pin = p_new_pin
+#       where user_id = p_user_id and user_pin = p_old_pin
+#       returning true;
+#   $$;
+PIN_UPGRADE_RPC = os.getenv("PIN_UPGRADE_RPC", "upgrade_login_pin")
+
+
+# --------------------------------------------------
+# PIN HASHING
+# --------------------------------------------------
+
+_hash_pool = ThreadPoolExecutor(
+    max_workers=LOGIN_HASH_WORKERS,
+    thread_name_prefix="pin-hash"
+)
+
+
+def is_hashed(stored: Optional[str]) -> bool:
+    return isinstance(stored, str) and stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def hash_pin(pin: str) -> str:
+    return bcrypt.hashpw(pin.encode(), bcrypt.gensalt(rounds=PIN_HASH_ROUNDS)).decode()
+
+
+def verify_pin(stored: Optional[str], pin: str) -> bool:
+    """
+    Check a PIN against a bcrypt hash, or against a legacy plain-text
+    PIN (constant-time compare).
+    """
+    if not stored:
+        return False
+
+    stored = str(stored)
+
+    if is_hashed(stored):
+        return bcrypt.checkpw(pin.encode(), stored.encode())
+
+    return hmac.compare_digest(stored.encode(), pin.encode())
+
+
+async def _run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, fn, *args)
+
+
+# --------------------------------------------------
+# USER CACHE
+# --------------------------------------------------
+
+class LoginUserCache:
+    """
+    login_info.user_id -> login_info record, for LOGIN_CACHE_TTL seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+
+            return entry[1]
+
+    def put(self, user_id: str, user: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+login_user_cache = LoginUserCache(LOGIN_CACHE_TTL)
+
+
+def invalidate_login_user(user_id: Optional[str] = None) -> None:
+    """
+    Drop the cached record for a login_info.user_id (or all of them when
+    user_id is None). Callers holding some other id, e.g. a
+    security_users.security_id, must pass None.
+    """
+    login_user_cache.invalidate(user_id)
+
+
+# --------------------------------------------------
+# RATE LIMIT
+# --------------------------------------------------
+
+class FailureLimiter:
+    """
+    Fixed-window count of failed logins per user_id. Successful logins
+    reset the count.
+    """
+
+    def __init__(self, max_failures: int, window: float):
+        self.max_failures = max_failures
+        self.window = window
+        # user_id -> [window start, failures]
+        self._windows: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, user_id: str) -> int:
+        """
+        Seconds until `user_id` may try again (0 = allowed now).
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._windows.get(user_id)
+
+            if entry is None or now - entry[0] >= self.window:
+                return 0
+
+            if entry[1] < self.max_failures:
+                return 0
+
+            return int(self.window - (now - entry[0])) + 1
+
+    def failed(self, user_id: str) -> None:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._windows.get(user_id)
+
+            if entry is None or now - entry[0] >= self.window:
+                self._windows[user_id] = [now, 1]
+            else:
+                entry[1] += 1
+
+            # Keep the table small
+            if len(self._windows) > 10_000:
+                for key in [k for k, v in self._windows.items() if now - v[0] >= self.window]:
+                    del self._windows[key]
+
+    def succeeded(self, user_id: str) -> None:
+        with self._lock:
+            self._windows.pop(user_id, None)
+
+
+login_limiter = FailureLimiter(LOGIN_MAX_FAILURES, LOGIN_FAILURE_WINDOW)
+
+
+# --------------------------------------------------
+# LOGIN
+# --------------------------------------------------
+
+class LoginRateLimited(Exception):
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many attempts, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+_upgrade_tasks = set()
+
+
+async def _fetch_user(user_id: str) -> Optional[Dict[str, Any]]:
+    user = login_user_cache.get(user_id)
+
+    if user is not None:
+        return user
+
+    db = await get_async_db()
+
+    res = await (
+        db.table(LOGIN_TABLE)
+        .select("user_id, user_pin, name, role")
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+
+    if not res.data:
+        return None
+
+    user = res.data[0]
+    login_user_cache.put(user_id, user)
+
+    return user
+
+
+async def _upgrade_pin(user: Dict[str, Any], pin: str):
+    """
+    Replace a plain-text PIN with its bcrypt hash through PIN_UPGRADE_RPC.
+    The swap only happens if the stored PIN hasn't changed in the
+    meantime; without the function the PIN just stays plain text.
+    """
+    try:
+        hashed = await _run_in_pool(hash_pin, pin)
+
+        db = await get_async_db()
+
+        await db.rpc(
+            PIN_UPGRADE_RPC,
+            {
+                "p_user_id": user["user_id"],
+                "p_old_pin": user["user_pin"],
+                "p_new_pin": hashed,
+            }
+        ).execute()
+
+        login_user_cache.invalidate(user["user_id"])
+
+    except Exception as e:
+        print("⚠️ PIN UPGRADE ERROR:", e)
+
+
+async def authenticate(user_id: str, pin: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the login_info record if `pin` is right, else None.
+
+    Raises LoginRateLimited once a user_id has too many recent failures.
+    Legacy plain-text PINs are re-saved as bcrypt hashes in the
+    background after their first successful login.
+    """
+    retry_after = login_limiter.retry_after(user_id)
+
+    if retry_after:
+        raise LoginRateLimited(retry_after)
+
+    user = await _fetch_user(user_id)
+    stored = user.get("user_pin") if user else None
+
+    # Only bcrypt is slow enough to need the worker pool
+    if is_hashed(stored):
+        ok = await _run_in_pool(verify_pin, stored, pin)
+    else:
+        ok = verify_pin(stored, pin)
+
+    if not ok:
+        login_limiter.failed(user_id)
+        return None
+
+    login_limiter.succeeded(user_id)
+
+    if not is_hashed(stored):
+        task = asyncio.create_task(_upgrade_pin(user, pin))
+        _upgrade_tasks.add(task)
+        task.add_done_callback(_upgrade_tasks.discard)
+
+    return user
@@ -0,0 +1,261 @@
+# app/services/range_report_service.py
+
+import asyncio
+import csv
+import io
+import json
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from typing import AsyncIterator, List, Optional
+
+from app.database import REPORT_SCANS_TABLE, get_async_db, iter_pages_async
+from app.models.scan_record import SCAN_RECORD_COLUMNS, ScanRecord, load_scans
+from app.utils.report_join import join_report
+from app.utils.round_calendar import slots_for_date
+
+# Days covered by one scan query, and how many queries run at once
+RANGE_CHUNK_DAYS = 1
+RANGE_FETCH_CONCURRENCY = 8
+
+# Longest range accepted in one request
+MAX_RANGE_DAYS = 92
+
+# In-band error record message (see `stream_range_report`)
+RANGE_STREAM_ERROR = "Failed to fetch report data"
+
+RANGE_COLUMNS = [
+    "factory_code", "report_date", "qr_name", "round",
+    "scan_time", "lat", "lon", "guard_name", "status",
+]
+
+
+def build_download_row(qr: dict, round_no: int, scan: Optional[ScanRecord]) -> dict:
+    """
+    Row shape of /report/download.
+    """
+
+    # Normalize status
+    if scan:
+
+        raw = (scan.status or "").lower()
+
+        if raw in ["success", "completed", "done"]:
+            status = "SUCCESS"
+        else:
+            status = "MISSED"
+
+    else:
+        status = "MISSED"
+
+
+    return {
+
+        "qr_name": qr["qr_name"],
+
+        "round": round_no,
+
+        "scan_time": scan.scan_time if scan else None,
+
+        "lat": scan.lat if scan else None,
+
+        "lon": scan.log if scan else None,
+
+        "guard_name": scan.guard_name if scan else None,
+
+        "status": status,
+    }
+
+
+class RangeFetchError(Exception):
+    """
+    A fetch failed; every day before `resume_from` was fully yielded
+    and no row of `resume_from` or later was.
+    """
+
+    def __init__(self, resume_from: date):
+        super().__init__(f"range fetch failed at {resume_from.isoformat()}")
+        self.resume_from = resume_from
+
+
+def _date_chunks(from_date: date, to_date: date, days: int):
+    start = from_date
+
+    while start <= to_date:
+        end = min(start + timedelta(days=days - 1), to_date)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+async def _fetch_scans(factory_codes: List[str], start: date, end: date) -> List[ScanRecord]:
+    scans = []
+
+    async for page in iter_pages_async(
+        REPORT_SCANS_TABLE,
+        filters={"factory_code": factory_codes},
+        columns=SCAN_RECORD_COLUMNS,
+        ranges={
+            "scan_time": (
+                f"{start.isoformat()}T00:00:00+05:30",
+                f"{end.isoformat()}T23:59:59+05:30",
+            )
+        },
+    ):
+        scans.extend(load_scans(page))
+
+    return scans
+
+
+async def iter_range_rows(
+    factory_codes: List[str],
+    from_date: date,
+    to_date: date
+) -> AsyncIterator[dict]:
+    """
+    Yield report rows for every factory and every day in the range,
+    ordered by day, then factory.
+
+    QR lists are fetched once; scans are fetched in RANGE_CHUNK_DAYS
+    chunks, at most RANGE_FETCH_CONCURRENCY chunks ahead of the one
+    being yielded.
+    """
+    try:
+        db = await get_async_db()
+
+        qr_rows = (
+            await db.table("qr")
+            .select("qr_id, qr_name, factory_code")
+            .in_("factory_code", factory_codes)
+            .execute()
+        ).data or []
+    except Exception as e:
+        raise RangeFetchError(from_date) from e
+
+    qr_by_factory = defaultdict(list)
+    for qr in qr_rows:
+        qr_by_factory[qr["factory_code"]].append(qr)
+
+    # Sliding window: at most RANGE_FETCH_CONCURRENCY chunk fetches exist
+    # at a time (running or finished-but-unconsumed), so memory stays
+    # bounded however long the range is
+    chunks = _date_chunks(from_date, to_date, RANGE_CHUNK_DAYS)
+    window = deque()
+
+    def schedule_next() -> None:
+        chunk = next(chunks, None)
+        if chunk is not None:
+            start, end = chunk
+            window.append((start, end, asyncio.create_task(_fetch_scans(factory_codes, start, end))))
+
+    for _ in range(RANGE_FETCH_CONCURRENCY):
+        schedule_next()
+
+    try:
+        while window:
+            start, end, task = window.popleft()
+            try:
+                scans = await task
+            except Exception as e:
+                raise RangeFetchError(start) from e
+            schedule_next()
+
+            # Group this chunk's scans by (factory, round day)
+            by_factory_day = defaultdict(list)
+
+            for s in scans:
+                if s.round_start is not None:
+                    by_factory_day[(s.factory_code, s.round_start.date())].append(s)
+
+            day = start
+            while day <= end:
+                slots = slots_for_date(day)
+
+                for factory_code in factory_codes:
+                    rows = join_report(
+                        qr_by_factory.get(factory_code, []),
+                        slots,
+                        by_factory_day.get((factory_code, day), []),
+                        build_download_row,
+                    )
+
+                    for row in rows:
+                        yield {
+                            "factory_code": factory_code,
+                            "report_date": day.isoformat(),
+                            **row,
+                        }
+
+                day += timedelta(days=1)
+
+    finally:
+        for _start, _end, task in window:
+            task.cancel()
+
+
+# ---------------- OUTPUT FORMATS ---------------- #
+
+async def stream_range_report(
+    factory_codes: List[str],
+    from_date: date,
+    to_date: date,
+    fmt: str
+) -> AsyncIterator[str]:
+    """
+    Encode `iter_range_rows` as csv, ndjson or a json array.
+
+    The 200 is already on the wire when a fetch fails, so the failure
+    is reported in-band, as in GET /scans?format=ndjson: the stream ends
+    with {"error": ..., "next_cursor": <first day not sent>} - the last
+    ndjson line, the last element of the json array (which is still
+    closed), or a last csv line "# " + that object. Clients resume with
+    from_date=next_cursor; next_cursor is null when the failure cannot
+    be placed. A stream without it ended normally.
+    """
+    rows = iter_range_rows(factory_codes, from_date, to_date)
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=RANGE_COLUMNS)
+        writer.writeheader()
+
+        try:
+            async for row in rows:
+                writer.writerow(row)
+                if buf.tell() > 64 * 1024:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+        except Exception as e:
+            buf.write("# " + _error_record(e) + "\n")
+
+        yield buf.getvalue()
+
+    elif fmt == "ndjson":
+        try:
+            async for row in rows:
+                yield json.dumps(row) + "\n"
+        except Exception as e:
+            yield _error_record(e) + "\n"
+
+    else:
+        yield "["
+        first = True
+
+        try:
+            async for row in rows:
+                yield ("" if first else ",") + json.dumps(row)
+                first = False
+        except Exception as e:
+            yield ("" if first else ",") + _error_record(e)
+
+        yield "]"
+
+
+def _error_record(e: Exception) -> str:
+    print("Range report stream error:", e.__cause__ or e)
+
+    resume_from = e.resume_from.isoformat() if isinstance(e, RangeFetchError) else None
+
+    return json.dumps({
+        "error": RANGE_STREAM_ERROR,
+        "next_cursor": resume_from,
+    })
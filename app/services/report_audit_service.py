@@ -1,17 +1,264 @@
 # app/services/report_audit_service.py
 
+import asyncio
+import os
+import threading
+import time
 from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import insert_rows_async, is_retryable
+from app.utils.spool import DurableSpool
 
 IST = timezone(timedelta(hours=5, minutes=30))
 
+# Audit events are spooled locally and flushed to report_audit in batches
+REPORT_AUDIT_SPOOL_PATH = os.getenv("REPORT_AUDIT_SPOOL_PATH", "report_audit_spool.db")
+REPORT_AUDIT_FLUSH_SIZE = int(os.getenv("REPORT_AUDIT_FLUSH_SIZE", "100"))
+REPORT_AUDIT_FLUSH_INTERVAL = float(os.getenv("REPORT_AUDIT_FLUSH_INTERVAL", "2.0"))
+# Rejected events are dead-lettered in the spool file after this many tries
+REPORT_AUDIT_MAX_ATTEMPTS = int(os.getenv("REPORT_AUDIT_MAX_ATTEMPTS", "5"))
+# Longest pause after the flush loop itself fails (spool locked, disk full)
+REPORT_AUDIT_MAX_BACKOFF = float(os.getenv("REPORT_AUDIT_MAX_BACKOFF", "30"))
+
+SpoolEntry = Tuple[int, Dict[str, Any]]
+
+
+class _CommitGroup:
+    """
+    Events that go to the spool in the same transaction.
+    """
+
+    __slots__ = ("payloads", "done", "error")
+
+    def __init__(self):
+        self.payloads: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+
+class ReportAuditQueue:
+    """
+    At-least-once delivery of audit events: `enqueue` returns once the
+    event is committed to the local spool; the background task inserts
+    spooled batches into report_audit and only then removes them.
+
+    Concurrent `enqueue` calls are group-committed: while one caller
+    writes a transaction, the others collect into the next one, so a
+    burst of downloads costs one fsync per group, not per event.
+
+    Batches report_audit rejects are bisected down to the bad events,
+    which are dead-lettered after `max_attempts`; retryable failures
+    (DB unreachable) leave the spool as is.
+    """
+
+    def __init__(self, path: str, flush_size: int, flush_interval: float, max_attempts: int = REPORT_AUDIT_MAX_ATTEMPTS):
+        self.spool = DurableSpool(path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+        # Group commit state
+        self._commit = threading.Condition()
+        self._group = _CommitGroup()
+        self._committing = False
+
+        self.enqueued = 0
+        self.commits = 0
+        self.dead_lettered = 0
+        self.loop_errors = 0
+        # Committed since the flusher was last woken for a full batch
+        self._since_wakeup = 0
+
+    def enqueue(self, payload: dict) -> None:
+        """
+        Durably spool one event; blocks (for about one commit) until it
+        is on disk and raises if it couldn't be written. Safe from any
+        thread, but blocking: call it from sync code / a worker thread.
+        """
+        with self._commit:
+            group = self._group
+            group.payloads.append(payload)
+
+            while not group.done:
+                if self._committing:
+                    self._commit.wait()
+                    continue
+
+                # Nobody is writing: commit the open group, ours included
+                self._committing = True
+                batch, self._group = self._group, _CommitGroup()
+
+                self._commit.release()
+                try:
+                    self.spool.append_many(batch.payloads)
+                except BaseException as e:
+                    batch.error = e
+                finally:
+                    self._commit.acquire()
+                    batch.done = True
+                    self._committing = False
+                    if batch.error is None:
+                        self.enqueued += len(batch.payloads)
+                        self.commits += 1
+                        self._since_wakeup += len(batch.payloads)
+                    self._commit.notify_all()
+
+            full = self._since_wakeup >= self.flush_size
+            if full:
+                self._since_wakeup = 0
+
+        if group.error is not None:
+            raise group.error
+
+        # Wake the flusher once a full batch is waiting
+        loop = self._loop
+        if full and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _insert(self, entries: List[SpoolEntry]) -> Tuple[List[int], List[Tuple[int, str]], Optional[str]]:
+        """
+        (inserted entry ids, rejected single entries with their error,
+        retryable error or None), bisecting rejected batches.
+        """
+        try:
+            await insert_rows_async("report_audit", [payload for _, payload in entries])
+            return [entry_id for entry_id, _ in entries], [], None
+        except Exception as e:
+            if is_retryable(e):
+                return [], [], str(e)
+            if len(entries) == 1:
+                return [], [(entries[0][0], str(e)[:500])], None
+
+        middle = len(entries) // 2
+        done, rejected = [], []
+
+        for half in (entries[:middle], entries[middle:]):
+            half_done, half_rejected, error = await self._insert(half)
+            done.extend(half_done)
+            rejected.extend(half_rejected)
+
+            if error is not None:
+                return done, rejected, error
+
+        return done, rejected, None
+
+    async def flush_once(self) -> int:
+        entries = await asyncio.to_thread(self.spool.peek, self.flush_size)
+
+        if not entries:
+            return 0
+
+        done, rejected, error = await self._insert(entries)
+
+        await asyncio.to_thread(self.spool.delete, done)
+
+        for entry_id, reason in rejected:
+            moved = await asyncio.to_thread(self.spool.fail, [entry_id], reason, self.max_attempts)
+            self.dead_lettered += moved
+            if moved:
+                print(f"⛔️ ERROR: Report audit entry {entry_id} dead-lettered after {self.max_attempts} attempts - {reason}")
+
+        if error is not None:
+            print(f"⛔️ ERROR: Report audit flush of {len(entries)} rows failed - {error}")
+
+        return len(done)
+
+    async def _run(self):
+        last_flush = 0.0
+        backoff = 0.0
+
+        while not self._stopping.is_set():
+            # Insert when a batch is full or the interval is up
+            try:
+                if (
+                    time.monotonic() - last_flush >= self.flush_interval
+                    or await asyncio.to_thread(self.spool.depth) >= self.flush_size
+                ):
+                    while await self.flush_once() == self.flush_size:
+                        pass
+                    last_flush = time.monotonic()
+            except Exception as e:
+                # Keep the task alive; back off so a broken spool isn't hammered
+                self.loop_errors += 1
+                backoff = min(max(backoff * 2, self.flush_interval), REPORT_AUDIT_MAX_BACKOFF)
+                print(f"⛔️ ERROR: Report audit flush failed, retrying in {backoff}s - {e}")
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=backoff)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            backoff = 0.0
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+    async def start(self):
+        # Anything left from a previous run is flushed on the first tick
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+        if self._task:
+            await self._task
+            self._task = None
+
+        self._loop = None
+
+        try:
+            while await self.flush_once() == self.flush_size:
+                pass
+        except Exception as e:
+            print(f"⛔️ ERROR: Final report audit flush failed - {e}")
+        finally:
+            # Unsent events stay in the spool for the next start
+            await asyncio.to_thread(self.spool.close)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "spool_commits": self.commits,
+            "queue_depth": self.spool.depth(),
+            "dead_lettered": self.dead_lettered,
+            "dead_letter_depth": self.spool.dead_depth(),
+            "loop_errors": self.loop_errors,
+        }
+
+
+audit_queue = ReportAuditQueue(
+    REPORT_AUDIT_SPOOL_PATH,
+    REPORT_AUDIT_FLUSH_SIZE,
+    REPORT_AUDIT_FLUSH_INTERVAL,
+)
+
 
 def save_report_audit(
     db,
     report_type: str,
     factory_code: str,
     report_date: str,
-    current_user: dict
+    current_user: dict,
+    generated_at: Optional[datetime] = None
 ):
+    """
+    Record a report download. Returns once the event is in the local
+    spool (group-committed with concurrent downloads); the background
+    flusher writes it to report_audit, so the caller never waits on the
+    database.
+    """
     if not db:
         raise RuntimeError("Supabase client not initialized")
 
@@ -22,7 +269,7 @@ def save_report_audit(
         "generated_by_user_id": current_user["user_id"],
         "generated_by_name": current_user.get("name"),
         "generated_by_role": current_user["role"],
-        "generated_at": datetime.now(IST).isoformat(),
+        "generated_at": (generated_at or datetime.now(IST)).isoformat(),
     }
 
-    db.table("report_audit").insert(audit_payload).execute()
+    audit_queue.enqueue(audit_payload)
@@ -0,0 +1,278 @@
+# app/services/report_cache.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.database import REPORT_SCANS_TABLE
+
+REPORT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "security_report_cache")
+)
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Part of every cache key; bump when the report layout changes so files
+# rendered by an older build are never served
+REPORT_CACHE_FORMAT = "3"
+
+# Invalidation generations, kept next to the cached files so they
+# survive restarts and are shared by every worker on the host
+GENERATIONS_DB = "generations.db"
+
+
+def report_day_window(report_date: str) -> Tuple[str, str]:
+    """
+    Inclusive scan_time bounds of one IST report day. Every cached
+    report reads this window, and `scan_watermark` covers exactly it.
+    """
+    return f"{report_date}T00:00:00+05:30", f"{report_date}T23:59:59+05:30"
+
+
+def scan_watermark(db, factory_code: str, report_date: str) -> str:
+    """
+    Cheap data version for one factory-day: row count and max scan id
+    of the table the reports read. Any new (or deleted) scan for that
+    day changes it. The table has no updated_at, so in-place edits and
+    QR / factory changes go through `ReportCache.invalidate` instead.
+    """
+    day_start, day_end = report_day_window(report_date)
+
+    res = (
+        db.table(REPORT_SCANS_TABLE)
+        .select("id", count="exact")
+        .eq("factory_code", factory_code)
+        .gte("scan_time", day_start)
+        .lte("scan_time", day_end)
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    )
+
+    max_id = res.data[0]["id"] if res.data else 0
+
+    return f"{res.count or 0}:{max_id}"
+
+
+def _safe(part: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", part)
+
+
+class ReportCache:
+    """
+    Content-addressed, size-bounded LRU of rendered reports on disk.
+
+    Files live in <dir>/<factory>/<date>/<sha256>.<kind>, where the hash
+    covers (kind, factory_code, report_date, watermark, variant) and the
+    factory's / day's invalidation generation. A new watermark or an
+    `invalidate` means a new key, so stale outputs are never served -
+    not even one rendered from data read before the invalidation.
+    Take the path (`path_for`) before reading the data.
+
+    Generations live in <dir>/generations.db (SQLite, WAL), so a file
+    left by a render that raced an invalidate stays unreachable after a
+    restart and for the other workers sharing the directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # path -> size, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+        # (factory_code, report_date or '') -> invalidation count;
+        # ('', '') counts `invalidate_all`
+        self._generations = sqlite3.connect(
+            os.path.join(directory, GENERATIONS_DB),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._generations.execute("PRAGMA journal_mode=WAL")
+        self._generations.execute("PRAGMA synchronous=FULL")
+        self._generations.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " factory_code TEXT NOT NULL,"
+            " report_date TEXT NOT NULL,"
+            " generation INTEGER NOT NULL,"
+            " PRIMARY KEY (factory_code, report_date)"
+            ")"
+        )
+
+        self._load()
+
+    def _load(self):
+        files = []
+
+        for root, _dirs, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if root == self.directory and name.startswith(GENERATIONS_DB):
+                    continue
+                if name.startswith("."):
+                    # Half-written file from a previous run
+                    os.unlink(path)
+                    continue
+                st = os.stat(path)
+                files.append((st.st_mtime, path, st.st_size))
+
+        for _mtime, path, size in sorted(files):
+            self._index[path] = size
+            self._bytes += size
+
+        self._evict()
+
+    def _day_dir(self, factory_code: str, report_date: str) -> str:
+        return os.path.join(self.directory, _safe(factory_code), _safe(report_date))
+
+    def path_for(
+        self,
+        kind: str,
+        factory_code: str,
+        report_date: str,
+        watermark: str,
+        variant: str = ""
+    ) -> str:
+        keys = [("", ""), (factory_code, ""), (factory_code, report_date)]
+
+        with self._lock:
+            found = dict(
+                ((row[0], row[1]), row[2])
+                for row in self._generations.execute(
+                    "SELECT factory_code, report_date, generation FROM generations"
+                    " WHERE (factory_code, report_date) IN (VALUES (?, ?), (?, ?), (?, ?))",
+                    [part for key in keys for part in key],
+                )
+            )
+
+        generation = ".".join(str(found.get(key, 0)) for key in keys)
+
+        digest = hashlib.sha256(
+            "\x1f".join([
+                REPORT_CACHE_FORMAT, kind, factory_code, report_date, watermark, variant, generation
+            ]).encode()
+        ).hexdigest()
+
+        return os.path.join(self._day_dir(factory_code, report_date), f"{digest}.{kind}")
+
+    def get(self, path: str) -> Optional[str]:
+        """
+        Return `path` if cached (and mark it recently used), else None.
+        """
+        with self._lock:
+            if path in self._index and os.path.exists(path):
+                self._index.move_to_end(path)
+                self.hits += 1
+                return path
+
+            self._index.pop(path, None)
+            self.misses += 1
+            return None
+
+    def read(self, path: str) -> Optional[bytes]:
+        if self.get(path) is None:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, path: str, data: bytes) -> None:
+        self._store(path, lambda f: f.write(data))
+
+    def _store(self, path: str, write) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a hidden temp name, then atomically move into place
+        fd, tmp_path = tempfile.mkstemp(prefix=".", dir=os.path.dirname(path))
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._bytes -= self._index.pop(path, 0)
+            self._index[path] = size
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _bump(self, factory_code: str, report_date: str) -> None:
+        # Committed before any file goes, so a crash in between leaves
+        # the old files unreachable rather than servable
+        self._generations.execute(
+            "INSERT INTO generations (factory_code, report_date, generation) VALUES (?, ?, 1)"
+            " ON CONFLICT (factory_code, report_date) DO UPDATE SET generation = generation + 1",
+            (factory_code, report_date),
+        )
+
+    def invalidate(self, factory_code: str, report_date: Optional[str] = None) -> None:
+        """
+        Drop every cached output for one factory-day, or for every day of
+        the factory when `report_date` is None (QR / factory edits).
+        """
+        if report_date is None:
+            prefix = os.path.join(self.directory, _safe(factory_code)) + os.sep
+        else:
+            prefix = self._day_dir(factory_code, report_date) + os.sep
+
+        with self._lock:
+            self._bump(factory_code, report_date or "")
+
+            for path in [p for p in self._index if p.startswith(prefix)]:
+                self._bytes -= self._index.pop(path)
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._bump("", "")
+
+            for path in list(self._index):
+                self._bytes -= self._index.pop(path)
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+report_cache = ReportCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
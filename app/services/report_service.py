@@ -1,8 +1,14 @@
 # app/services/report_service.py
 
+import json
 from datetime import datetime, timezone, timedelta
+from app.database import REPORT_SCANS_TABLE
+from app.models.scan_record import SCAN_RECORD_COLUMNS, ScanRecord, load_scans
 from app.utils.round_slots import generate_round_slots
+from app.utils.report_join import join_report
+from app.utils.parallel_fetch import fetch_parallel
 from app.services.report_audit_service import save_report_audit
+from app.services.report_cache import report_cache, report_day_window, scan_watermark
 
 # IST timezone
 IST = timezone(timedelta(hours=5, minutes=30))
@@ -23,27 +29,63 @@ def build_report_filename(
     return f"{report_type}_{factory_code}_{report_date}_{safe_name}_{ts}.pdf"
 
 
-def generate_report(
-    db,
-    factory_code: str,
-    report_date: str,
-    current_user: dict
-):
-    if not db:
-        raise RuntimeError("Supabase client not initialized")
+def _build_row(qr: dict, round_no: int, scan: ScanRecord | None) -> dict:
+    return {
+        "qr_name": qr.get("qr_name"),
+        "round": round_no,
+        "scan_time": scan.scan_time if scan else None,
+        "latitude": scan.lat if scan else None,
+        "longitude": scan.log if scan else None,
+        "guard_name": scan.guard_name if scan else None,
+        # scanning_details has no user column; kept for the report shape
+        "username": None,
+        "status": "SUCCESS" if scan else "FAILED",
+    }
 
+
+def _build_report_body(db, factory_code: str, report_date: str) -> dict:
+    """
+    Factory header + QR x round rows for one factory-day (no audit data).
+    """
     # -----------------------------
-    # 1️⃣ Fetch factory
-    # -----------------------------
-    factory = (
-        db.table("factories")
-        .select("factory_name, factory_address")
-        .eq("factory_code", factory_code)
-        .single()
-        .execute()
-        .data
+    # 1️⃣ Fetch factory, QR codes and scans (concurrently)
+    # -----------------------------
+    day_start, day_end = report_day_window(report_date)
+
+    results = fetch_parallel(
+        {
+            "factory": lambda: (
+                db.table("factories")
+                .select("factory_name, factory_address")
+                .eq("factory_code", factory_code)
+                .single()
+                .execute()
+                .data
+            ),
+            "qr": lambda: (
+                db.table("qr")
+                .select("qr_id, qr_name")
+                .eq("factory_code", factory_code)
+                .execute()
+                .data or []
+            ),
+            "scans": lambda: load_scans(
+                db.table(REPORT_SCANS_TABLE)
+                .select(SCAN_RECORD_COLUMNS)
+                .eq("factory_code", factory_code)
+                .gte("scan_time", day_start)
+                .lte("scan_time", day_end)
+                .execute()
+                .data
+            ),
+        },
+        fetch="report",
     )
 
+    factory = results["factory"]
+    qr_codes = results["qr"]
+    scans = results["scans"]
+
     if not factory:
         raise ValueError("Factory not found")
 
@@ -53,55 +95,46 @@ def generate_report(
     round_slots = generate_round_slots(report_date)
 
     # -----------------------------
-    # 3️⃣ Fetch QR codes
+    # 3️⃣ Build report rows
     # -----------------------------
-    qr_codes = (
-        db.table("qr")
-        .select("qr_id, qr_name")
-        .eq("factory_code", factory_code)
-        .execute()
-        .data or []
-    )
+    return {
+        "factory_code": factory_code,
+        "factory_name": factory.get("factory_name"),
+        "factory_address": factory.get("factory_address"),
+        "report_date": report_date,
+        "data": join_report(qr_codes, round_slots, scans, _build_row),
+    }
 
-    # -----------------------------
-    # 4️⃣ Fetch scans
-    # -----------------------------
-    scans = (
-        db.table("scanning_details")
-        .select("*")
-        .eq("factory_code", factory_code)
-        .gte("scan_time", f"{report_date}T00:00:00+05:30")
-        .lte("scan_time", f"{report_date}T23:59:59+05:30")
-        .execute()
-        .data or []
-    )
 
-    # -----------------------------
-    # 5️⃣ Build report rows
-    # -----------------------------
-    rows = []
-
-    for qr in qr_codes:
-        for round_no, slot in round_slots:
-            scan = next(
-                (
-                    s for s in scans
-                    if s.get("qr_id") == qr.get("qr_id")
-                    and s.get("round_slot") == slot.isoformat()
-                ),
-                None
-            )
-
-            rows.append({
-                "qr_name": qr.get("qr_name"),
-                "round": round_no,
-                "scan_time": scan.get("scan_time") if scan else None,
-                "latitude": scan.get("lat") if scan else None,
-                "longitude": scan.get("log") if scan else None,
-                "guard_name": scan.get("guard_name") if scan else None,
-                "username": scan.get("user_id") if scan else None,
-                "status": "SUCCESS" if scan else "FAILED",
-            })
+def get_report_body(db, factory_code: str, report_date: str) -> dict:
+    """
+    `_build_report_body`, served from the report cache while the
+    factory-day's scan watermark is unchanged.
+    """
+    watermark = scan_watermark(db, factory_code, report_date)
+    path = report_cache.path_for("json", factory_code, report_date, watermark)
+
+    cached = report_cache.read(path)
+
+    if cached is not None:
+        return json.loads(cached)
+
+    body = _build_report_body(db, factory_code, report_date)
+    report_cache.put(path, json.dumps(body).encode())
+
+    return body
+
+
+def generate_report(
+    db,
+    factory_code: str,
+    report_date: str,
+    current_user: dict
+):
+    if not db:
+        raise RuntimeError("Supabase client not initialized")
+
+    body = get_report_body(db, factory_code, report_date)
 
     # -----------------------------
     # 6️⃣ Audit info
@@ -133,8 +166,8 @@ def generate_report(
     # -----------------------------
     return {
         "factory_code": factory_code,
-        "factory_name": factory.get("factory_name"),
-        "factory_address": factory.get("factory_address"),
+        "factory_name": body["factory_name"],
+        "factory_address": body["factory_address"],
         "report_date": report_date,
 
         "generated_by": {
@@ -149,5 +182,5 @@ def generate_report(
             "filename": audit_filename,
         },
 
-        "data": rows,
+        "data": body["data"],
     }
@@ -0,0 +1,160 @@
+# app/services/scan_export.py
+
+import csv
+import io
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.database import SCANNING_TABLE, iter_pages_async
+
+# Rows per PostgREST page (and per Arrow record batch / Parquet row group)
+EXPORT_PAGE_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "factory_code", "guard_name", "qr_id", "qr_name",
+    "lat", "log", "status", "scan_time",
+]
+
+
+def require_pyarrow():
+    """
+    Only the arrow/parquet formats need pyarrow. It is pinned in
+    requirements.txt but imported lazily, so an install without it still
+    serves csv/ndjson. Raises ImportError when it isn't installed.
+    """
+    import pyarrow  # noqa: F401
+    import pyarrow.ipc  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+
+def iter_export_pages(
+    factory_code: Optional[str] = None,
+    guard_name: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    page_size: int = EXPORT_PAGE_SIZE,
+):
+    filters = {}
+
+    if factory_code:
+        filters["factory_code"] = factory_code
+
+    if guard_name:
+        filters["guard_name"] = guard_name
+
+    ranges = None
+
+    if from_date or to_date:
+        ranges = {
+            "scan_time": (
+                f"{from_date.isoformat()}T00:00:00+05:30" if from_date else None,
+                f"{to_date.isoformat()}T23:59:59+05:30" if to_date else None,
+            )
+        }
+
+    return iter_pages_async(
+        SCANNING_TABLE,
+        filters=filters,
+        page_size=page_size,
+        columns=", ".join(EXPORT_COLUMNS),
+        ranges=ranges,
+    )
+
+
+# ---------------- CSV ---------------- #
+
+async def iter_csv(pages) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+
+    async for page in pages:
+        for row in page:
+            writer.writerow([row.get(c) for c in EXPORT_COLUMNS])
+
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+
+    yield buf.getvalue().encode()
+
+
+# ---------------- ARROW / PARQUET ---------------- #
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back via `drain`.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("factory_code", pa.string()),
+        ("guard_name", pa.string()),
+        ("qr_id", pa.string()),
+        ("qr_name", pa.string()),
+        ("lat", pa.float64()),
+        ("log", pa.float64()),
+        ("status", pa.string()),
+        ("scan_time", pa.string()),
+    ])
+
+
+def _to_batch(page: List[Dict], schema):
+    import pyarrow as pa
+
+    columns = {c: [row.get(c) for row in page] for c in EXPORT_COLUMNS}
+
+    # qr_id is stored as text but may come back as a number
+    columns["qr_id"] = [None if v is None else str(v) for v in columns["qr_id"]]
+
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+async def iter_columnar(pages, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Encode pages as an Arrow IPC stream (fmt="arrow") or a Parquet file
+    (fmt="parquet"), one record batch / row group per page.
+    """
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+
+    try:
+        async for page in pages:
+            writer.write_batch(_to_batch(page, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
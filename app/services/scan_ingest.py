@@ -0,0 +1,454 @@
+# app/services/scan_ingest.py
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.conditional_get import bump_write_version
+from app.database import (
+    SCANNING_TABLE,
+    insert_new_rows_async,
+    insert_rows_async,
+    is_retryable,
+    select_rows_in_async,
+)
+from app.services.dashboard_aggregates import scan_local_time
+from app.services.report_cache import report_cache
+from app.utils.spool import DurableSpool
+
+# Rows per multi-row insert
+INSERT_CHUNK_SIZE = 200
+
+# Idempotency keys per `in_` lookup of conflicting rows (keeps the
+# PostgREST URL short)
+LOOKUP_CHUNK_SIZE = 200
+
+# Recently stored idempotency keys -> scan id, so retries skip the DB
+RECENT_KEYS_MAX = 10_000
+
+_recent_keys: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def _remember(key: str, scan_id: Any) -> None:
+    _recent_keys[key] = scan_id
+    _recent_keys.move_to_end(key)
+
+    while len(_recent_keys) > RECENT_KEYS_MAX:
+        _recent_keys.popitem(last=False)
+
+
+def _result(status: str, key: Optional[str], scan_id: Any = None, detail: Optional[str] = None) -> Dict:
+    return {
+        "status": status,
+        "id": scan_id,
+        "idempotency_key": key,
+        "detail": detail,
+    }
+
+
+def after_scans_stored(rows: List[Dict[str, Any]]) -> None:
+    """
+    Bookkeeping for freshly stored scans: drop cached reports for the
+    affected factory-days and move the GET /scans ETag on. (Dashboard
+    counters are updated by the database, see dashboard_aggregates.)
+
+    Cached reports are keyed by (factory_code, IST date) - the same
+    day the report reads select on. Their watermark reads
+    REPORT_SCANS_TABLE itself, so this is an early drop, not the only
+    guard against stale output.
+    """
+    bump_write_version(SCANNING_TABLE)
+
+    factory_days = set()
+
+    for row in rows:
+        scan_dt = scan_local_time(row)
+        if row.get("factory_code") and scan_dt is not None:
+            factory_days.add((row["factory_code"], scan_dt.date().isoformat()))
+
+    for factory_code, report_date in factory_days:
+        report_cache.invalidate(factory_code, report_date)
+
+
+async def _find_existing(keys: List[str]) -> Dict[str, Any]:
+    existing = {}
+
+    for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        rows = await select_rows_in_async(
+            SCANNING_TABLE,
+            "idempotency_key",
+            keys[i:i + LOOKUP_CHUNK_SIZE],
+            columns="id, idempotency_key"
+        )
+
+        for row in rows:
+            existing[row["idempotency_key"]] = row["id"]
+
+    return existing
+
+
+def _mark_failed(results: List[Optional[Dict]], rows: List[Dict], indexes: List[int], error: Exception) -> None:
+    print(f"⛔️ ERROR: Batch insert of {len(indexes)} scans failed - {error}")
+    retryable = is_retryable(error)
+
+    for i in indexes:
+        results[i] = _result("failed", rows[i].get("idempotency_key"), detail="Insert failed")
+        results[i]["retryable"] = retryable
+        results[i]["error"] = str(error)[:500]
+
+
+async def ingest_scans(rows: List[Dict[str, Any]]) -> List[Dict]:
+    """
+    Store already-validated scan rows, skipping rows whose
+    `idempotency_key` was stored before (or repeats within `rows`).
+
+    Keyed rows go in with ON CONFLICT (idempotency_key) DO NOTHING, so a
+    key stored concurrently by another batch or worker only skips that
+    row; skipped rows are then looked up to report their scan id.
+
+    Returns one result per input row, in order:
+    {"status": "created" | "duplicate" | "failed", "id", "idempotency_key", "detail"}
+
+    Rows of a failed insert also carry "retryable" (see `is_retryable`)
+    and "error"; these are for the write-behind queue, not for clients.
+    """
+    results: List[Optional[Dict]] = [None] * len(rows)
+
+    # 1. Dedupe within the batch and against recently stored keys
+    first_index: Dict[str, int] = {}
+    repeats: Dict[int, int] = {}
+
+    for i, row in enumerate(rows):
+
+        key = row.get("idempotency_key")
+
+        if not key:
+            row.pop("idempotency_key", None)
+            continue
+
+        if key in first_index:
+            repeats[i] = first_index[key]
+            continue
+
+        first_index[key] = i
+
+        if key in _recent_keys:
+            results[i] = _result("duplicate", key, _recent_keys[key])
+
+    # 2. Multi-row insert of everything that's left, chunk by chunk
+    pending = [
+        i for i in range(len(rows))
+        if results[i] is None and i not in repeats
+    ]
+    conflicts: List[str] = []
+
+    for c in range(0, len(pending), INSERT_CHUNK_SIZE):
+
+        chunk = pending[c:c + INSERT_CHUNK_SIZE]
+        keyed = [i for i in chunk if rows[i].get("idempotency_key")]
+        keyless = [i for i in chunk if not rows[i].get("idempotency_key")]
+        inserted: List[Dict] = []
+
+        if keyed:
+            try:
+                stored_rows = await insert_new_rows_async(
+                    SCANNING_TABLE,
+                    [rows[i] for i in keyed],
+                    on_conflict="idempotency_key"
+                )
+            except Exception as e:
+                _mark_failed(results, rows, keyed, e)
+            else:
+                by_key = {r.get("idempotency_key"): r for r in stored_rows}
+
+                for i in keyed:
+                    key = rows[i]["idempotency_key"]
+                    stored = by_key.get(key)
+
+                    if stored is None:
+                        # Already in the table: skipped by ON CONFLICT
+                        conflicts.append(key)
+                        continue
+
+                    _remember(key, stored.get("id"))
+                    results[i] = _result("created", key, stored.get("id"))
+
+                inserted.extend(stored_rows)
+
+        if keyless:
+            try:
+                stored_rows = await insert_rows_async(SCANNING_TABLE, [rows[i] for i in keyless])
+            except Exception as e:
+                _mark_failed(results, rows, keyless, e)
+            else:
+                for i, stored in zip(keyless, stored_rows):
+                    results[i] = _result("created", None, stored.get("id"))
+
+                inserted.extend(stored_rows)
+
+        if inserted:
+            after_scans_stored(inserted)
+
+    # 3. Report the scan id of rows skipped as duplicates
+    if conflicts:
+        try:
+            existing = await _find_existing(conflicts)
+        except Exception as e:
+            # The rows are stored either way; only their ids are unknown
+            print(f"⚠️ Duplicate scan lookup failed - {e}")
+            existing = {}
+
+        for key in conflicts:
+            scan_id = existing.get(key)
+            if scan_id is not None:
+                _remember(key, scan_id)
+            results[first_index[key]] = _result("duplicate", key, scan_id)
+
+    # Rows the insert didn't hand back
+    for i in pending:
+        if results[i] is None:
+            results[i] = _result("failed", rows[i].get("idempotency_key"), detail="Insert not confirmed")
+
+    # 4. Repeats inside the batch point at their first occurrence
+    for i, first in repeats.items():
+        first_result = results[first]
+        if first_result["status"] == "failed":
+            results[i] = dict(first_result)
+        else:
+            results[i] = _result("duplicate", first_result["idempotency_key"], first_result["id"])
+
+    return results
+
+
+# --------------------------------------------------
+# WRITE-BEHIND MODE
+# --------------------------------------------------
+# SCAN_INGEST_MODE=write_behind acknowledges POST /scans/ once the scan
+# is in the local spool; a background task group-commits the spool to
+# scan_logs through `ingest_scans`.
+#
+# A chunk the DB rejects is bisected down to the offending rows; each of
+# those gets an attempt counted and is dead-lettered in the spool file
+# after SCAN_MAX_ATTEMPTS, so one bad row can't stall the queue.
+# Retryable failures (DB unreachable) are neither bisected nor counted.
+SCAN_INGEST_MODE = os.getenv("SCAN_INGEST_MODE", "direct")
+SCAN_SPOOL_PATH = os.getenv("SCAN_SPOOL_PATH", "scan_spool.db")
+SCAN_FLUSH_SIZE = int(os.getenv("SCAN_FLUSH_SIZE", "200"))
+SCAN_FLUSH_INTERVAL = float(os.getenv("SCAN_FLUSH_INTERVAL", "1.0"))
+SCAN_MAX_ATTEMPTS = int(os.getenv("SCAN_MAX_ATTEMPTS", "5"))
+# Longest pause after the flush loop itself fails (spool locked, disk full)
+SCAN_FLUSH_MAX_BACKOFF = float(os.getenv("SCAN_FLUSH_MAX_BACKOFF", "30"))
+
+SpoolEntry = Tuple[int, Dict[str, Any]]
+
+
+class ScanWriteBehindQueue:
+
+    def __init__(self, path: str, flush_size: int, flush_interval: float, max_attempts: int = SCAN_MAX_ATTEMPTS):
+        self.spool = DurableSpool(path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+
+        self._wakeup = asyncio.Event()
+        self._stop_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._backoff = 0.0
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.flush_failures = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self.loop_errors = 0
+        self.last_flush_ms: Optional[float] = None
+        self.last_flush_at: Optional[str] = None
+
+    async def enqueue(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Durably append one scan row. Every row gets an idempotency key,
+        so a replay after a crash mid-flush can't insert it twice, and a
+        scan_time, so a late flush doesn't move the scan to a later round.
+        """
+        if not row.get("idempotency_key"):
+            row["idempotency_key"] = uuid.uuid4().hex
+
+        if not row.get("scan_time"):
+            row["scan_time"] = datetime.now(timezone.utc).isoformat()
+
+        spool_id = await asyncio.to_thread(self.spool.append, row)
+        self.enqueued += 1
+
+        if self.enqueued % self.flush_size == 0:
+            self._wakeup.set()
+
+        return {"spool_id": spool_id, "idempotency_key": row["idempotency_key"]}
+
+    async def _store(self, entries: List[SpoolEntry]) -> Tuple[List[int], List[SpoolEntry], Optional[str]]:
+        """
+        Insert `entries`, bisecting rejected chunks to isolate the bad rows.
+
+        Returns (stored entry ids, rejected single entries with their
+        error, retryable error or None). On a retryable error the
+        remaining entries are left alone for the next flush.
+        """
+        results = await ingest_scans([dict(payload) for _, payload in entries])
+
+        done, failed = [], []
+
+        for entry, result in zip(entries, results):
+            if result["status"] in ("created", "duplicate"):
+                done.append(entry[0])
+            else:
+                failed.append((entry, result))
+
+        if not failed:
+            return done, [], None
+
+        retryable = next((r for _, r in failed if r.get("retryable", True)), None)
+
+        if retryable is not None:
+            return done, [], retryable.get("error") or retryable.get("detail")
+
+        if len(failed) == 1:
+            entry, result = failed[0]
+            return done, [(entry[0], result.get("error") or result.get("detail"))], None
+
+        failed_entries = [entry for entry, _ in failed]
+        middle = len(failed_entries) // 2
+        rejected = []
+
+        for half in (failed_entries[:middle], failed_entries[middle:]):
+            half_done, half_rejected, error = await self._store(half)
+            done.extend(half_done)
+            rejected.extend(half_rejected)
+
+            if error is not None:
+                return done, rejected, error
+
+        return done, rejected, None
+
+    async def flush_once(self) -> int:
+        """
+        Commit up to `flush_size` spooled scans. Returns rows stored.
+
+        Rows the DB rejects are retried on later flushes and dead-lettered
+        after `max_attempts`; retryable failures leave the spool as is.
+        """
+        entries = await asyncio.to_thread(self.spool.peek, self.flush_size)
+
+        if not entries:
+            return 0
+
+        started = time.perf_counter()
+
+        try:
+            done, rejected, error = await self._store(entries)
+        except Exception as e:
+            # Unexpected error: retry the whole batch (keys make it safe)
+            done, rejected, error = [], [], str(e)
+
+        await asyncio.to_thread(self.spool.delete, done)
+
+        for entry_id, reason in rejected:
+            moved = await asyncio.to_thread(self.spool.fail, [entry_id], reason or "", self.max_attempts)
+            self.dead_lettered += moved
+            if moved:
+                print(f"⛔️ ERROR: Scan spool entry {entry_id} dead-lettered after {self.max_attempts} attempts - {reason}")
+
+        self.rejected += len(rejected)
+
+        if error is not None:
+            print(f"⛔️ ERROR: Scan flush of {len(entries)} rows failed - {error}")
+
+        if error is not None or rejected:
+            self.flush_failures += 1
+
+        self.flushed += len(done)
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_flush_at = datetime.utcnow().isoformat()
+
+        return len(done)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+            # Drain full batches; stop early if a flush makes no progress
+            try:
+                while await self.flush_once() == self.flush_size:
+                    pass
+            except Exception as e:
+                # Keep the task alive; back off so a broken spool isn't hammered
+                self.loop_errors += 1
+                self._backoff = min(max(self._backoff * 2, self.flush_interval), SCAN_FLUSH_MAX_BACKOFF)
+                print(f"⛔️ ERROR: Scan spool flush failed, retrying in {self._backoff}s - {e}")
+                try:
+                    await asyncio.wait_for(self._stop_requested.wait(), timeout=self._backoff)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                self._backoff = 0.0
+
+    async def start(self):
+        """
+        Start the flush task. Anything left in the spool from a previous
+        run (crash recovery) is flushed first.
+        """
+        self._stopping = False
+        self._stop_requested.clear()
+        self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        self._stop_requested.set()
+        self._wakeup.set()
+
+        if self._task:
+            await self._task
+            self._task = None
+
+        # Final best-effort drain; whatever fails is replayed on next start
+        try:
+            while await self.flush_once() == self.flush_size:
+                pass
+        except Exception as e:
+            print(f"⛔️ ERROR: Final scan spool flush failed - {e}")
+
+        await asyncio.to_thread(self.spool.close)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": SCAN_INGEST_MODE,
+            "queue_depth": self.spool.depth(),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flush_failures": self.flush_failures,
+            "rejected": self.rejected,
+            "dead_lettered": self.dead_lettered,
+            "dead_letter_depth": self.spool.dead_depth(),
+            "loop_errors": self.loop_errors,
+            "max_attempts": self.max_attempts,
+            "flush_size": self.flush_size,
+            "flush_interval_seconds": self.flush_interval,
+            "last_flush_ms": self.last_flush_ms,
+            "last_flush_at": self.last_flush_at,
+        }
+
+
+scan_queue: Optional[ScanWriteBehindQueue] = (
+    ScanWriteBehindQueue(SCAN_SPOOL_PATH, SCAN_FLUSH_SIZE, SCAN_FLUSH_INTERVAL)
+    if SCAN_INGEST_MODE == "write_behind"
+    else None
+)
@@ -1,36 +1,84 @@
+import tempfile
 from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
 
-from app.database import supabase
+from app.database import REPORT_SCANS_TABLE, supabase
+from app.services.report_cache import report_day_window
+from app.utils.parallel_fetch import fetch_parallel
+
+
+# ---------------- PARSED SCANS ---------------- #
+
+class ParsedScan:
+    """
+    One scan row with its timestamp parsed once: `epoch` for
+    arithmetic, `clock` ("%I:%M %p") for display.
+    """
+
+    __slots__ = (
+        "epoch",
+        "clock",
+        "employee_name",
+        "employee_id",
+        "qr_name",
+        "latitude",
+        "longitude",
+    )
+
+    def __init__(self, row: Dict):
+        scan_time = datetime.fromisoformat(row["scan_time"])
+
+        self.epoch = scan_time.timestamp()
+        self.clock = scan_time.strftime("%I:%M %p")
+        self.employee_name = row.get("employee_name")
+        self.employee_id = row.get("employee_id")
+        self.qr_name = row.get("qr_name")
+        self.latitude = row.get("latitude")
+        self.longitude = row.get("longitude")
+
+
+def parse_scans(rows: Iterable[Dict]) -> List[ParsedScan]:
+    return [ParsedScan(row) for row in rows]
 
 
 # ---------------- ROUND SPLIT LOGIC ---------------- #
 
-def split_into_rounds(scans, gap_minutes=30):
-    rounds = []
-    current_round = []
+def round_bounds(epochs: Sequence[float], gap_minutes=30) -> List[Tuple[int, int]]:
+    """
+    [start, end) index ranges of rounds in time-ordered `epochs`: a new
+    round starts wherever consecutive scans are more than `gap_minutes`
+    apart.
+    """
+    if not epochs:
+        return []
+
+    gap = gap_minutes * 60
 
-    for scan in scans:
-        scan_time = datetime.fromisoformat(scan["scan_time"])
+    starts = [0] + [
+        i for i, (prev, cur) in enumerate(zip(epochs, epochs[1:]), start=1)
+        if cur - prev > gap
+    ]
 
-        if not current_round:
-            current_round.append(scan)
-        else:
-            last_time = datetime.fromisoformat(current_round[-1]["scan_time"])
-            diff = (scan_time - last_time).total_seconds() / 60
+    return list(zip(starts, starts[1:] + [len(epochs)]))
 
-            if diff > gap_minutes:
-                rounds.append(current_round)
-                current_round = [scan]
-            else:
-                current_round.append(scan)
 
-    if current_round:
-        rounds.append(current_round)
+def split_into_rounds(scans, gap_minutes=30):
+    """
+    Group time-ordered scans into rounds. Accepts ParsedScan records or
+    raw rows (parsed once here) and returns lists of the same items.
+    """
+    scans = list(scans)
+
+    epochs = [
+        s.epoch if isinstance(s, ParsedScan)
+        else datetime.fromisoformat(s["scan_time"]).timestamp()
+        for s in scans
+    ]
 
-    return rounds
+    return [scans[start:end] for start, end in round_bounds(epochs, gap_minutes)]
 
 
 # ---------------- REQUIRED BY ROUTES ---------------- #
@@ -42,117 +90,216 @@ def update_all_scan_statuses():
 
 # ---------------- REPORT DOWNLOAD SERVICE ---------------- #
 
-def generate_report_download(payload):
+# Bytes per chunk when streaming a finished PDF
+PDF_CHUNK_SIZE = 64 * 1024
+
+# Scan rows per table; longer rounds continue in a new table
+PDF_TABLE_ROWS = 200
+
+# Flowables built ahead of the one ReportLab is laying out
+PDF_LOOKAHEAD = 8
+
+PDF_TABLE_HEADER = [
+    "Employee Name",
+    "Employee ID",
+    "Patrol Time",
+    "Location",
+    "Latitude",
+    "Longitude"
+]
+
+
+class LazyFlowables(list):
+    """
+    Flowable list for `doc.build` that is filled from an iterator as
+    ReportLab consumes it from the front, so only PDF_LOOKAHEAD
+    flowables exist at a time instead of the whole report.
+
+    This leans on how BaseDocTemplate.build walks the list (it polls
+    len() before every flowable, which is where we refill), so reportlab
+    is pinned in requirements.txt. `exhausted` lets the caller check the
+    whole source was laid out rather than trust that behaviour.
+    """
+
+    def __init__(self, source: Iterable, lookahead: int = PDF_LOOKAHEAD):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self) -> None:
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self) -> int:
+        self._fill()
+        return list.__len__(self)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._source is None and list.__len__(self) == 0
+
+
+def stream_report_download(payload, chunk_size: int = PDF_CHUNK_SIZE):
+    """
+    Return (chunk iterator, file_name) for a StreamingResponse.
+
+    The PDF is rendered into an anonymous per-request temp file and
+    streamed from there. It is not cached: the footer carries the
+    download time.
+    """
+    file_name = f"Security_Report_{payload.report_date}.pdf"
+
+    tmp = tempfile.TemporaryFile()
+
+    try:
+        build_report_pdf(payload, tmp)
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        raise
+
+    return _iter_file(tmp, chunk_size), file_name
+
+
+def _iter_file(f, chunk_size: int):
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+def build_report_pdf(payload, output):
+    """
+    Fetch the day's scans and build the PDF into `output`
+    (a path or a binary file object).
+    """
     if not supabase:
         raise RuntimeError("Supabase not initialized")
 
-    # 🔹 Factory
-    factory_res = supabase.table("factories") \
-        .select("factory_name, factory_address") \
-        .eq("factory_code", payload.factory_code) \
-        .single() \
-        .execute()
+    # 🔹 Factory, admin and scan logs (fetched concurrently); the IST day,
+    # the same window the cache watermark covers
+    day_start, day_end = report_day_window(payload.report_date)
+
+    results = fetch_parallel(
+        {
+            "factory": lambda: supabase.table("factories") \
+                .select("factory_name, factory_address") \
+                .eq("factory_code", payload.factory_code) \
+                .single() \
+                .execute(),
+            "admin": lambda: supabase.table("users") \
+                .select("full_name") \
+                .eq("user_id", payload.downloaded_by) \
+                .single() \
+                .execute(),
+            "scans": lambda: supabase.table(REPORT_SCANS_TABLE) \
+                .select("""
+                    employee_name,
+                    employee_id,
+                    qr_name,
+                    latitude,
+                    longitude,
+                    scan_time
+                """) \
+                .eq("factory_code", payload.factory_code) \
+                .gte("scan_time", day_start) \
+                .lte("scan_time", day_end) \
+                .order("scan_time") \
+                .execute(),
+        },
+        fetch="report_pdf",
+    )
+
+    factory_res = results["factory"]
+    admin_res = results["admin"]
+    scans_res = results["scans"]
 
     if not factory_res.data:
         raise ValueError("Factory not found")
 
     factory = factory_res.data
 
-    # 🔹 Admin
-    admin_res = supabase.table("users") \
-        .select("full_name") \
-        .eq("user_id", payload.downloaded_by) \
-        .single() \
-        .execute()
-
     admin_name = admin_res.data["full_name"] if admin_res.data else "Admin"
 
-    # 🔹 Scan logs
-    scans_res = supabase.table("scanning_details") \
-        .select("""
-            employee_name,
-            employee_id,
-            qr_name,
-            latitude,
-            longitude,
-            scan_time
-        """) \
-        .eq("factory_code", payload.factory_code) \
-        .gte("scan_time", f"{payload.report_date}T00:00:00") \
-        .lte("scan_time", f"{payload.report_date}T23:59:59") \
-        .order("scan_time") \
-        .execute()
-
-    scans = scans_res.data or []
-
-    if not scans:
+    if not scans_res.data:
         raise ValueError("No scan data found")
 
+    # Timestamps are parsed once here and reused below
+    scans = parse_scans(scans_res.data)
+    del results, scans_res
+
     rounds = split_into_rounds(scans)
 
-    # 🔹 PDF Setup
-    file_name = f"Security_Report_{payload.report_date}.pdf"
-    file_path = f"/tmp/{file_name}"
+    doc = SimpleDocTemplate(output, pagesize=A4)
+
+    flowables = LazyFlowables(_report_flowables(payload, factory, admin_name, rounds))
+    doc.build(flowables)
 
-    doc = SimpleDocTemplate(file_path, pagesize=A4)
+    # A ReportLab that stops polling len() would silently cut the report
+    if not flowables.exhausted:
+        raise RuntimeError("PDF build ended before the last flowable; check the pinned reportlab version")
+
+
+def _report_flowables(payload, factory, admin_name, rounds) -> Iterator:
+    """
+    The report, one round at a time; tables are cut every PDF_TABLE_ROWS
+    scans so even one very long round is never a single huge Table.
+    """
     styles = getSampleStyleSheet()
-    elements = []
 
     # 🔹 Header
-    elements.append(Paragraph(f"<b>{factory['factory_name']}</b>", styles["Title"]))
-    elements.append(Paragraph(factory["factory_address"], styles["Normal"]))
-    elements.append(Spacer(1, 10))
-    elements.append(Paragraph(
+    yield Paragraph(f"<b>{factory['factory_name']}</b>", styles["Title"])
+    yield Paragraph(factory["factory_address"], styles["Normal"])
+    yield Spacer(1, 10)
+    yield Paragraph(
         f"<b>Security Patrol Report : {payload.report_date}</b>",
         styles["Normal"]
-    ))
-    elements.append(Spacer(1, 20))
+    )
+    yield Spacer(1, 20)
 
     # 🔹 Rounds
     for idx, round_scans in enumerate(rounds, start=1):
-        start_time = datetime.fromisoformat(round_scans[0]["scan_time"]).strftime("%I:%M %p")
-        end_time = datetime.fromisoformat(round_scans[-1]["scan_time"]).strftime("%I:%M %p")
+        start_time = round_scans[0].clock
+        end_time = round_scans[-1].clock
 
-        elements.append(Paragraph(
+        yield Paragraph(
             f"S.No : {idx} | Date : {payload.report_date} "
             f"| Start Time : {start_time} | End Time : {end_time}",
             styles["Heading4"]
-        ))
-        elements.append(Spacer(1, 8))
-
-        table_data = [[
-            "Employee Name",
-            "Employee ID",
-            "Patrol Time",
-            "Location",
-            "Latitude",
-            "Longitude"
-        ]]
-
-        for s in round_scans:
-            table_data.append([
-                s["employee_name"],
-                s["employee_id"],
-                datetime.fromisoformat(s["scan_time"]).strftime("%I:%M %p"),
-                s["qr_name"],
-                s["latitude"],
-                s["longitude"]
-            ])
-
-        elements.append(Table(table_data, repeatRows=1))
-        elements.append(Spacer(1, 20))
+        )
+        yield Spacer(1, 8)
+
+        for start in range(0, len(round_scans), PDF_TABLE_ROWS):
+            table_data = [PDF_TABLE_HEADER]
+
+            for s in round_scans[start:start + PDF_TABLE_ROWS]:
+                table_data.append([
+                    s.employee_name,
+                    s.employee_id,
+                    s.clock,
+                    s.qr_name,
+                    s.latitude,
+                    s.longitude
+                ])
+
+            yield Table(table_data, repeatRows=1)
+
+        yield Spacer(1, 20)
 
     # 🔹 Footer
-    elements.append(Spacer(1, 30))
-    elements.append(Paragraph(
+    yield Spacer(1, 30)
+    yield Paragraph(
         f"Downloaded By : <b>{admin_name}</b>",
         styles["Normal"]
-    ))
-    elements.append(Paragraph(
+    )
+    yield Paragraph(
         f"Downloaded On : {datetime.now().strftime('%d-%b-%Y %I:%M %p')}",
         styles["Normal"]
-    ))
-
-    doc.build(elements)
-
-    return file_path, file_name
+    )
@@ -0,0 +1,57 @@
+# app/utils/parallel_fetch.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.metrics import parallel_fetch_seconds
+
+# Threads shared by every report request for its independent queries
+REPORT_FETCH_WORKERS = int(os.getenv("REPORT_FETCH_WORKERS", "16"))
+
+_pool = ThreadPoolExecutor(
+    max_workers=REPORT_FETCH_WORKERS,
+    thread_name_prefix="report-fetch"
+)
+
+
+def _timed(fetch: str, query: str, fn: Callable[[], Any]) -> Any:
+    started = time.perf_counter()
+    status = "error"
+
+    try:
+        result = fn()
+        status = "ok"
+        return result
+    finally:
+        parallel_fetch_seconds.observe((fetch, query, status), time.perf_counter() - started)
+
+
+def fetch_parallel(
+    queries: Dict[str, Callable[[], Any]],
+    fetch: str
+) -> Dict[str, Any]:
+    """
+    Run independent blocking queries concurrently on a bounded pool.
+
+    Returns {name: result}. Each query's latency goes to the
+    parallel_fetch_duration_seconds histogram under (fetch, name), so
+    `fetch` must be a fixed call-site name, not per-request data.
+    The first query error is re-raised once every query has finished.
+    """
+    futures = {name: _pool.submit(_timed, fetch, name, fn) for name, fn in queries.items()}
+
+    results: Dict[str, Any] = {}
+    error = None
+
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            error = error or e
+
+    if error is not None:
+        raise error
+
+    return results
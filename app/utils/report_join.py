@@ -0,0 +1,84 @@
+# app/utils/report_join.py
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+if TYPE_CHECKING:
+    from app.models.scan_record import ScanRecord
+
+IST = pytz.timezone("Asia/Kolkata")
+
+
+# Key used to index scans: (normalized qr_id, round start in IST)
+ScanKey = Tuple[str, datetime]
+
+
+def parse_round_slot(value: Any) -> Optional[datetime]:
+    """
+    Parse a `round_slot` value (ISO string or datetime) into an
+    IST-aware datetime. Returns None for empty values.
+    """
+    if not value:
+        return None
+
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+    if dt.tzinfo is None:
+        return IST.localize(dt)
+
+    return dt.astimezone(IST)
+
+
+def index_scans(scans: Iterable["ScanRecord"]) -> Dict[ScanKey, "ScanRecord"]:
+    """
+    Index scans by (qr_id, round start) in a single pass.
+
+    Scans without a round_slot are skipped. When several scans share
+    the same key the first one wins, matching the old linear search.
+    """
+    scan_map: Dict[ScanKey, "ScanRecord"] = {}
+
+    for s in scans:
+
+        if s.round_start is None:
+            continue
+
+        scan_map.setdefault((str(s.qr_id), s.round_start), s)
+
+    return scan_map
+
+
+def join_report(
+    qr_codes: Iterable[Dict],
+    round_slots: Iterable[Tuple[int, datetime, datetime]],
+    scans: Iterable["ScanRecord"],
+    build_row: Callable[[Dict, int, Optional["ScanRecord"]], Dict],
+) -> List[Dict]:
+    """
+    Join QR codes x round slots against the day's scans.
+
+    `build_row(qr, round_no, scan)` shapes each output row; `scan` is
+    None when no scan was recorded for that QR in that round.
+
+    Runs in O(scans + QR x rounds) instead of rescanning every scan
+    for every cell.
+    """
+    scan_map = index_scans(scans)
+    round_slots = list(round_slots)
+
+    rows = []
+
+    for qr in qr_codes:
+
+        qr_id = str(qr.get("qr_id"))
+
+        for round_no, start_dt, _end_dt in round_slots:
+            scan = scan_map.get((qr_id, start_dt))
+            rows.append(build_row(qr, round_no, scan))
+
+    return rows
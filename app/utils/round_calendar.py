@@ -0,0 +1,91 @@
+# app/utils/round_calendar.py
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import pytz
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# Base round start times
+ROUND_TIMES = [
+    "00:00","00:30","01:00","01:30","02:00","02:30","03:00","03:30",
+    "04:00","04:30","05:00","05:30","06:00","07:00","08:00","09:00",
+    "10:00","11:00","12:00","13:00","14:00","15:00","16:00","17:00",
+    "18:00","19:00","20:00","21:00","21:30","22:00","22:30","23:00","23:30"
+]
+
+# How many dates of slots to keep in memory
+CALENDAR_CACHE_SIZE = 512
+
+RoundSlot = Tuple[int, datetime, datetime]
+
+
+# --------------------------------------------------
+# SCHEDULE (parsed once at import)
+# --------------------------------------------------
+def _parse_schedule():
+    minutes = []
+
+    for t in ROUND_TIMES:
+        h, m = map(int, t.split(":"))
+        minutes.append(h * 60 + m)
+
+    if minutes != sorted(minutes):
+        raise RuntimeError("ROUND_TIMES must be in ascending order")
+
+    # Start/end offsets from midnight; the last round lasts 30 mins
+    ends = minutes[1:] + [minutes[-1] + 30]
+
+    return (
+        tuple(minutes),
+        tuple(
+            (i + 1, timedelta(minutes=start), timedelta(minutes=end))
+            for i, (start, end) in enumerate(zip(minutes, ends))
+        ),
+    )
+
+
+ROUND_START_MINUTES, ROUND_OFFSETS = _parse_schedule()
+
+
+# --------------------------------------------------
+# PER-DATE SLOTS
+# --------------------------------------------------
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def slots_for_date(day: date) -> Tuple[RoundSlot, ...]:
+    """
+    Returns ((round_no, start_dt, end_dt), ...) in IST for `day`.
+    Memoized per date.
+    """
+    base = IST.localize(datetime.combine(day, time(0, 0)))
+
+    return tuple(
+        (round_no, base + start, base + end)
+        for round_no, start, end in ROUND_OFFSETS
+    )
+
+
+# --------------------------------------------------
+# TIMESTAMP -> ROUND
+# --------------------------------------------------
+def slot_for(dt: datetime) -> Optional[int]:
+    """
+    Maps a timestamp to its round number (1-based) with a binary search
+    over the round start times. Naive datetimes are treated as IST.
+    """
+    if dt is None:
+        return None
+
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST)
+
+    minute_of_day = dt.hour * 60 + dt.minute + dt.second / 60
+    idx = bisect_right(ROUND_START_MINUTES, minute_of_day) - 1
+
+    if idx < 0:
+        return None
+
+    return idx + 1
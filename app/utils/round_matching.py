@@ -0,0 +1,96 @@
+# app/utils/round_matching.py
+
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Sequence, Tuple
+
+# Expected round times are naive IST wall-clock times
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def to_local_naive(value: Any) -> Optional[datetime]:
+    """
+    Convert a scan time (ISO string or datetime) to a naive IST
+    datetime so it can be compared with the expected round times.
+    Returns None for empty or unparseable values.
+    """
+    if not value:
+        return None
+
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(IST).replace(tzinfo=None)
+
+    return dt
+
+
+def nearest_rounds(
+    scan_times: Sequence[Optional[datetime]],
+    expected_times: Sequence[datetime],
+) -> List[Tuple[Optional[datetime], float]]:
+    """
+    For every scan time return (closest expected time, diff in seconds)
+    using a binary search over the sorted expected times.
+
+    Ties go to the earlier round. Missing scan times map to (None, inf).
+    """
+    expected = sorted(expected_times)
+    matches = []
+
+    for scan_dt in scan_times:
+
+        if scan_dt is None or not expected:
+            matches.append((None, float("inf")))
+            continue
+
+        i = bisect_left(expected, scan_dt)
+
+        best = None
+        min_diff = float("inf")
+
+        for j in (i - 1, i):
+            if 0 <= j < len(expected):
+                diff = abs((scan_dt - expected[j]).total_seconds())
+                if diff < min_diff:
+                    min_diff = diff
+                    best = expected[j]
+
+        matches.append((best, min_diff))
+
+    return matches
+
+
+def classify_scan_times(
+    scan_times: Sequence[Optional[datetime]],
+    expected_times: Sequence[datetime],
+    grace_seconds: float,
+) -> List[Optional[str]]:
+    """
+    Label a whole day of scans in one pass:
+    - 'SUCCESS' when the nearest expected round is within the grace period
+    - 'LATE' when it is further away
+    - 'MISSED' when there are no expected rounds at all
+    - None for scans without a usable time
+    """
+    labels = []
+
+    for scan_dt, (best, min_diff) in zip(
+        scan_times, nearest_rounds(scan_times, expected_times)
+    ):
+        if scan_dt is None:
+            labels.append(None)
+        elif best is None:
+            labels.append("MISSED")
+        elif min_diff <= grace_seconds:
+            labels.append("SUCCESS")
+        else:
+            labels.append("LATE")
+
+    return labels
@@ -0,0 +1,149 @@
+# app/utils/spool.py
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+
+class DurableSpool:
+    """
+    Append-only local queue backed by SQLite in WAL mode.
+
+    `append` returns only after the entry is committed to disk, so
+    entries survive a crash and are handed out again by `peek` until
+    they are `delete`d.
+
+    Entries that keep failing are counted with `fail`; once an entry
+    reaches `max_attempts` it is moved to the `dead_letter` table so it
+    stops blocking the head of the queue.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letter ("
+            " id INTEGER PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " failed_at TEXT NOT NULL"
+            ")"
+        )
+
+        # Spool files written before attempts were tracked
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(spool)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE spool ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "last_error" not in columns:
+            self._conn.execute("ALTER TABLE spool ADD COLUMN last_error TEXT")
+
+    def append(self, payload: Dict[str, Any]) -> int:
+        data = json.dumps(payload, default=str)
+
+        with self._lock:
+            cur = self._conn.execute("INSERT INTO spool (payload) VALUES (?)", (data,))
+            return cur.lastrowid
+
+    def append_many(self, payloads: List[Dict[str, Any]]) -> None:
+        """
+        Append several entries in one transaction (one fsync).
+        """
+        if not payloads:
+            return
+
+        data = [(json.dumps(p, default=str),) for p in payloads]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT INTO spool (payload) VALUES (?)", data)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def peek(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Oldest `limit` entries as (entry_id, payload), without removing them.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+
+        return [(entry_id, json.loads(payload)) for entry_id, payload in rows]
+
+    def delete(self, entry_ids: List[int]) -> None:
+        if not entry_ids:
+            return
+
+        with self._lock:
+            # One transaction (one fsync) for the whole batch
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM spool WHERE id = ?", [(i,) for i in entry_ids]
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def fail(self, entry_ids: List[int], error: str, max_attempts: int) -> int:
+        """
+        Count one more failed attempt for each entry; entries that reach
+        `max_attempts` move to `dead_letter`. Returns how many moved.
+        """
+        if not entry_ids:
+            return 0
+
+        marks = ",".join("?" * len(entry_ids))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    f"UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE id IN ({marks})",
+                    (error, *entry_ids),
+                )
+                moved = self._conn.execute(
+                    "INSERT INTO dead_letter (id, payload, attempts, error, failed_at)"
+                    " SELECT id, payload, attempts, last_error, datetime('now') FROM spool"
+                    f" WHERE id IN ({marks}) AND attempts >= ?",
+                    (*entry_ids, max_attempts),
+                ).rowcount
+                self._conn.execute(
+                    f"DELETE FROM spool WHERE id IN ({marks}) AND attempts >= ?",
+                    (*entry_ids, max_attempts),
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+        return moved
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def dead_depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
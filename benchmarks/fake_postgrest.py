@@ -0,0 +1,427 @@
+# benchmarks/fake_postgrest.py
+
+"""
+In-memory stand-in for the supabase-py / postgrest query builder.
+
+Understands the calls this codebase makes:
+table / select / eq / gt / gte / lt / lte / in_ / order / limit /
+single / insert / upsert / update / delete / execute and rpc, for both the sync
+client and the async one (where `execute()` is awaited).
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+class FakeResponse:
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _coerce(value: Any) -> Any:
+    """
+    Make filter values and stored values comparable the way Postgres
+    would: ISO strings and datetimes compare as instants (naive = UTC).
+    """
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str) and len(value) >= 19 and value[4] == "-" and value[10] in "T ":
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    else:
+        return value
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+
+    return dt
+
+
+def _same(a: Any, b: Any) -> bool:
+    # PostgREST filters are text in the URL, so 5 matches "5"
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, bool) or isinstance(b, bool):
+        return str(a).lower() == str(b).lower()
+    return str(a) == str(b) or _coerce(a) == _coerce(b)
+
+
+def _compare(a: Any, b: Any) -> Optional[int]:
+    if a is None or b is None:
+        return None
+
+    a, b = _coerce(a), _coerce(b)
+
+    if isinstance(a, (int, float)) and isinstance(b, str):
+        b = float(b)
+    elif isinstance(b, (int, float)) and isinstance(a, str):
+        a = float(a)
+
+    return (a > b) - (a < b)
+
+
+class FakeTable:
+    """
+    Rows of one table plus its id sequence and column defaults.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        id_column: Optional[str],
+        defaults: Dict[str, Callable[[], Any]],
+        unique: Tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.id_column = id_column
+        self.defaults = defaults
+        self.unique = unique
+        self.rows: List[Dict[str, Any]] = []
+        self.next_id = 1
+
+    def find(self, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        if value is None:
+            return None
+        return next((r for r in self.rows if r.get(column) == value), None)
+
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+
+        for column in self.unique:
+            if self.find(column, row.get(column)) is not None:
+                raise APIError({
+                    "code": "23505",
+                    "message": f"duplicate key value violates unique constraint on {self.name}.{column}",
+                })
+
+        for column, default in self.defaults.items():
+            if row.get(column) is None:
+                row[column] = default()
+
+        if self.id_column:
+            if row.get(self.id_column) is None:
+                row[self.id_column] = self.next_id
+            if isinstance(row[self.id_column], int):
+                self.next_id = max(self.next_id, row[self.id_column] + 1)
+
+        self.rows.append(row)
+        return row
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Primary keys, DB-side defaults and unique columns for the tables this
+# app touches
+TABLE_SCHEMAS = {
+    "factories": ("id", {"created_at": _now_iso}, ()),
+    "qr": ("qr_id", {"created_at": _now_iso}, ()),
+    "scan_points": ("id", {"created_at": _now_iso}, ()),
+    "security_users": ("id", {"created_at": _now_iso}, ()),
+    "login_info": ("id", {}, ()),
+    "scanning_details": ("id", {"scan_time": _now_iso, "created_at": _now_iso}, ("idempotency_key",)),
+    "scan_logs": ("id", {"scan_time": _now_iso, "created_at": _now_iso}, ("idempotency_key",)),
+    "report_audit": ("id", {}, ()),
+}
+
+
+class FakeDatabase:
+    """
+    Shared in-memory state. `latency` seconds are added to every
+    execute() to model the PostgREST round trip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, FakeTable] = {}
+        self.lock = threading.RLock()
+        self.calls: Dict[str, int] = {}
+        # rpc name -> fn(db, params) standing in for the SQL function
+        self.functions: Dict[str, Callable[["FakeDatabase", Dict], Any]] = {}
+        # table -> [fn(db, row)] run after each insert (AFTER INSERT triggers)
+        self.triggers: Dict[str, List[Callable[["FakeDatabase", Dict], None]]] = {}
+
+    def table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            id_column, defaults, unique = TABLE_SCHEMAS.get(name, ("id", {}, ()))
+            self.tables[name] = FakeTable(name, id_column, defaults, unique)
+        return self.tables[name]
+
+    def insert(self, name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            stored = self.table(name).add(row)
+            for trigger in self.triggers.get(name, []):
+                trigger(self, stored)
+            return stored
+
+    def load(self, name: str, rows: List[Dict[str, Any]]) -> None:
+        with self.lock:
+            for row in rows:
+                self.insert(name, row)
+
+    def count_call(self, table: str, operation: str) -> None:
+        key = f"{operation} {table}"
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+
+class _Query:
+
+    def __init__(self, db: FakeDatabase, table: str):
+        self._db = db
+        self._table = table
+        self._operation = "select"
+        self._columns: Optional[List[str]] = None
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._filters: List[Callable[[Dict], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._single = False
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+
+    # ---------- operations ---------- #
+
+    def select(self, columns: str = "*", count: Optional[str] = None, **_kwargs):
+        # insert(...).select("*") just asks for the inserted rows back
+        if self._operation == "select":
+            columns = columns.strip()
+            self._columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        self._count = count
+        return self
+
+    def insert(self, json, **_kwargs):
+        self._operation = "insert"
+        self._payload = json
+        return self
+
+    def upsert(self, json, on_conflict: str = "", ignore_duplicates: bool = False, **_kwargs):
+        self._operation = "upsert"
+        self._payload = json
+        self._on_conflict = on_conflict or self._db.table(self._table).id_column
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, **_kwargs):
+        self._operation = "update"
+        self._payload = json
+        return self
+
+    def delete(self, **_kwargs):
+        self._operation = "delete"
+        return self
+
+    # ---------- filters ---------- #
+
+    def eq(self, column: str, value: Any):
+        self._filters.append(lambda r: _same(r.get(column), value))
+        return self
+
+    def neq(self, column: str, value: Any):
+        self._filters.append(lambda r: not _same(r.get(column), value))
+        return self
+
+    def _cmp(self, column: str, value: Any, ok: Callable[[int], bool]):
+        def match(r):
+            c = _compare(r.get(column), value)
+            return c is not None and ok(c)
+        self._filters.append(match)
+        return self
+
+    def gt(self, column, value):
+        return self._cmp(column, value, lambda c: c > 0)
+
+    def gte(self, column, value):
+        return self._cmp(column, value, lambda c: c >= 0)
+
+    def lt(self, column, value):
+        return self._cmp(column, value, lambda c: c < 0)
+
+    def lte(self, column, value):
+        return self._cmp(column, value, lambda c: c <= 0)
+
+    def in_(self, column: str, values):
+        wanted = {str(v) for v in values}
+        self._filters.append(lambda r: str(r.get(column)) in wanted)
+        return self
+
+    # ---------- modifiers ---------- #
+
+    def order(self, column: str, desc: bool = False, **_kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_kwargs):
+        self._limit = size
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    # ---------- execution ---------- #
+
+    def _project(self, row: Dict) -> Dict:
+        if self._columns is None:
+            return copy.copy(row)
+        return {c: row.get(c) for c in self._columns}
+
+    def _run(self) -> FakeResponse:
+        self._db.count_call(self._table, self._operation)
+
+        with self._db.lock:
+            table = self._db.table(self._table)
+
+            if self._operation == "insert":
+                payload = self._payload if isinstance(self._payload, list) else [self._payload]
+                data = [copy.copy(self._db.insert(self._table, row)) for row in payload]
+                return FakeResponse(data)
+
+            if self._operation == "upsert":
+                payload = self._payload if isinstance(self._payload, list) else [self._payload]
+                data = []
+                for row in payload:
+                    existing = table.find(self._on_conflict, row.get(self._on_conflict))
+                    if existing is None:
+                        data.append(copy.copy(self._db.insert(self._table, row)))
+                    elif not self._ignore_duplicates:
+                        existing.update(row)
+                        data.append(copy.copy(existing))
+                return FakeResponse(data)
+
+            matched = [r for r in table.rows if all(f(r) for f in self._filters)]
+
+            if self._operation == "update":
+                for row in matched:
+                    row.update(self._payload)
+                return FakeResponse([copy.copy(r) for r in matched])
+
+            if self._operation == "delete":
+                doomed = {id(r) for r in matched}
+                table.rows = [r for r in table.rows if id(r) not in doomed]
+                return FakeResponse([copy.copy(r) for r in matched])
+
+            total = len(matched)
+
+            for column, desc in reversed(self._order):
+                matched.sort(
+                    key=lambda r: (r.get(column) is None, _coerce(r.get(column))),
+                    reverse=desc,
+                )
+
+            if self._limit is not None:
+                matched = matched[:self._limit]
+
+            data = [self._project(r) for r in matched]
+
+        count = total if self._count else None
+
+        if self._single:
+            if len(data) != 1:
+                raise FakeAPIError(f"single() matched {len(data)} rows in {self._table}")
+            return FakeResponse(data[0], count)
+
+        return FakeResponse(data, count)
+
+
+class _RPC:
+
+    def __init__(self, db: FakeDatabase, name: str, params: Optional[Dict]):
+        self._db = db
+        self._name = name
+        self._params = params or {}
+
+    def _run(self) -> FakeResponse:
+        self._db.count_call(self._name, "rpc")
+
+        fn = self._db.functions.get(self._name)
+
+        if fn is None:
+            raise FakeAPIError(f"function {self._name} does not exist")
+
+        with self._db.lock:
+            return FakeResponse(fn(self._db, self._params))
+
+
+class FakeSyncRPC(_RPC):
+
+    def execute(self) -> FakeResponse:
+        if self._db.latency:
+            time.sleep(self._db.latency)
+        return self._run()
+
+
+class FakeAsyncRPC(_RPC):
+
+    async def execute(self) -> FakeResponse:
+        if self._db.latency:
+            await asyncio.sleep(self._db.latency)
+        return self._run()
+
+
+class FakeSyncQuery(_Query):
+
+    def execute(self) -> FakeResponse:
+        if self._db.latency:
+            time.sleep(self._db.latency)
+        return self._run()
+
+
+class FakeAsyncQuery(_Query):
+
+    async def execute(self) -> FakeResponse:
+        if self._db.latency:
+            await asyncio.sleep(self._db.latency)
+        return self._run()
+
+
+class FakeClient:
+    """
+    Drop-in for `supabase.Client`.
+    """
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def table(self, name: str) -> FakeSyncQuery:
+        return FakeSyncQuery(self.db, name)
+
+    def rpc(self, fn: str, params: Optional[Dict] = None) -> FakeSyncRPC:
+        return FakeSyncRPC(self.db, fn, params)
+
+    from_ = table
+
+
+class FakeAsyncClient:
+    """
+    Drop-in for `supabase.AsyncClient`.
+    """
+
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def table(self, name: str) -> FakeAsyncQuery:
+        return FakeAsyncQuery(self.db, name)
+
+    def rpc(self, fn: str, params: Optional[Dict] = None) -> FakeAsyncRPC:
+        return FakeAsyncRPC(self.db, fn, params)
+
+    from_ = table
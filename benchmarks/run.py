@@ -0,0 +1,270 @@
+# benchmarks/run.py
+
+"""
+Time the report, analytics and ingestion paths against an in-memory
+PostgREST stand-in (no Supabase needed).
+
+    python -m benchmarks.run
+    python -m benchmarks.run --factories 20 --days 90 --latency-ms 5 --json out.json
+
+Data and workloads are seeded, so every run processes the same rows;
+result checksums are printed next to timings so changes in behaviour
+show up as well as changes in speed.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+
+# Never talk to a real project, and keep caches/spools out of the repo
+_workdir = tempfile.mkdtemp(prefix="sv_bench_")
+os.environ["SUPABASE_URL"] = "http://127.0.0.1:54321"
+os.environ["SUPABASE_KEY"] = "bench.bench.bench"
+os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ["SCAN_INGEST_MODE"] = "direct"
+os.environ["REPORT_CACHE_DIR"] = os.path.join(_workdir, "report_cache")
+os.environ["REPORT_AUDIT_SPOOL_PATH"] = os.path.join(_workdir, "report_audit_spool.db")
+os.environ["SCAN_SPOOL_PATH"] = os.path.join(_workdir, "scan_spool.db")
+
+from benchmarks.fake_postgrest import FakeAsyncClient, FakeClient, FakeDatabase  # noqa: E402
+from benchmarks.synthetic import Scale, generate, scan_payloads  # noqa: E402
+
+import app.database as database  # noqa: E402
+from app.routes import report as report_routes  # noqa: E402
+from app.routes import scanning_details as scan_routes  # noqa: E402
+from app.schemas.scanning_details import ScanCreate  # noqa: E402
+from app.services import analytics_service  # noqa: E402
+from app.services import report_service  # noqa: E402
+from app.services.report_cache import report_cache  # noqa: E402
+from app.services.scan_ingest import ingest_scans  # noqa: E402
+
+
+# --------------------------------------------------
+# WIRING
+# --------------------------------------------------
+
+def install_fake(db: FakeDatabase) -> None:
+    """
+    Point `supabase`, `get_db` and `get_async_db` at the fake in
+    app.database and in every app module that imported them by name.
+    """
+    sync_client = FakeClient(db)
+    async_client = FakeAsyncClient(db)
+
+    async def fake_get_async_db():
+        return async_client
+
+    replacements = {
+        "supabase": (database.supabase, sync_client),
+        "get_db": (database.get_db, lambda: sync_client),
+        "get_async_db": (database.get_async_db, fake_get_async_db),
+    }
+
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name == "app" or name.startswith("app.")):
+            continue
+
+        for attr, (original, fake) in replacements.items():
+            if getattr(module, attr, None) is original:
+                setattr(module, attr, fake)
+
+
+# --------------------------------------------------
+# TIMING
+# --------------------------------------------------
+
+def _checksum(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _summary(name: str, samples: List[float], ops: int, check: Any) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    total = sum(samples)
+
+    return {
+        "name": name,
+        "runs": len(samples),
+        "ops": ops,
+        "total_s": round(total, 4),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "ops_per_s": round(ops / total, 1) if total else None,
+        "checksum": _checksum(check),
+    }
+
+
+def bench(name: str, calls: List[Callable[[], Any]], quiet: bool = True) -> Dict[str, Any]:
+    samples, outputs = [], []
+
+    for call in calls:
+        sink = io.StringIO() if quiet else None
+
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            started = time.perf_counter()
+            outputs.append(call())
+            samples.append(time.perf_counter() - started)
+
+    return _summary(name, samples, len(calls), outputs)
+
+
+# --------------------------------------------------
+# WORKLOADS
+# --------------------------------------------------
+
+def run_all(scale: Scale, db: FakeDatabase, repeat: int, scans: int, quiet: bool) -> List[Dict]:
+    factory_codes = [f"F{i + 1:03d}" for i in range(scale.factories)]
+    days = [scale.end_date - timedelta(days=d) for d in range(min(scale.days, 7))]
+    pairs = [(code, day.isoformat()) for code in factory_codes for day in days] * repeat
+    user = {"user_id": "bench", "name": "Bench", "role": "ADMIN"}
+    client = FakeClient(db)
+
+    results = []
+
+    results.append(bench(
+        "download_report",
+        [lambda c=c, d=d: report_routes.download_report(factory_code=c, report_date=d, db=client)
+         for c, d in pairs],
+        quiet,
+    ))
+
+    def generate_cold(code, day):
+        report_cache.invalidate(code, day)
+        return report_service.generate_report(client, code, day, user)["data"]
+
+    results.append(bench(
+        "generate_report (cold cache)",
+        [lambda c=c, d=d: generate_cold(c, d) for c, d in pairs],
+        quiet,
+    ))
+
+    results.append(bench(
+        "generate_report (warm cache)",
+        [lambda c=c, d=d: report_service.generate_report(client, c, d, user)["data"] for c, d in pairs],
+        quiet,
+    ))
+
+    def statuses(day, batched):
+        out = analytics_service.update_all_scan_statuses(day, batched=batched)
+        out.pop("batches", None)
+        return out
+
+    results.append(bench(
+        "update_all_scan_statuses (batched)",
+        [lambda d=d: statuses(d, True) for d in days] * repeat,
+        quiet,
+    ))
+
+    results.append(bench(
+        "update_all_scan_statuses (per row)",
+        [lambda d=d: statuses(d, False) for d in days[:1]] * repeat,
+        quiet,
+    ))
+
+    payloads = scan_payloads(scale, scans)
+
+    async def create_one(payload):
+        response = await scan_routes.create_scan(ScanCreate(**payload))
+        return response.qr_id
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        results.append(bench(
+            "create_scan",
+            [lambda p=p: loop.run_until_complete(create_one(p)) for p in payloads],
+            quiet,
+        ))
+
+        batch_size = 200
+        batches = [payloads[i:i + batch_size] for i in range(0, len(payloads), batch_size)]
+
+        async def ingest(batch):
+            rows = [dict(p, idempotency_key=f"bench-{i}-{p['qr_id']}") for i, p in enumerate(batch)]
+            out = await ingest_scans(rows)
+            return [r["status"] for r in out]
+
+        result = bench(
+            f"ingest_scans (batches of {batch_size})",
+            [lambda b=b: loop.run_until_complete(ingest(b)) for b in batches],
+            quiet,
+        )
+        result["ops"] = len(payloads)
+        result["ops_per_s"] = round(len(payloads) / result["total_s"], 1) if result["total_s"] else None
+        results.append(result)
+
+    finally:
+        loop.close()
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factories", type=int, default=Scale.factories)
+    parser.add_argument("--qrs", type=int, default=Scale.qrs_per_factory, help="QRs per factory")
+    parser.add_argument("--guards", type=int, default=Scale.guards_per_factory, help="guards per factory")
+    parser.add_argument("--days", type=int, default=Scale.days)
+    parser.add_argument("--seed", type=int, default=Scale.seed)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scans", type=int, default=1000, help="scans posted by the ingestion benchmarks")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated PostgREST round trip")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own log output")
+    args = parser.parse_args(argv)
+
+    scale = Scale(
+        factories=args.factories,
+        qrs_per_factory=args.qrs,
+        guards_per_factory=args.guards,
+        days=args.days,
+        seed=args.seed,
+    )
+
+    started = time.perf_counter()
+    data = generate(scale)
+
+    db = FakeDatabase(latency=args.latency_ms / 1000)
+    for table, rows in data.items():
+        db.load(table, rows)
+
+    install_fake(db)
+
+    print(
+        f"Synthetic data: {scale.factories} factories, {len(data['qr'])} QRs, "
+        f"{len(data['security_users'])} guards, {len(data['scanning_details'])} scans "
+        f"over {scale.days} days (seed {scale.seed}, {time.perf_counter() - started:.2f}s)"
+    )
+
+    results = run_all(scale, db, args.repeat, args.scans, quiet=not args.verbose)
+
+    header = f"{'benchmark':<38}{'runs':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>10}  checksum"
+    print(header)
+    print("-" * len(header))
+
+    for r in results:
+        print(
+            f"{r['name']:<38}{r['runs']:>6}{r['mean_ms']:>10}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['ops_per_s'] or '-':>10}  {r['checksum']}"
+        )
+
+    print("\nPostgREST calls:", json.dumps(dict(sorted(db.calls.items()))))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scale": vars(args), "results": results, "calls": db.calls}, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
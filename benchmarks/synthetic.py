@@ -0,0 +1,155 @@
+# benchmarks/synthetic.py
+
+"""
+Seeded synthetic data: factories, QRs, guards and N days of patrol
+scans laid out on the real round calendar.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List
+
+from app.utils.round_calendar import slots_for_date
+
+
+@dataclass
+class Scale:
+    factories: int = 5
+    qrs_per_factory: int = 20
+    guards_per_factory: int = 6
+    days: int = 30
+    # Share of (qr, round) pairs that get scanned
+    coverage: float = 0.85
+    # Share of scans that land late (> 10 min after round start)
+    late_rate: float = 0.1
+    end_date: date = date(2025, 1, 31)
+    seed: int = 42
+
+
+def generate(scale: Scale) -> Dict[str, List[Dict]]:
+    """
+    Return {table: rows}. The same Scale always yields the same rows.
+    """
+    rng = random.Random(scale.seed)
+
+    factories, qrs, guards, logins, scans = [], [], [], [], []
+    qr_id = 1
+
+    for f in range(scale.factories):
+        code = f"F{f + 1:03d}"
+        base_lat, base_lon = 12.9 + rng.random(), 77.5 + rng.random()
+
+        factories.append({
+            "factory_code": code,
+            "factory_name": f"Factory {f + 1}",
+            "factory_address": f"{f + 1} Industrial Area",
+            "location": f"Zone {f % 4 + 1}",
+            "is_active": True,
+        })
+
+        for q in range(scale.qrs_per_factory):
+            qrs.append({
+                "qr_id": qr_id,
+                "qr_name": f"{code}-P{q + 1:02d}",
+                "factory_code": code,
+                "lat": base_lat + rng.uniform(-0.001, 0.001),
+                "lon": base_lon + rng.uniform(-0.001, 0.001),
+                "waiting_time": 15,
+                "status": "active",
+            })
+            qr_id += 1
+
+        for g in range(scale.guards_per_factory):
+            security_id = f"{code}-G{g + 1:02d}"
+            guards.append({
+                "security_id": security_id,
+                "security_name": f"Guard {security_id}",
+                "security_password": f"{rng.randrange(10000):04d}",
+                "factory": code,
+            })
+            logins.append({
+                "user_id": security_id,
+                "user_pin": f"{rng.randrange(10000):04d}",
+                "name": f"Guard {security_id}",
+                "role": "GUARD",
+            })
+
+    qrs_by_factory: Dict[str, List[Dict]] = {}
+    for qr in qrs:
+        qrs_by_factory.setdefault(qr["factory_code"], []).append(qr)
+
+    start_date = scale.end_date - timedelta(days=scale.days - 1)
+    scan_id = 1
+
+    for d in range(scale.days):
+        day = start_date + timedelta(days=d)
+
+        for factory in factories:
+            code = factory["factory_code"]
+            roster = [g["security_name"] for g in guards if g["factory"] == code]
+
+            for round_no, start, end in slots_for_date(day):
+                guard = roster[round_no % len(roster)]
+                window = max(1, int((end - start).total_seconds() // 60) - 1)
+
+                for qr in qrs_by_factory[code]:
+                    if rng.random() >= scale.coverage:
+                        continue
+
+                    if rng.random() < scale.late_rate:
+                        offset = rng.randint(11, window)
+                    else:
+                        offset = rng.randint(0, min(10, window))
+
+                    scan_time = start + timedelta(minutes=offset, seconds=rng.randint(0, 59))
+
+                    scans.append({
+                        "id": scan_id,
+                        "qr_id": str(qr["qr_id"]),
+                        "qr_name": qr["qr_name"],
+                        "factory_code": code,
+                        "guard_name": guard,
+                        "guard_id": guard,
+                        "lat": qr["lat"],
+                        "log": qr["lon"],
+                        "status": "success",
+                        "scan_time": scan_time.isoformat(),
+                        "round_slot": start.isoformat(),
+                        "created_at": scan_time.isoformat(),
+                    })
+                    scan_id += 1
+
+    return {
+        "factories": factories,
+        "qr": qrs,
+        "security_users": guards,
+        "login_info": logins,
+        "scanning_details": scans,
+        # GET/POST /scans work on scan_logs
+        "scan_logs": [dict(s) for s in scans],
+    }
+
+
+def scan_payloads(scale: Scale, count: int) -> List[Dict]:
+    """
+    Bodies for POST /scans, with a seed of their own.
+    """
+    rng = random.Random(scale.seed + 1)
+    payloads = []
+
+    for _ in range(count):
+        f = rng.randrange(scale.factories)
+        q = rng.randrange(scale.qrs_per_factory)
+        code = f"F{f + 1:03d}"
+        payloads.append({
+            "guard_name": f"Guard {code}-G{rng.randrange(scale.guards_per_factory) + 1:02d}",
+            "qr_id": str(f * scale.qrs_per_factory + q + 1),
+            "qr_name": f"{code}-P{q + 1:02d}",
+            "lat": 12.9,
+            "log": 77.5,
+            "status": "success",
+            "factory_code": code,
+        })
+
+    return payloads
@@ -0,0 +1,110 @@
+-- sql/dashboard_aggregates.sql
+--
+-- Admin dashboard counters, kept by the database itself: a trigger on
+-- scan_logs updates them in the same transaction as every scan insert,
+-- whichever worker, replica or tool wrote the scan.
+--
+-- Times are bucketed by half hour of the IST day. Every round starts on
+-- a half hour, so each bucket falls inside exactly one round and the
+-- app maps buckets to rounds (app/services/dashboard_aggregates.py).
+--
+-- Assumes scan_logs.scan_time / created_at are timestamptz.
+
+create table if not exists dashboard_scan_buckets (
+    id bigint generated always as identity primary key,
+    factory_code text not null,
+    day date not null,                 -- IST date
+    bucket smallint not null,          -- half hour of the IST day, 0..47
+    scans integer not null default 0,
+    first_scan timestamp not null,     -- naive IST
+    last_scan timestamp not null,      -- naive IST
+    unique (factory_code, day, bucket)
+);
+
+create table if not exists dashboard_guard_days (
+    id bigint generated always as identity primary key,
+    factory_code text not null,
+    day date not null,                 -- IST date
+    guard_name text not null,
+    unique (factory_code, day, guard_name)
+);
+
+create or replace function dashboard_record_scan() returns trigger
+language plpgsql as $$
+declare
+    local_ts timestamp := coalesce(new.scan_time, new.created_at, now()) at time zone 'Asia/Kolkata';
+begin
+    if new.factory_code is null then
+        return new;
+    end if;
+
+    insert into dashboard_scan_buckets as b (factory_code, day, bucket, scans, first_scan, last_scan)
+    values (
+        new.factory_code,
+        local_ts::date,
+        (extract(hour from local_ts) * 2 + floor(extract(minute from local_ts) / 30))::smallint,
+        1,
+        local_ts,
+        local_ts
+    )
+    on conflict (factory_code, day, bucket) do update
+        set scans = b.scans + 1,
+            first_scan = least(b.first_scan, excluded.first_scan),
+            last_scan = greatest(b.last_scan, excluded.last_scan);
+
+    if coalesce(new.guard_name, '') <> '' then
+        insert into dashboard_guard_days (factory_code, day, guard_name)
+        values (new.factory_code, local_ts::date, new.guard_name)
+        on conflict do nothing;
+    end if;
+
+    return new;
+end;
+$$;
+
+drop trigger if exists scan_logs_dashboard on scan_logs;
+create trigger scan_logs_dashboard
+    after insert on scan_logs
+    for each row execute function dashboard_record_scan();
+
+-- Recompute [p_from, p_to] from scan_logs (first install, backfills,
+-- after deleting scans). Inserts wait for the rebuild to commit, so no
+-- scan is counted twice or lost.
+create or replace function rebuild_dashboard_aggregates(p_from date, p_to date)
+returns json language plpgsql security definer as $$
+declare
+    processed integer;
+begin
+    lock table scan_logs in share mode;
+
+    delete from dashboard_scan_buckets where day between p_from and p_to;
+    delete from dashboard_guard_days where day between p_from and p_to;
+
+    create temporary table rebuild_scans on commit drop as
+    select factory_code, guard_name,
+           coalesce(scan_time, created_at) at time zone 'Asia/Kolkata' as local_ts
+    from scan_logs
+    where factory_code is not null
+      and coalesce(scan_time, created_at) >= p_from::timestamp at time zone 'Asia/Kolkata'
+      and coalesce(scan_time, created_at) < (p_to + 1)::timestamp at time zone 'Asia/Kolkata';
+
+    select count(*) into processed from rebuild_scans;
+
+    insert into dashboard_scan_buckets (factory_code, day, bucket, scans, first_scan, last_scan)
+    select factory_code,
+           local_ts::date,
+           (extract(hour from local_ts) * 2 + floor(extract(minute from local_ts) / 30))::smallint,
+           count(*),
+           min(local_ts),
+           max(local_ts)
+    from rebuild_scans
+    group by 1, 2, 3;
+
+    insert into dashboard_guard_days (factory_code, day, guard_name)
+    select distinct factory_code, local_ts::date, guard_name
+    from rebuild_scans
+    where coalesce(guard_name, '') <> '';
+
+    return json_build_object('scans_processed', processed);
+end;
+$$;
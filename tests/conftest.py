@@ -0,0 +1,52 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Never talk to a real project, and keep caches/spools out of the repo
+_workdir = tempfile.mkdtemp(prefix="sv_tests_")
+os.environ["SUPABASE_URL"] = "http://127.0.0.1:54321"
+os.environ["SUPABASE_KEY"] = "test.test.test"
+os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["SCAN_INGEST_MODE"] = "direct"
+os.environ["REPORT_CACHE_DIR"] = os.path.join(_workdir, "report_cache")
+os.environ["REPORT_AUDIT_SPOOL_PATH"] = os.path.join(_workdir, "report_audit_spool.db")
+os.environ["SCAN_SPOOL_PATH"] = os.path.join(_workdir, "scan_spool.db")
+
+from benchmarks.fake_postgrest import FakeAsyncClient, FakeClient, FakeDatabase  # noqa: E402
+
+import app.database as database  # noqa: E402
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    Empty in-memory PostgREST, wired in place of `supabase`, `get_db`
+    and `get_async_db` in every loaded app module.
+    """
+    db = FakeDatabase()
+    sync_client = FakeClient(db)
+    async_client = FakeAsyncClient(db)
+
+    async def fake_get_async_db():
+        return async_client
+
+    replacements = {
+        "supabase": (database.supabase, sync_client),
+        "get_db": (database.get_db, lambda: sync_client),
+        "get_async_db": (database.get_async_db, fake_get_async_db),
+    }
+
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name == "app" or name.startswith("app.")):
+            continue
+
+        for attr, (original, fake) in replacements.items():
+            if getattr(module, attr, None) is original:
+                monkeypatch.setattr(module, attr, fake)
+
+    return db
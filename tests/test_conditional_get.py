@@ -0,0 +1,67 @@
+# tests/test_conditional_get.py
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.conditional_get import conditional_get_middleware
+from tests.test_scans import scan
+
+
+def _client(fake_db):
+    app = FastAPI()
+    app.middleware("http")(conditional_get_middleware)
+    handled = []
+
+    @app.get("/scans/")
+    def scans(format: str = "json"):
+        handled.append(format)
+        qr_ids = [row["qr_id"] for row in fake_db.table("scan_logs").rows]
+
+        if format == "ndjson":
+            return StreamingResponse((f'"{q}"\n' for q in qr_ids), media_type="application/x-ndjson")
+
+        response = JSONResponse(qr_ids)
+        response.set_cookie("a", "1")
+        response.set_cookie("b", "2")
+        return response
+
+    return TestClient(app), handled
+
+
+def test_if_none_match_is_answered_from_the_watermark(fake_db):
+    fake_db.load("scan_logs", [scan("1")])
+    client, handled = _client(fake_db)
+
+    res = client.get("/scans/")
+    etag = res.headers["etag"]
+
+    assert res.status_code == 200 and res.json() == ["1"]
+    assert fake_db.calls["select scan_logs"] == 1  # the watermark query
+
+    # Same watermark: 304 without running the handler
+    assert client.get("/scans/", headers={"If-None-Match": etag}).status_code == 304
+    assert len(handled) == 1
+
+    # A new scan moves the watermark: full response with a new ETag
+    fake_db.load("scan_logs", [scan("2")])
+    res = client.get("/scans/", headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.json() == ["1", "2"]
+    assert res.headers["etag"] != etag
+
+
+def test_streamed_body_gets_an_etag_and_repeated_headers_survive(fake_db):
+    fake_db.load("scan_logs", [scan("1"), scan("2")])
+    client, handled = _client(fake_db)
+
+    streamed = client.get("/scans/", params={"format": "ndjson"})
+    assert streamed.text == '"1"\n"2"\n'
+    assert client.get(
+        "/scans/", params={"format": "ndjson"}, headers={"If-None-Match": streamed.headers["etag"]}
+    ).status_code == 304
+
+    res = client.get("/scans/")
+    assert res.headers["etag"] != streamed.headers["etag"]
+    assert len(res.headers.get_list("set-cookie")) == 2
@@ -0,0 +1,117 @@
+# tests/test_dashboard_aggregates.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services import scan_ingest
+from app.services.dashboard_aggregates import (
+    GUARD_DAYS_TABLE,
+    REBUILD_RPC,
+    SCAN_BUCKETS_TABLE,
+    DashboardAggregates,
+    scan_local_time,
+)
+from tests.test_scans import scan
+
+NOW = datetime(2025, 1, 10, 1, 10)
+
+
+def dashboard_record_scan(db, row):
+    # Mirrors the scan_logs trigger in sql/dashboard_aggregates.sql
+    if not row.get("factory_code"):
+        return
+
+    local = scan_local_time(row)
+    day = local.date().isoformat()
+    bucket = local.hour * 2 + local.minute // 30
+
+    buckets = db.table(SCAN_BUCKETS_TABLE)
+    found = next(
+        (b for b in buckets.rows if (b["factory_code"], b["day"], b["bucket"]) == (row["factory_code"], day, bucket)),
+        None,
+    )
+
+    if found is None:
+        buckets.add({
+            "factory_code": row["factory_code"], "day": day, "bucket": bucket,
+            "scans": 1, "first_scan": local.isoformat(), "last_scan": local.isoformat(),
+        })
+    else:
+        found["scans"] += 1
+        found["first_scan"] = min(found["first_scan"], local.isoformat())
+        found["last_scan"] = max(found["last_scan"], local.isoformat())
+
+    guards = db.table(GUARD_DAYS_TABLE)
+    key = (row["factory_code"], day, row.get("guard_name"))
+
+    if row.get("guard_name") and not any((g["factory_code"], g["day"], g["guard_name"]) == key for g in guards.rows):
+        guards.add({"factory_code": key[0], "day": day, "guard_name": key[2]})
+
+
+@pytest.fixture
+def db(fake_db):
+    fake_db.triggers["scan_logs"] = [dashboard_record_scan]
+    fake_db.load("factories", [{"factory_code": "F001", "factory_name": "Factory 1"}])
+    return fake_db
+
+
+def test_naive_created_at_is_read_as_utc():
+    # 00:10 UTC is 05:40 IST
+    assert scan_local_time({"created_at": "2025-01-10T00:10:00"}) == datetime(2025, 1, 10, 5, 40)
+    assert scan_local_time({"scan_time": "2025-01-10T00:10:00+05:30"}) == datetime(2025, 1, 10, 0, 10)
+
+
+def test_open_round_is_not_missed(db):
+    # Rounds 1 (00:00) and 2 (00:30) are over, round 3 (01:00) is open
+    db.load("scan_logs", [scan("1", scan_time="2025-01-10T00:05:00+05:30")])
+
+    out = asyncio.run(DashboardAggregates().dashboard(now=NOW))
+
+    assert out["roundsToday"] == {"completed": 1, "scheduled": 3}
+    assert out["missedRounds"] == 1
+    assert out["roundStatusData"][0] == {"site": "Factory 1", "completed": 1, "missed": 1}
+
+
+def test_counts_scans_from_any_writer(db):
+    # One scan through this process, one written straight to the DB
+    asyncio.run(scan_ingest.ingest_scans([
+        dict(scan("1", scan_time="2025-01-10T00:05:00+05:30"), guard_name="A"),
+    ]))
+    db.load("scan_logs", [dict(scan("2", scan_time="2025-01-10T00:40:00+05:30"), guard_name="B")])
+
+    # A fresh instance (another worker) sees the same numbers
+    out = asyncio.run(DashboardAggregates().dashboard(now=NOW))
+
+    assert out["roundsToday"]["completed"] == 2
+    assert out["missedRounds"] == 0
+    assert out["totalGuards"] == 2
+
+
+def test_round_time_spans_both_buckets_of_a_long_round(db):
+    # Round 13 runs 06:00-07:00: two half-hour buckets
+    db.load("scan_logs", [
+        scan("1", scan_time="2025-01-10T06:05:00+05:30"),
+        scan("2", scan_time="2025-01-10T06:50:00+05:30"),
+    ])
+
+    out = asyncio.run(DashboardAggregates().dashboard(now=datetime(2025, 1, 10, 7, 5)))
+
+    assert out["roundStatusData"][0]["completed"] == 1
+    assert out["averageRoundTime"] == 45
+
+
+def test_rebuild_runs_in_the_database(db):
+    calls = []
+
+    def rebuild(db, params):
+        calls.append(params)
+        return {"scans_processed": 0}
+
+    db.functions[REBUILD_RPC] = rebuild
+
+    out = asyncio.run(DashboardAggregates().rebuild(NOW.date(), NOW.date()))
+
+    assert calls == [{"p_from": "2025-01-10", "p_to": "2025-01-10"}]
+    assert out == {"from_date": "2025-01-10", "to_date": "2025-01-10", "scans_processed": 0}
@@ -0,0 +1,98 @@
+# tests/test_login.py
+
+import asyncio
+
+from benchmarks.fake_postgrest import _Query
+
+from app.routes import security_users
+from app.services import login_service
+from app.services.login_service import authenticate, is_hashed, login_user_cache, verify_pin
+
+
+def _upgrade_login_pin(db, params):
+    # Same compare-and-swap as the SQL function
+    for row in db.table("login_info").rows:
+        if row["user_id"] == params["p_user_id"] and row["user_pin"] == params["p_old_pin"]:
+            row["user_pin"] = params["p_new_pin"]
+            return True
+    return None
+
+
+def _login(user_id, pin):
+
+    async def run():
+        user = await authenticate(user_id, pin)
+        await asyncio.gather(*login_service._upgrade_tasks)
+        return user
+
+    return asyncio.run(run())
+
+
+def _stored_pin(db, user_id):
+    return next(r["user_pin"] for r in db.table("login_info").rows if r["user_id"] == user_id)
+
+
+def test_plain_pin_is_upgraded_without_a_pin_filter(fake_db, monkeypatch):
+    login_user_cache.invalidate()
+    fake_db.functions[login_service.PIN_UPGRADE_RPC] = _upgrade_login_pin
+    fake_db.table("login_info").add({"user_id": "G01", "user_pin": "1234", "name": "Guard", "role": "GUARD"})
+
+    filters = []
+    original_eq = _Query.eq
+
+    def spy_eq(self, column, value):
+        filters.append(column)
+        return original_eq(self, column, value)
+
+    monkeypatch.setattr(_Query, "eq", spy_eq)
+
+    assert _login("G01", "1234")["name"] == "Guard"
+
+    stored = _stored_pin(fake_db, "G01")
+    assert is_hashed(stored) and verify_pin(stored, "1234")
+    assert "user_pin" not in filters
+    assert fake_db.calls["rpc upgrade_login_pin"] == 1
+
+    # The upgrade dropped the cached plain-text record
+    assert login_user_cache.get("G01") is None
+    assert _login("G01", "1234") is not None
+    assert _login("G01", "0000") is None
+
+
+def test_upgrade_skips_a_pin_changed_meanwhile(fake_db):
+    login_user_cache.invalidate()
+    fake_db.functions[login_service.PIN_UPGRADE_RPC] = _upgrade_login_pin
+    fake_db.table("login_info").add({"user_id": "G02", "user_pin": "1111", "name": "Guard", "role": "GUARD"})
+
+    async def run():
+        user = await authenticate("G02", "1111")
+        # An admin resets the PIN before the background upgrade lands
+        fake_db.table("login_info").rows[0]["user_pin"] = "2222"
+        await asyncio.gather(*login_service._upgrade_tasks)
+
+    asyncio.run(run())
+
+    assert _stored_pin(fake_db, "G02") == "2222"
+
+
+def test_missing_upgrade_function_keeps_login_working(fake_db):
+    login_user_cache.invalidate()
+    fake_db.table("login_info").add({"user_id": "G03", "user_pin": "4321", "name": "Guard", "role": "GUARD"})
+
+    assert _login("G03", "4321") is not None
+    assert _stored_pin(fake_db, "G03") == "4321"
+
+
+def test_security_user_passwords_stay_plain_and_clear_the_login_cache(fake_db):
+    # The admin UI shows security_password; only login_info PINs are hashed
+    login_user_cache.put("G04", {"user_id": "G04"})
+
+    created = security_users.create_security_user(security_users.SecurityUserCreate(
+        security_id="S04", security_name="Guard", factory="F001", security_password="5555",
+    ))
+    assert created["security_password"] == "5555"
+
+    security_users.update_security_user("S04", security_users.SecurityUserUpdate(security_password="6666"))
+
+    assert fake_db.table("security_users").rows[0]["security_password"] == "6666"
+    assert login_user_cache.get("G04") is None
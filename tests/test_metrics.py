@@ -0,0 +1,62 @@
+# tests/test_metrics.py
+
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+
+
+def test_slow_query_log_keeps_filter_names_not_values(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.0)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_SAMPLE_RATE", 1.1)
+    metrics.slow_queries.clear()
+
+    request = httpx.Request(
+        "GET",
+        "http://db/rest/v1/login_info?select=user_id,user_pin&user_id=eq.G01&user_pin=eq.1234&limit=1",
+    )
+    request.extensions["metrics_started"] = time.perf_counter() - 1
+
+    with caplog.at_level("WARNING", logger=metrics.__name__):
+        metrics._record(httpx.Response(200, request=request))
+
+    entry = metrics.slow_queries[-1]
+    assert entry["table"] == "login_info"
+    assert entry["method"] == "GET"
+    assert entry["filters"] == ["user_id", "user_pin"]
+    assert "1234" not in repr(entry) and "G01" not in repr(entry)
+    assert "1234" not in caplog.text and "slow query select login_info" in caplog.text
+
+
+def test_metrics_endpoints_need_an_admin_token():
+    from app.main import app
+
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics/slow-queries").status_code == 401
+
+
+def test_parallel_fetch_timings_go_to_the_histogram(capsys):
+    from app.utils.parallel_fetch import fetch_parallel
+
+    results = fetch_parallel({"a": lambda: 1, "b": lambda: 2}, fetch="test_fetch")
+
+    assert results == {"a": 1, "b": 2}
+    assert capsys.readouterr().out == ""
+
+    rendered = "\n".join(metrics.parallel_fetch_seconds.render())
+    assert 'parallel_fetch_duration_seconds_count{fetch="test_fetch",query="a",status="ok"} 1' in rendered
+
+
+def test_row_count_is_unknown_without_a_span():
+    request = httpx.Request("GET", "http://db/rest/v1/qr?select=qr_id")
+
+    def count(content_range):
+        return metrics._row_count(httpx.Response(200, request=request, headers={"content-range": content_range}))
+
+    assert count("0-24/3573") == 25
+    assert count("*/0") is None
+    assert count("*/*") is None
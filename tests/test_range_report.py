@@ -0,0 +1,78 @@
+# tests/test_range_report.py
+
+import asyncio
+import json
+from datetime import date
+
+from app.services import range_report_service
+
+
+def test_scan_fetches_use_a_bounded_sliding_window(fake_db, monkeypatch):
+    fake_db.load("qr", [{"qr_id": 1, "qr_name": "P1", "factory_code": "F001"}])
+
+    started = []
+
+    async def fetch(factory_codes, start, end):
+        started.append(start)
+        await asyncio.sleep(0)
+        return []
+
+    monkeypatch.setattr(range_report_service, "_fetch_scans", fetch)
+    monkeypatch.setattr(range_report_service, "RANGE_FETCH_CONCURRENCY", 3)
+
+    async def run():
+        days = []
+        async for row in range_report_service.iter_range_rows(["F001"], date(2025, 1, 1), date(2025, 1, 20)):
+            if row["report_date"] not in days:
+                days.append(row["report_date"])
+                # Never more than the window ahead of what was yielded
+                assert len(started) - (len(days) - 1) <= 3
+        return days
+
+    days = asyncio.run(run())
+
+    assert len(days) == 20
+    assert len(started) == 20
+
+
+def _stream_with_failing_day(monkeypatch, fmt, failing_day):
+    async def fetch(factory_codes, start, end):
+        if start == failing_day:
+            raise RuntimeError("connection reset")
+        return []
+
+    monkeypatch.setattr(range_report_service, "_fetch_scans", fetch)
+
+    async def run():
+        return "".join([
+            part async for part in
+            range_report_service.stream_range_report(["F001"], date(2025, 1, 1), date(2025, 1, 5), fmt)
+        ])
+
+    return asyncio.run(run())
+
+
+def test_failed_fetch_ends_each_format_with_a_resumable_error_record(fake_db, monkeypatch):
+    fake_db.load("qr", [{"qr_id": 1, "qr_name": "P1", "factory_code": "F001"}])
+    error = {"error": range_report_service.RANGE_STREAM_ERROR, "next_cursor": "2025-01-03"}
+
+    ndjson = _stream_with_failing_day(monkeypatch, "ndjson", date(2025, 1, 3)).splitlines()
+    rows = [json.loads(line) for line in ndjson]
+    assert rows[-1] == error
+    assert {r["report_date"] for r in rows[:-1]} == {"2025-01-01", "2025-01-02"}
+
+    # Still one valid json array
+    array = json.loads(_stream_with_failing_day(monkeypatch, "json", date(2025, 1, 3)))
+    assert array[-1] == error
+    assert len(array) == len(rows)
+
+    csv_lines = _stream_with_failing_day(monkeypatch, "csv", date(2025, 1, 3)).splitlines()
+    assert csv_lines[-1] == "# " + json.dumps(error)
+    assert len(csv_lines) == len(rows) + 1
+
+
+def test_failure_before_any_row_keeps_the_json_array_valid(fake_db, monkeypatch):
+    fake_db.load("qr", [{"qr_id": 1, "qr_name": "P1", "factory_code": "F001"}])
+    array = json.loads(_stream_with_failing_day(monkeypatch, "json", date(2025, 1, 1)))
+
+    assert array == [{"error": range_report_service.RANGE_STREAM_ERROR, "next_cursor": "2025-01-01"}]
@@ -0,0 +1,54 @@
+# tests/test_reference_cache.py
+
+import asyncio
+
+from app.core.reference_cache import ReferenceCache
+
+
+def test_invalidate_drops_the_namespace():
+    cache = ReferenceCache(ttl=60)
+    rows = [{"qr_id": 1}]
+
+    first = cache.get_or_load(("qr", "F001"), lambda: list(rows))
+    rows.append({"qr_id": 2})
+
+    assert cache.get_or_load(("qr", "F001"), lambda: list(rows)).etag == first.etag
+
+    cache.invalidate("qr")
+
+    assert cache.get_or_load(("qr", "F001"), lambda: list(rows)).etag != first.etag
+
+
+def test_load_racing_an_invalidate_is_not_cached():
+    cache = ReferenceCache(ttl=60)
+    rows = [{"qr_id": 1}]
+
+    def stale_load():
+        snapshot = list(rows)
+        # A write lands (and invalidates) while the load is in flight
+        rows.append({"qr_id": 2})
+        cache.invalidate("qr")
+        return snapshot
+
+    served = cache.get_or_load(("qr", "F001"), stale_load)
+    assert served.body == b'[{"qr_id":1}]'
+
+    # The next read reloads instead of serving the stale snapshot
+    assert cache.get_or_load(("qr", "F001"), lambda: list(rows)).body == b'[{"qr_id":1},{"qr_id":2}]'
+
+
+def test_async_load_racing_an_invalidate_is_not_cached():
+    cache = ReferenceCache(ttl=60)
+
+    async def stale_load():
+        cache.invalidate("factories")
+        return ["old"]
+
+    async def fresh_load():
+        return ["new"]
+
+    async def run():
+        await cache.get_or_load_async(("factories", "all"), stale_load)
+        return await cache.get_or_load_async(("factories", "all"), fresh_load)
+
+    assert asyncio.run(run()).body == b'["new"]'
@@ -0,0 +1,157 @@
+# tests/test_report_audit.py
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services import report_audit_service
+from app.services.report_audit_service import ReportAuditQueue
+from app.utils.spool import DurableSpool
+
+
+def event(report_type="PATROL_REPORT"):
+    return {"report_type": report_type, "factory_code": "F001", "report_date": "2025-01-10"}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ReportAuditQueue(str(tmp_path / "audit.db"), flush_size=10, flush_interval=60, max_attempts=2)
+
+
+def test_enqueue_returns_once_the_event_is_on_disk(queue, tmp_path, fake_db):
+    queue.enqueue(event())
+
+    # A crash right now would lose nothing
+    assert DurableSpool(str(tmp_path / "audit.db")).depth() == 1
+    assert len(fake_db.table("report_audit").rows) == 0
+
+    assert asyncio.run(queue.flush_once()) == 1
+    assert len(fake_db.table("report_audit").rows) == 1
+    assert queue.spool.depth() == 0
+
+
+def test_concurrent_enqueues_share_commits(queue, monkeypatch):
+    real_append_many = queue.spool.append_many
+    first_commit_started = threading.Event()
+    release_first_commit = threading.Event()
+
+    def slow_append_many(payloads):
+        if not first_commit_started.is_set():
+            first_commit_started.set()
+            release_first_commit.wait(5)
+        real_append_many(payloads)
+
+    monkeypatch.setattr(queue.spool, "append_many", slow_append_many)
+
+    leader = threading.Thread(target=queue.enqueue, args=(event(),))
+    leader.start()
+    first_commit_started.wait(5)
+
+    # These pile up behind the first commit and go in one transaction
+    followers = [threading.Thread(target=queue.enqueue, args=(event(),)) for _ in range(8)]
+    for t in followers:
+        t.start()
+    for _ in range(500):
+        if len(queue._group.payloads) == 8:
+            break
+        time.sleep(0.01)
+    release_first_commit.set()
+
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert queue.spool.depth() == 9
+    assert queue.metrics()["enqueued"] == 9
+    assert queue.metrics()["spool_commits"] == 2
+
+
+def test_enqueue_raises_when_the_spool_write_fails(queue, monkeypatch):
+    def disk_full(payloads):
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(queue.spool, "append_many", disk_full)
+
+    with pytest.raises(sqlite3.OperationalError):
+        queue.enqueue(event())
+
+    # The next event gets its own attempt
+    monkeypatch.undo()
+    queue.enqueue(event())
+    assert queue.spool.depth() == 1
+
+
+def test_rejected_event_is_isolated_then_dead_lettered(queue, fake_db, monkeypatch):
+    real_insert = report_audit_service.insert_rows_async
+
+    async def insert(table, rows):
+        if any(r["report_type"] == "bad" for r in rows):
+            raise APIError({"message": "null value", "code": "23502", "hint": None, "details": None})
+        return await real_insert(table, rows)
+
+    monkeypatch.setattr(report_audit_service, "insert_rows_async", insert)
+
+    for report_type in ("A", "B", "bad", "C"):
+        queue.enqueue(event(report_type))
+
+    assert asyncio.run(queue.flush_once()) == 3
+    assert queue.spool.depth() == 1
+
+    asyncio.run(queue.flush_once())
+    assert queue.spool.depth() == 0
+    assert queue.spool.dead_depth() == 1
+
+
+def test_stop_spools_unsent_events_and_closes(queue, tmp_path, monkeypatch):
+    async def unreachable(table, rows):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(report_audit_service, "insert_rows_async", unreachable)
+
+    async def run():
+        await queue.start()
+        queue.enqueue(event())
+        await queue.stop()
+
+    asyncio.run(run())
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        queue.spool.depth()
+
+    # Still there for the next start, with no attempt counted
+    reopened = DurableSpool(str(tmp_path / "audit.db"))
+    assert reopened.depth() == 1
+    assert reopened.dead_depth() == 0
+
+
+def test_flush_loop_survives_a_spool_error(tmp_path, fake_db):
+    queue = ReportAuditQueue(str(tmp_path / "audit.db"), flush_size=10, flush_interval=0.01)
+    real_peek = queue.spool.peek
+    failures = []
+
+    def flaky_peek(limit):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return real_peek(limit)
+
+    queue.spool.peek = flaky_peek
+    queue.enqueue(event())
+
+    async def run():
+        await queue.start()
+        for _ in range(100):
+            if fake_db.table("report_audit").rows:
+                break
+            await asyncio.sleep(0.01)
+        running = not queue._task.done()
+        await queue.stop()
+        return running
+
+    assert asyncio.run(run())
+    assert queue.loop_errors == 1
+    assert len(fake_db.table("report_audit").rows) == 1
@@ -0,0 +1,84 @@
+# tests/test_report_cache.py
+
+import asyncio
+
+from benchmarks.fake_postgrest import FakeClient
+
+from app.routes import qr as qr_routes
+from app.services import report_service
+from app.services.report_cache import ReportCache, report_cache
+
+
+def test_invalidate_drops_files_and_moves_the_key(tmp_path):
+    cache = ReportCache(str(tmp_path), 1024 * 1024)
+
+    path = cache.path_for("json", "F001", "2025-01-10", "3:42")
+    cache.put(path, b"old")
+
+    cache.invalidate("F001", "2025-01-10")
+
+    assert cache.read(path) is None
+    assert cache.path_for("json", "F001", "2025-01-10", "3:42") != path
+
+
+def test_render_that_raced_an_invalidate_is_never_served(tmp_path):
+    cache = ReportCache(str(tmp_path), 1024 * 1024)
+
+    # Path taken, data read, then a write invalidates before the put
+    path = cache.path_for("pdf", "F001", "2025-01-10", "3:42")
+    cache.invalidate("F001")
+    cache.put(path, b"stale")
+
+    fresh_path = cache.path_for("pdf", "F001", "2025-01-10", "3:42")
+    assert fresh_path != path
+    assert cache.read(fresh_path) is None
+
+
+def test_raced_render_stays_unreachable_after_a_restart(tmp_path):
+    cache = ReportCache(str(tmp_path), 1024 * 1024)
+
+    path = cache.path_for("json", "F001", "2025-01-10", "3:42")
+    cache.invalidate("F001", "2025-01-10")
+    cache.put(path, b"stale")
+
+    # A new process (or another worker) on the same directory
+    restarted = ReportCache(str(tmp_path), 1024 * 1024)
+
+    fresh_path = restarted.path_for("json", "F001", "2025-01-10", "3:42")
+    assert fresh_path == cache.path_for("json", "F001", "2025-01-10", "3:42")
+    assert fresh_path != path
+    assert restarted.read(fresh_path) is None
+    assert restarted.stats()["entries"] == 1
+
+
+def test_factory_wide_invalidate_covers_every_day(tmp_path):
+    cache = ReportCache(str(tmp_path), 1024 * 1024)
+
+    day1 = cache.path_for("json", "F001", "2025-01-10", "1:1")
+    day2 = cache.path_for("json", "F001", "2025-01-11", "1:2")
+    other = cache.path_for("json", "F002", "2025-01-10", "1:3")
+    for path in (day1, day2, other):
+        cache.put(path, b"x")
+
+    cache.invalidate("F001")
+
+    assert cache.read(day1) is None and cache.read(day2) is None
+    assert cache.read(other) == b"x"
+
+
+def test_qr_write_refreshes_the_cached_report(fake_db):
+    report_cache.invalidate_all()
+    client = FakeClient(fake_db)
+    fake_db.load("factories", [{"factory_code": "F001", "factory_name": "Factory 1", "factory_address": "1 Road"}])
+    fake_db.load("qr", [{"qr_id": 1, "qr_name": "P1", "factory_code": "F001"}])
+
+    before = report_service.get_report_body(client, "F001", "2025-01-10")
+
+    # Same scans (same watermark), one more QR
+    asyncio.run(qr_routes.create_qr_endpoint({"qr_name": "P2", "factory_code": "F001", "waiting_time": 15}))
+
+    after = report_service.get_report_body(client, "F001", "2025-01-10")
+
+    assert {row["qr_name"] for row in before["data"]} == {"P1"}
+    assert {row["qr_name"] for row in after["data"]} == {"P1", "P2"}
+
@@ -0,0 +1,110 @@
+# tests/test_report_pdf.py
+
+import io
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import security_analytics_service as pdf_service
+
+
+def _load_day(fake_db, scans: int):
+    fake_db.load("factories", [{"factory_code": "F001", "factory_name": "Factory 1", "factory_address": "1 Road"}])
+    fake_db.load("users", [{"user_id": "admin", "full_name": "Admin One"}])
+
+    start = datetime(2025, 1, 10, 0, 0)
+    fake_db.load("scanning_details", [
+        {
+            "factory_code": "F001",
+            "employee_name": "Guard",
+            "employee_id": "G1",
+            "qr_name": f"P{i % 20}",
+            "latitude": 12.9,
+            "longitude": 77.5,
+            # One long round: scans a minute apart
+            "scan_time": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(scans)
+    ])
+
+
+def test_pdf_is_built_from_a_bounded_flowable_window(fake_db, monkeypatch):
+    _load_day(fake_db, 450)
+    peak = []
+
+    class Watched(pdf_service.LazyFlowables):
+        def _fill(self):
+            super()._fill()
+            peak.append(list.__len__(self))
+
+    monkeypatch.setattr(pdf_service, "LazyFlowables", Watched)
+
+    out = io.BytesIO()
+    payload = SimpleNamespace(factory_code="F001", report_date="2025-01-10", downloaded_by="admin")
+    pdf_service.build_report_pdf(payload, out)
+
+    assert out.getvalue().startswith(b"%PDF")
+    assert max(peak) <= pdf_service.PDF_LOOKAHEAD + 1
+
+
+def test_long_round_is_cut_into_tables():
+    rounds = [[
+        SimpleNamespace(employee_name="G", employee_id="1", clock="12:00 AM", qr_name="P", latitude=0, longitude=0)
+        for _ in range(pdf_service.PDF_TABLE_ROWS * 2 + 1)
+    ]]
+    payload = SimpleNamespace(report_date="2025-01-10")
+
+    flowables = list(pdf_service._report_flowables(payload, {"factory_name": "F", "factory_address": "A"}, "Admin", rounds))
+    tables = [f for f in flowables if isinstance(f, pdf_service.Table)]
+
+    assert len(tables) == 3
+
+
+def test_build_that_stops_early_is_an_error(fake_db, monkeypatch):
+    _load_day(fake_db, 50)
+
+    def build_first_window_only(self, flowables, *args, **kwargs):
+        # A ReportLab that copied the list up front: one fill, then done
+        len(flowables)
+        list.clear(flowables)
+
+    monkeypatch.setattr(pdf_service.SimpleDocTemplate, "build", build_first_window_only)
+
+    payload = SimpleNamespace(factory_code="F001", report_date="2025-01-10", downloaded_by="admin")
+
+    with pytest.raises(RuntimeError):
+        pdf_service.build_report_pdf(payload, io.BytesIO())
+
+
+def test_each_download_is_stamped_with_its_own_time(fake_db, monkeypatch):
+    _load_day(fake_db, 5)
+    stamps = []
+
+    class Recorded(pdf_service.Paragraph):
+        def __init__(self, text, *args, **kwargs):
+            if text.startswith("Downloaded On"):
+                stamps.append(text)
+            super().__init__(text, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_service, "Paragraph", Recorded)
+
+    payload = SimpleNamespace(factory_code="F001", report_date="2025-01-10", downloaded_by="admin")
+
+    for minute in (1, 2):
+        monkeypatch.setattr(pdf_service, "datetime", _FixedNow(datetime(2025, 1, 11, 9, minute)))
+        chunks, _name = pdf_service.stream_report_download(payload)
+        list(chunks)
+
+    assert stamps == ["Downloaded On : 11-Jan-2025 09:01 AM", "Downloaded On : 11-Jan-2025 09:02 AM"]
+
+
+class _FixedNow:
+    def __init__(self, now):
+        self._now = now
+
+    def now(self):
+        return self._now
+
+    def fromisoformat(self, value):
+        return datetime.fromisoformat(value)
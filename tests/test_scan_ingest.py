@@ -0,0 +1,98 @@
+# tests/test_scan_ingest.py
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.routes import scanning_details as scan_routes
+from app.schemas.scanning_details import ScanBatchItem
+from app.services import scan_ingest
+from tests.test_scans import scan
+
+
+@pytest.fixture(autouse=True)
+def fresh_recent_keys():
+    scan_ingest._recent_keys.clear()
+    yield
+    scan_ingest._recent_keys.clear()
+
+
+def test_batch_dedupes_within_batch_and_against_stored_keys(fake_db):
+    fake_db.load("scan_logs", [scan("1", idempotency_key="k-stored")])
+
+    rows = [
+        dict(scan("2"), idempotency_key="k-new"),
+        dict(scan("3"), idempotency_key="k-stored"),
+        dict(scan("2"), idempotency_key="k-new"),
+        scan("4"),
+    ]
+
+    results = asyncio.run(scan_ingest.ingest_scans(rows))
+
+    assert [r["status"] for r in results] == ["created", "duplicate", "duplicate", "created"]
+    assert results[1]["id"] == 1
+    assert results[2]["id"] == results[0]["id"]
+    assert len(fake_db.table("scan_logs").rows) == 3
+
+    # A retried batch is answered from the recent-key cache, no insert
+    again = asyncio.run(scan_ingest.ingest_scans([dict(scan("2"), idempotency_key="k-new")]))
+
+    assert again[0] == {**results[0], "status": "duplicate"}
+    assert len(fake_db.table("scan_logs").rows) == 3
+
+
+def test_key_stored_concurrently_only_skips_that_row(fake_db):
+    rows = [dict(scan("1"), idempotency_key="k-raced"), dict(scan("2"), idempotency_key="k-other")]
+
+    # Another worker stores k-raced after this batch's recent-key check
+    fake_db.load("scan_logs", [scan("1", idempotency_key="k-raced")])
+
+    results = asyncio.run(scan_ingest.ingest_scans(rows))
+
+    assert [r["status"] for r in results] == ["duplicate", "created"]
+    assert results[0]["id"] == 1
+    assert len(fake_db.table("scan_logs").rows) == 2
+
+
+def test_failed_chunk_marks_rows_failed(fake_db, monkeypatch):
+    async def broken_insert(table, rows, on_conflict):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scan_ingest, "insert_new_rows_async", broken_insert)
+
+    results = asyncio.run(scan_ingest.ingest_scans([
+        dict(scan("1"), idempotency_key="a"),
+        dict(scan("1"), idempotency_key="a"),
+    ]))
+
+    assert [r["status"] for r in results] == ["failed", "failed"]
+    assert "a" not in scan_ingest._recent_keys
+
+
+def test_client_scan_time_is_stored_as_sent(fake_db):
+    item = ScanBatchItem.model_validate(dict(scan("1"), scan_time="2025-01-05T21:58:00+05:30"))
+    row = scan_routes.to_scan_row(item)
+
+    asyncio.run(scan_ingest.ingest_scans([row]))
+
+    stored = fake_db.table("scan_logs").rows[0]
+    assert stored["scan_time"] == "2025-01-05T21:58:00+05:30"
+    assert "created_at" not in row
+
+
+def test_scan_time_without_offset_is_read_as_ist():
+    item = ScanBatchItem.model_validate(dict(scan("1"), scan_time="2025-01-05T21:58:00"))
+
+    assert scan_routes.to_scan_row(item)["scan_time"] == "2025-01-05T21:58:00+05:30"
+
+
+def test_unparseable_scan_time_is_rejected():
+    with pytest.raises(ValidationError):
+        ScanBatchItem.model_validate(dict(scan("1"), scan_time="yesterday"))
+
+
+def test_missing_scan_time_is_left_to_the_db():
+    row = scan_routes.to_scan_row(ScanBatchItem.model_validate(scan("1")))
+
+    assert "scan_time" not in row
@@ -0,0 +1,56 @@
+# tests/test_scans.py
+
+import asyncio
+import json
+
+from app.database import iter_pages_async
+from app.routes import scanning_details as scan_routes
+
+
+def scan(qr_id, **extra):
+    row = {
+        "guard_name": "Guard F001-G01",
+        "qr_id": qr_id,
+        "qr_name": f"F001-P{qr_id}",
+        "lat": 12.9,
+        "log": 77.5,
+        "status": "success",
+        "factory_code": "F001",
+    }
+    row.update(extra)
+    return row
+
+
+def _collect(agen):
+    async def run():
+        return [chunk async for chunk in agen]
+    return asyncio.run(run())
+
+
+def test_ndjson_stream_reports_mid_stream_failure(fake_db, monkeypatch):
+    fake_db.load("scan_logs", [scan("1"), scan("2")])
+
+    async def failing_pages(filters, cursor, page_size):
+        async for page in iter_pages_async("scan_logs", filters, cursor, page_size):
+            yield page
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(scan_routes, "iter_scan_log_pages_async", failing_pages)
+
+    lines = [
+        json.loads(line)
+        for chunk in _collect(scan_routes._stream_scans({}, None, 1))
+        for line in chunk.splitlines()
+    ]
+
+    assert [line.get("id") for line in lines[:2]] == [1, 2]
+    assert lines[-1] == {"error": "Failed to fetch scans", "next_cursor": 2}
+
+
+def test_ndjson_stream_has_no_error_record_when_complete(fake_db):
+    fake_db.load("scan_logs", [scan("1")])
+
+    lines = "".join(_collect(scan_routes._stream_scans({}, None, 10))).splitlines()
+
+    assert len(lines) == 1
+    assert "error" not in json.loads(lines[0])
@@ -0,0 +1,138 @@
+# tests/test_write_behind.py
+
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services import scan_ingest
+from app.services.scan_ingest import ScanWriteBehindQueue
+from tests.test_scans import scan
+
+
+@pytest.fixture
+def queue(tmp_path):
+    scan_ingest._recent_keys.clear()
+    return ScanWriteBehindQueue(str(tmp_path / "spool.db"), flush_size=8, flush_interval=60, max_attempts=2)
+
+
+@pytest.fixture
+def inserts(fake_db, monkeypatch):
+    """
+    Wrap insert_new_rows_async: rejects any chunk holding a qr_name
+    "bad" row (like a constraint violation) and counts calls.
+    """
+    calls = []
+    real_insert = scan_ingest.insert_new_rows_async
+
+    async def insert(table, rows, on_conflict):
+        calls.append(len(rows))
+        if any(r.get("qr_name") == "bad" for r in rows):
+            raise APIError({"message": "invalid input", "code": "22P02", "hint": None, "details": None})
+        return await real_insert(table, rows, on_conflict)
+
+    monkeypatch.setattr(scan_ingest, "insert_new_rows_async", insert)
+    return calls
+
+
+def _enqueue(queue, rows):
+    async def run():
+        return [await queue.enqueue(row) for row in rows]
+    return asyncio.run(run())
+
+
+def test_enqueue_persists_key_and_scan_time(queue, fake_db):
+    queued = _enqueue(queue, [scan("1")])
+
+    (_, payload), = queue.spool.peek(10)
+
+    assert payload["idempotency_key"] == queued[0]["idempotency_key"]
+    assert payload["scan_time"].endswith("+00:00")
+
+    assert asyncio.run(queue.flush_once()) == 1
+    assert queue.spool.depth() == 0
+    assert fake_db.table("scan_logs").rows[0]["scan_time"] == payload["scan_time"]
+
+
+def test_poison_row_is_isolated_then_dead_lettered(queue, fake_db, inserts):
+    rows = [scan(str(i)) for i in range(6)]
+    rows[3]["qr_name"] = "bad"
+    _enqueue(queue, rows)
+
+    # Bisection stores every good row on the first flush
+    assert asyncio.run(queue.flush_once()) == 5
+    assert queue.spool.depth() == 1
+    assert len(fake_db.table("scan_logs").rows) == 5
+
+    # The bad row is retried, then moved aside
+    asyncio.run(queue.flush_once())
+    assert queue.spool.depth() == 0
+    assert queue.spool.dead_depth() == 1
+    assert queue.metrics()["dead_lettered"] == 1
+
+    # Later scans flow again
+    _enqueue(queue, [scan("9")])
+    assert asyncio.run(queue.flush_once()) == 1
+
+
+def test_retryable_failure_is_not_bisected_or_counted(queue, fake_db, monkeypatch):
+    calls = []
+
+    async def unreachable(table, rows, on_conflict):
+        calls.append(len(rows))
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(scan_ingest, "insert_new_rows_async", unreachable)
+    _enqueue(queue, [scan(str(i)) for i in range(4)])
+
+    for _ in range(3):
+        assert asyncio.run(queue.flush_once()) == 0
+
+    assert calls == [4, 4, 4]
+    assert queue.spool.depth() == 4
+    assert queue.spool.dead_depth() == 0
+
+
+def test_stop_drains_and_closes_the_spool(queue, fake_db):
+    _enqueue(queue, [scan("1")])
+
+    async def run():
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert len(fake_db.table("scan_logs").rows) == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        queue.spool.depth()
+
+
+def test_flush_loop_survives_a_spool_error(tmp_path, fake_db):
+    queue = ScanWriteBehindQueue(str(tmp_path / "spool.db"), flush_size=8, flush_interval=0.01)
+    real_peek = queue.spool.peek
+    failures = []
+
+    def flaky_peek(limit):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return real_peek(limit)
+
+    queue.spool.peek = flaky_peek
+
+    async def run():
+        await queue.enqueue(scan("1"))
+        await queue.start()
+        for _ in range(100):
+            if fake_db.table("scan_logs").rows:
+                break
+            await asyncio.sleep(0.01)
+        running = not queue._task.done()
+        await queue.stop()
+        return running
+
+    assert asyncio.run(run())
+    assert queue.loop_errors == 1
+    assert len(fake_db.table("scan_logs").rows) == 1